@@ -1,3 +1,9 @@
 from .tools import Tool
 from .agents import Agent, AIAssistant
-from .llms import LLM, Clarifai, Cohere, Groq, OpenAI, Together, Google
\ No newline at end of file
+from .llms import LLM
+
+def __getattr__(name: str):
+    if name in ('Clarifai', 'Cohere', 'Groq', 'OpenAI', 'Together', 'Google'):
+        from . import llms
+        return getattr(llms, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -1,19 +1,22 @@
 import json
 import uuid
+import asyncio
 import logging
-import aiofiles
 from rich import print
 from datetime import datetime
 from typing import Dict, List, Literal, Optional, Self, TypeAlias, Union, Type, Any
 from fastapi import WebSocket
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 from cognitrix.llms.base import LLM, LLMResponse
 from cognitrix.tools.base import Tool
+from cognitrix.tools.registry import normalize_name
+from cognitrix.tools.executor import get_tool_executor
 from cognitrix.utils import extract_json, parse_tool_call_results
 from cognitrix.agents.templates import ASSISTANT_SYSTEM_PROMPT
-from cognitrix.config import AGENTS_FILE
+from cognitrix.storage import get_storage
+from cognitrix.storage.blobs import image_message, store_image
 # from cognitrix.llms.session import Session
 from cognitrix.transcriber import Transcriber
 
@@ -55,6 +58,9 @@ class Agent(BaseModel):
     websocket: Optional[WebSocket] = None
     """Websocket connection for web ui"""
     
+    _tool_map: Dict[str, Tool] = PrivateAttr(default_factory=dict)
+    _tool_map_tools: tuple = PrivateAttr(default=())
+    
     class Config:
         arbitrary_types_allowed = True
 
@@ -157,8 +163,9 @@ class Agent(BaseModel):
                 result = processed_query['result']
                 if isinstance(result, list):
                     if result[0] == 'image':
-                        prompt['type'] = 'image'
-                        prompt['image'] = result[1]
+                        prompt.update(image_message(result[1], role))
+                        if len(result) > 2:
+                            prompt['message'] = result[2]
                     elif result[0] == 'agent':
                         new_agent: Agent = result[1]
                         new_agent.parent_id = self.id
@@ -176,6 +183,15 @@ class Agent(BaseModel):
 
         return prompt
 
+    async def aprocess_prompt(self, query: str | dict, role: str = 'User') -> dict:
+        """process_prompt, saving an image result to the blob store in a thread instead of on the event loop"""
+        processed_query = self._process_query(query)
+        if isinstance(processed_query, dict) and isinstance(processed_query.get('result'), list):
+            result = processed_query['result']
+            if len(result) > 1 and result[0] == 'image' and not isinstance(result[1], str):
+                processed_query = {**processed_query, 'result': ['image', await store_image(result[1]), *result[2:]]}
+        return self.process_prompt(processed_query, role)
+
     def _process_query(self, query: str | dict) -> str | dict:
         return extract_json(query) if isinstance(query, str) else query
 
@@ -185,10 +201,78 @@ class Agent(BaseModel):
     def get_sub_agent_by_name(self, name: str) -> Optional['Agent']:
         return next((agent for agent in self.sub_agents if agent.name.lower() == name.lower()), None)
 
+    def tool_map(self) -> Dict[str, Tool]:
+        """
+        The agent's tools by normalized name, rebuilt only when the tools in
+        the list change. Tools loaded from storage are only their
+        descriptions, so they're swapped for the registered implementation.
+        """
+        tools = tuple(self.tools)
+        built = self._tool_map_tools
+        # Compared by identity, holding on to the tools so their ids can't be reused
+        if len(tools) != len(built) or any(tool is not previous for tool, previous in zip(tools, built)):
+            tool_map = {}
+            for tool in self.tools:
+                if type(tool) is Tool:
+                    tool = Tool.get_by_name(tool.name)
+                if tool:
+                    tool_map[normalize_name(tool.name)] = tool
+            self._tool_map, self._tool_map_tools = tool_map, tools
+        return self._tool_map
+
     def get_tool_by_name(self, name: str) -> Optional[Tool]:
-        return next((tool for tool in self.tools if tool.name.lower() == name.lower()), None)
+        return self.tool_map().get(normalize_name(name))
+
+    async def call_tool(self, tool_call: dict) -> list:
+        """Run a single parsed tool call and return its [name, result] pair"""
+        tool = self.get_tool_by_name(tool_call['name'])
+        
+        if not tool:
+            print(f"Tool '{tool_call['name']}' not found")
+            raise Exception(f"Tool '{tool_call['name']}' not found")
+        
+        arguments = tool_call.get('arguments') or {}
+        print(f"\nRunning tool '{tool.name.title()}' with parameters: {arguments}")
+            
+        if 'sub agent' in tool.name.lower():
+            arguments['parent'] = self
+        
+        result = await get_tool_executor().run(tool, arguments)
+        
+        return [tool.name, result]
+    
+    @staticmethod
+    def format_tool_calls_result(tool_calls_result: list) -> dict:
+        """Combine the [name, result] pairs of tool calls.
+        
+        Image results, like screenshots, are left out of the text and
+        returned under 'images', to be sent to the llm as image messages.
+        """
+        results = []
+        images = []
+        for name, result in tool_calls_result:
+            if isinstance(result, list) and len(result) > 1 and result[0] == 'image':
+                images.append(result)
+                caption = result[2] if len(result) > 2 else 'Image'
+                result = f"{caption} (attached as an image)"
+            results.append([name, result])
+        
+        formatted: dict[str, Any] = {
+            'type': 'tool_calls_result',
+            'result': f"Tool calls result: {parse_tool_call_results(results)}"
+        }
+        if images:
+            formatted['images'] = images
+        return formatted
+    
+    async def image_prompts(self, message: str | dict) -> List[dict]:
+        """Image messages of the image results in a tool calls result, saved to the blob store"""
+        if not isinstance(message, dict):
+            return []
+        return [await self.aprocess_prompt({'result': image}) for image in message.get('images', [])]
 
     async def call_tools(self, tool_calls: dict) -> Union[dict, str]:
+        """Run the tool calls of a response concurrently and combine their results in the order they were called"""
         try:
             if tool_calls:
                 tool_calls_result = []
@@ -200,35 +284,13 @@ class Agent(BaseModel):
                 else: 
                     agent_tool_calls.append(tool_calls['tool'])
                     
-                for t in agent_tool_calls:
-                    tool = Tool.get_by_name(t['name'])
-                    
-                    if not tool:
-                        print(f"Tool '{t['name']}' not found")
-                        raise Exception(f"Tool '{t['name']}' not found")
-                    
-                    print(f"\nRunning tool '{tool.name.title()}' with parameters: {t['arguments']}")
-                    # if self.websocket:
-                    #     await self.websocket.send_text(json.dumps({
-                    #         'type': 'chat_message', 
-                    #         'content': f"\nRunning tool '{tool.name.title()}' with parameters: {t['arguments']}\n", 
-                    #         'action': 'reply', 'complete': False}))
-                        
-                    if 'sub agent' in tool.name.lower():
-                        t['arguments']['parent'] = self
-                    # print(tool)
-                    if tool.name.lower() == 'create sub agent':
-                        t['arguments']['parent'] = self
-                        result = await tool.arun(**t['arguments'])
-                    else:
-                        result = tool.run(**t['arguments'])
-                    
-                    tool_calls_result.append([tool.name, result])
+                results = await asyncio.gather(*(self.call_tool(t) for t in agent_tool_calls), return_exceptions=True)
+                for result in results:
+                    if isinstance(result, BaseException):
+                        raise result
+                    tool_calls_result.append(result)
                 
-                return {
-                    'type': 'tool_calls_result',
-                    'result': f"Tool calls result: {parse_tool_call_results(tool_calls_result)}"
-                }
+                return self.format_tool_calls_result(tool_calls_result)
             else:
                 raise Exception('Not a json object')
         except Exception as e:
@@ -461,17 +523,6 @@ class Agent(BaseModel):
         #     full_prompt = self.process_prompt(f'Sub-agent with name {agent_name} was not found.')
         #     self.llm(full_prompt, self.formatted_system_prompt())
 
-    @classmethod
-    async def _load_agents_from_file(cls) -> Dict[str, Dict]:
-        async with aiofiles.open(AGENTS_FILE, 'r') as file:
-            content = await file.read()
-            return json.loads(content) if content else {}
-
-    @classmethod
-    async def _save_agents_to_file(cls, agents: Dict[str, Dict]):
-        async with aiofiles.open(AGENTS_FILE, 'w') as file:
-            await file.write(json.dumps(agents, indent=4))
-
     @classmethod
     async def create_agent(cls, name: str = '', description: str = '', task_description: str = '', tools: List[Tool] = [],
                      llm: Optional[LLM] = None, is_sub_agent: bool = False, parent_id=None) -> Optional[Self]:
@@ -504,10 +555,7 @@ class Agent(BaseModel):
                 if description:
                     new_agent.system_prompt = description
 
-                agents = await cls._load_agents_from_file()
-                agents[new_agent.id] = new_agent.dict()
-
-                await cls._save_agents_to_file(agents)
+                await new_agent.save()
 
                 return new_agent
 
@@ -517,10 +565,14 @@ class Agent(BaseModel):
     @classmethod
     async def list_agents(cls, parent_id: Optional[str] = None) -> List[Self]:
         try:
-            loaded_agents = await cls._load_agents_from_file()
+            storage = get_storage()
+            if parent_id:
+                loaded_agents = await storage.find('agents', parent_id=parent_id)
+            else:
+                loaded_agents = list((await storage.all('agents')).values())
             agents = []
             
-            for agent_data in loaded_agents.values():
+            for agent_data in loaded_agents:
                 agent = Agent(**agent_data)
 
                 # llm = LLM.load_llm(agent.llm.provider)
@@ -540,8 +592,7 @@ class Agent(BaseModel):
 
     @classmethod
     async def get(cls, id) -> Optional[Self]:
-        agents = await cls._load_agents_from_file()
-        agent_data = agents.get(id)
+        agent_data = await get_storage().get('agents', id)
         if agent_data:
             agent =  Agent(**agent_data)
             provider = LLM.load_llm(agent_data['llm']['provider'])
@@ -552,8 +603,7 @@ class Agent(BaseModel):
 
     @classmethod
     async def load_agent(cls, agent_name: str) -> Optional['Agent']:
-        agents = await cls._load_agents_from_file()
-        agent_data = next((data for data in agents.values() if data['name'].lower() == agent_name.lower()), None)
+        agent_data = await get_storage().find_one('agents', name=agent_name)
         if agent_data:
             agent = Agent(**agent_data)
             agent.sub_agents = await cls.list_agents(agent.id)
@@ -562,25 +612,18 @@ class Agent(BaseModel):
     
     async def save(self):
         """Save current agent"""
-        agents = await self._load_agents_from_file()
-        agents[self.id] = self.dict()
-        await self._save_agents_to_file(agents)
+        await get_storage().save('agents', self.id, self.dict())
         return self.id
         
     @classmethod    
     async def delete(cls, name_or_id: str):
         """Delete agent by id or name"""
-        agents = await cls._load_agents_from_file()
+        storage = get_storage()
         
-        if name_or_id in agents:
-            del agents[name_or_id]
-        else:
-            for agent_id, agent_data in list(agents.items()):
-                if agent_data['name'].lower() == name_or_id.lower():
-                    del agents[agent_id]
-                    break
-        
-        if len(agents) < len(await cls._load_agents_from_file()):
-            await cls._save_agents_to_file(agents)
+        if await storage.delete('agents', name_or_id):
             return True
+        
+        agent_data = await storage.find_one('agents', name=name_or_id)
+        if agent_data:
+            return await storage.delete('agents', agent_data['id'])
         return False
\ No newline at end of file
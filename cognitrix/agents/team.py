@@ -4,10 +4,9 @@ import uuid
 import logging
 from typing import List, Optional, Self, Dict
 from pydantic import BaseModel, Field
-import aiofiles
 
 from cognitrix.agents.base import Agent
-from cognitrix.config import TEAMS_FILE
+from cognitrix.storage import get_storage
 
 logger = logging.getLogger('cognitrix.log')
 
@@ -24,25 +23,12 @@ class Team(BaseModel):
     class Config:
         arbitrary_types_allowed = True
 
-    @classmethod
-    async def _load_teams_from_file(cls) -> Dict[str, Dict]:
-        async with aiofiles.open(TEAMS_FILE, 'r') as file:
-            content = await file.read()
-            return json.loads(content) if content else {}
-
-    @classmethod
-    async def _save_teams_to_file(cls, teams: Dict[str, Dict]):
-        async with aiofiles.open(TEAMS_FILE, 'w') as file:
-            await file.write(json.dumps(teams, indent=4))
-
     @classmethod
     async def create_team(cls, name: str = '', agent_ids: List[str] = []) -> Optional[Self]:
         try:
             name = name or input("\n[Enter team name]: ")
             new_team = cls(name=name, agent_ids=agent_ids)
-            teams = await cls._load_teams_from_file()
-            teams[new_team.id] = new_team.dict()
-            await cls._save_teams_to_file(teams)
+            await new_team.save()
             return new_team
         except Exception as e:
             logger.error(f"Error creating team: {str(e)}")
@@ -51,7 +37,7 @@ class Team(BaseModel):
     @classmethod
     async def list_teams(cls) -> Dict[str, Self]:
         try:
-            teams = await cls._load_teams_from_file()
+            teams = await get_storage().all('teams')
             return {team_id: cls(**team_data) for team_id, team_data in teams.items()}
         except Exception as e:
             logger.exception(f"Error listing teams: {str(e)}")
@@ -60,33 +46,27 @@ class Team(BaseModel):
     @classmethod
     async def get(cls, id_or_name: str) -> Optional[Self]:
         """Get a team by ID or name"""
-        teams = await cls._load_teams_from_file()
-        team_data = teams.get(id_or_name)
+        storage = get_storage()
+        team_data = await storage.get('teams', id_or_name) or await storage.find_one('teams', name=id_or_name)
         if team_data:
             return cls(**team_data)
-        return next((cls(**data) for data in teams.values() if data['name'].lower() == id_or_name.lower()), None)
+        return None
 
     async def save(self):
         """Save current team"""
-        teams = await self._load_teams_from_file()
-        teams[self.id] = self.dict()
-        await self._save_teams_to_file(teams)
+        await get_storage().save('teams', self.id, self.dict())
         return self.id
 
     @classmethod
     async def delete(cls, id_or_name: str) -> bool:
         """Delete team by id or name"""
-        teams = await cls._load_teams_from_file()
-        if id_or_name in teams:
-            del teams[id_or_name]
-        else:
-            for team_id, team_data in list(teams.items()):
-                if team_data['name'].lower() == id_or_name.lower():
-                    del teams[team_id]
-                    break
-        if len(teams) < len(await cls._load_teams_from_file()):
-            await cls._save_teams_to_file(teams)
+        storage = get_storage()
+        if await storage.delete('teams', id_or_name):
             return True
+        
+        team_data = await storage.find_one('teams', name=id_or_name)
+        if team_data:
+            return await storage.delete('teams', team_data['id'])
         return False
 
     async def agents(self) -> List[Agent]:
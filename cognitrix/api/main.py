@@ -1,11 +1,14 @@
 import aiofiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 
 from .routes import api_router
 from ..config import FRONTEND_BUILD_DIR
+from ..storage import flush_storage
+from ..llms.clients import close_clients
+from ..llms.metrics import get_metrics
 
 app = FastAPI()
 
@@ -17,12 +20,20 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+@app.on_event('shutdown')
+async def shutdown():
+    await flush_storage()
+    await close_clients()
 
 app.include_router(api_router)
 app.mount('/css', StaticFiles(directory=FRONTEND_BUILD_DIR / 'css', html=True),  name='static')
 app.mount('/assets', StaticFiles(directory=FRONTEND_BUILD_DIR / 'assets', html=True),  name='static')
 app.mount('/webfonts', StaticFiles(directory=FRONTEND_BUILD_DIR / 'webfonts', html=True),  name='static')
 
+@app.get('/metrics')
+async def metrics():
+    return PlainTextResponse(get_metrics().prometheus(), media_type='text/plain; version=0.0.4')
+
 @app.get("/{path:path}")
 async def index(request: Request, path: str):
     index_file = FRONTEND_BUILD_DIR / 'index.html'
@@ -1,6 +1,8 @@
 from fastapi import APIRouter
 from fastapi.responses import JSONResponse
 from ...llms import LLM
+from ...llms.metrics import get_metrics
+from ...llms.resilience import resilience_stats
 
 providers_api = APIRouter(
     prefix='/llms'
@@ -13,6 +15,10 @@ async def list_tools():
     
     return JSONResponse(response)
 
+@providers_api.get('/metrics')
+async def provider_metrics():
+    return JSONResponse({'calls': get_metrics().snapshot(), 'endpoints': resilience_stats()})
+
 @providers_api.get('/{provider_name}')
 async def load_provider(provider_name: str):
     provider = LLM.load_llm(provider_name)
@@ -13,9 +13,7 @@ from functools import lru_cache
 
 from fastapi.responses import JSONResponse
 
-from cognitrix.llms import (
-    Cohere, Clarifai, LLM
-)
+from cognitrix.llms import LLM
 
 from cognitrix.agents import AIAssistant, Agent
 from cognitrix.llms.session import Session
@@ -24,6 +22,7 @@ from cognitrix.utils.ws import WebSocketManager
 from cognitrix.utils.sse import SSEManager
 from cognitrix.agents.templates import ASSISTANT_SYSTEM_PROMPT
 
+from cognitrix.storage import migrate_storage
 from cognitrix.config import VERSION, run_configure
 
 import subprocess
@@ -169,6 +168,43 @@ def manage_tools(args: Namespace):
         logging.exception(e)
         sys.exit(1)
 
+def manage_storage(args: Namespace):
+    try:
+        if args.migrate:
+            run_configure()
+            copied = asyncio.run(migrate_storage())
+            for collection, count in copied.items():
+                print(f"Migrated {count} {collection}")
+            print(f"\nSet COGNITRIX_STORAGE=sqlite to use the migrated data")
+        if args.gc:
+            deleted = asyncio.run(Session.collect_blobs())
+            print(f"Deleted {deleted} unused blobs")
+    except KeyboardInterrupt:
+        print()
+        sys.exit()
+    except Exception as e:
+        logging.exception(e)
+        sys.exit(1)
+
+def start_replay_server(args: Namespace):
+    from cognitrix.llms.replay_llm import Replay
+    from cognitrix.llms.replay_server import serve
+    try:
+        llm = Replay(
+            recording=args.recording,
+            ttft=args.ttft,
+            tokens_per_second=args.tokens_per_second,
+            jitter=args.jitter,
+            seed=args.seed
+        )
+        serve(llm, host=args.host, port=args.port)
+    except KeyboardInterrupt:
+        print()
+        sys.exit()
+    except Exception as e:
+        logging.exception(e)
+        sys.exit(1)
+
 def str_or_file(string):
     if len(string) > 100:
         return string
@@ -230,13 +266,15 @@ def start(args: Namespace):
         provider = None
         if args.provider:
             provider = LLM.load_llm(provider=args.provider)
-        provider = provider() if provider else Clarifai()
+        provider = provider() if provider else LLM.load_llm('clarifai')()
         
         
         if args.api_key:
             provider.api_key = args.api_key
         if args.model:
             provider.model = args.model
+        if args.api_base:
+            provider.base_url = args.api_base
         
         provider.temperature = args.temperature
         if args.system_prompt:
@@ -322,6 +360,21 @@ def get_arguments():
         agents_parser = subparsers.add_parser('tools', help="Manage tools")
         agents_parser.add_argument('-l', '--list', type=str, default='all', nargs='?', choices=['all', 'general', 'system', 'web'], help='List tools by category')
         agents_parser.set_defaults(func=manage_tools)
+        
+        storage_parser = subparsers.add_parser('storage', help="Manage storage")
+        storage_parser.add_argument('--migrate', action='store_true', help='Copy agents, sessions, tasks and teams from the json files into the sqlite database')
+        storage_parser.add_argument('--gc', action='store_true', help='Delete the stored images no session references anymore')
+        storage_parser.set_defaults(func=manage_storage)
+        
+        replay_parser = subparsers.add_parser('replay', help="Serve recorded or echoed llm responses over an OpenAI compatible api")
+        replay_parser.add_argument('recording', type=str, nargs='?', default='', help='Session log or json lines file of {"response": ...} records to replay')
+        replay_parser.add_argument('--host', type=str, default='127.0.0.1', help='Host to listen on')
+        replay_parser.add_argument('--port', type=int, default=8100, help='Port to listen on')
+        replay_parser.add_argument('--ttft', type=float, default=0.0, help='Seconds before the first token')
+        replay_parser.add_argument('--tokens-per-second', type=float, default=0.0, help='Streaming speed, 0 for no delay')
+        replay_parser.add_argument('--jitter', type=float, default=0.0, help='Relative random variation of the delays')
+        replay_parser.add_argument('--seed', type=int, default=None, help='Seed of the jitter')
+        replay_parser.set_defaults(func=start_replay_server)
 
         parser.add_argument('--name', type=str, default='Assistant', help='Set name of agent')
         parser.add_argument('--provider', default='', help='Set llm provider to use')
@@ -1,3 +1,4 @@
+import os
 import asyncio
 import aiofiles
 from pathlib import Path
@@ -11,6 +12,17 @@ TEAMS_FILE = COGNITRIX_WORKDIR / 'teams.json'
 AGENTS_FILE = COGNITRIX_WORKDIR / 'agents.json'
 CONFIG_FILE = COGNITRIX_WORKDIR / 'config.json'
 SESSIONS_FILE = COGNITRIX_WORKDIR / 'sessions.json'
+SESSIONS_DIR = COGNITRIX_WORKDIR / 'sessions'
+DATABASE_FILE = COGNITRIX_WORKDIR / 'cognitrix.db'
+CACHE_DIR = COGNITRIX_WORKDIR / 'cache'
+BLOBS_DIR = COGNITRIX_WORKDIR / 'blobs'
+STORAGE_BACKEND = os.getenv('COGNITRIX_STORAGE', 'json')
+LLM_THREADS = int(os.getenv('COGNITRIX_LLM_THREADS', '16'))
+TOOL_THREADS = int(os.getenv('COGNITRIX_TOOL_THREADS', '8'))
+RATE_LIMITER = os.getenv('COGNITRIX_RATE_LIMITER', 'local')
+RATE_LIMITS_FILE = COGNITRIX_WORKDIR / 'ratelimits.json'
+METRICS_LOG = os.getenv('COGNITRIX_METRICS_LOG', '')
+METRICS_LOG_MAX_BYTES = int(os.getenv('COGNITRIX_METRICS_LOG_MAX_BYTES', str(10 * 1024 * 1024)))
 BASE_DIR = Path(__file__).parent
 FRONTEND_BUILD_DIR = BASE_DIR.joinpath('..', 'frontend', 'dist')
 FRONTEND_STATIC_DIR = FRONTEND_BUILD_DIR.joinpath('assets')
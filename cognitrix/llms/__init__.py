@@ -1,13 +1,10 @@
 from cognitrix.llms.base import LLM
 from cognitrix.llms.base import LLMResponse
-from cognitrix.llms.groq_llm import Groq
-from cognitrix.llms.local_llm import Local
-from cognitrix.llms.cohere_llm import Cohere
-from cognitrix.llms.openai_llm import OpenAI
-from cognitrix.llms.google_llm import Google
-from cognitrix.llms.anthropic_llm import Anthropic
-from cognitrix.llms.together_llm import Together
-from cognitrix.llms.clarifai_llm import Clarifai
-from cognitrix.llms.mindsdb_llm import MindsDB
-from cognitrix.llms.aimlapi_llm import AIMLAPI
-from cognitrix.llms.ollama_llm import Ollama
\ No newline at end of file
+from cognitrix.llms.registry import get_provider
+
+def __getattr__(name: str):
+    """Provider classes are imported on first use, so importing the package loads no provider sdk"""
+    provider = get_provider(name)
+    if provider and provider.__name__ == name:
+        return provider.load()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
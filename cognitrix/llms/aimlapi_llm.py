@@ -15,4 +15,7 @@ class AIMLAPI(OpenAI):
     
     is_multimodal: bool = True
     """Whether the model is multimodal."""
+    
+    stream_usage: bool = False
+    """stream_options is an OpenAI extension which compatible apis may reject"""
     
\ No newline at end of file
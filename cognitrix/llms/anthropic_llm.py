@@ -1,9 +1,11 @@
 from cognitrix.llms.base import LLM
-from cognitrix.utils import image_to_base64
-from typing import Any
+from cognitrix.storage.blobs import message_image_base64
+from typing import Any, Dict, List
 from dotenv import load_dotenv
 from anthropic import AsyncAnthropic as AnthropicLLM
 from cognitrix.llms.base import LLM, LLMResponse
+from cognitrix.llms.clients import get_client, async_http_client
+from cognitrix.llms.call import llm_call
 import logging
 import sys
 import os
@@ -50,72 +52,65 @@ class Anthropic(LLM):
     is_multimodal: bool = True
     """Whether the model is multimodal."""
     
-    def format_query(self, message: dict[str, str]) -> list:
-        """Formats a message for the Claude API.
-
-        Args:
-            message (dict[str, str]): The message to be formatted for the Claude API.
-
-        Returns:
-            list: A list of formatted messages for the Claude API.
-        """
-        
-        formatted_message = [*self.chat_history, message]
+    def format_message(self, message: dict) -> list:
+        """Formats a chat history entry for the Claude API."""
+        if message['type'] == 'text':
+            role = 'assistant' if message['role'].lower() != 'user' else message['role'].lower()
+            return [{
+                "role": role,
+                "content": [
+                    {
+                        "type": "text",
+                        "text": message['message']
+                    }
+                ]
+            }]
         
-        messages = []
-        
-        for fm in formatted_message:
-            if fm['type'] == 'text':
-                role = 'assistant' if fm['role'].lower() != 'user' else fm['role'].lower()
-                messages.append({
-                    "role": role,
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": fm['message']
-                        }
-                    ]
-                })
-            else:
-                base64_image = image_to_base64(fm['image'])
-                messages.append({
-                    "role": fm['role'].lower(),
-                    "content": [
-                        {
-                            "type": "image",
-                            "source": {
-                                "type": "base64",
-                                "media_type": "image/jpeg",
-                                "data": base64_image 
-                            }
-                        },
-                        {
-                            "type": "text",
-                            "text": "This is the result of the latest screenshot"
-                        }
-                    ]
-                })
-            
-        return messages
+        base64_image = message_image_base64(message)
+        return [{
+            "role": message['role'].lower(),
+            "content": [
+                {
+                    "type": "image",
+                    "source": {
+                        "type": "base64",
+                        "media_type": "image/jpeg",
+                        "data": base64_image 
+                    }
+                },
+                {
+                    "type": "text",
+                    "text": message.get('message') or "This is the result of the latest screenshot"
+                }
+            ]
+        }]
 
-    async def __call__(self, query: dict, **kwds: Any):
+    @llm_call
+    async def __call__(self, query: dict, system_prompt: str, chat_history: List[Dict[str, str]] = [], **kwds: Any):
         """Generates a response to a query using the Claude API.
 
         Args:
             query (dict): The query to generate a response to.
+            system_prompt (str): System prompt for the agent
+            chat_history (list): Chat history
             kwds (dict): Additional keyword arguments to pass to the Claude API.
 
         Returns:
             str|None: A string containing the generated response.
         """
 
-        client = AnthropicLLM(api_key=self.api_key)
+        client = self.client or get_client(
+            'anthropic',
+            lambda: AnthropicLLM(api_key=self.api_key, http_client=async_http_client()),
+            api_key=self.api_key,
+            is_async=True
+        )
         stream = await client.messages.create(
             model=self.model,
             max_tokens=self.max_tokens,
             temperature=self.temperature,
-            system=self.system_prompt,
-            messages=self.format_query(query),
+            system=system_prompt,
+            messages=self.format_query(query, chat_history),
             stream=True
         )
         
@@ -124,4 +119,8 @@ class Anthropic(LLM):
         async for event in stream:
             if event.type == 'content_block_delta':
                 response.add_chunk(event.delta.text)
-                yield response
\ No newline at end of file
+                yield response
+            elif event.type == 'message_start':
+                response.usage = {'prompt_tokens': event.message.usage.input_tokens, 'completion_tokens': 0}
+            elif event.type == 'message_delta':
+                response.usage = {**response.usage, 'completion_tokens': event.usage.output_tokens}
\ No newline at end of file
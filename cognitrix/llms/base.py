@@ -1,12 +1,18 @@
 import json
+from collections import OrderedDict
 from pydantic import BaseModel, Field
-from typing import Any, List, Dict, Optional, TypeAlias, TypedDict
-from openai import OpenAI
+from typing import Any, AsyncIterator, List, Dict, Optional, Tuple, TypeAlias, TypedDict
 import logging
-import inspect
+import asyncio
+import contextlib
 
-from cognitrix.utils import xml_to_dict, image_to_base64
+from cognitrix.utils import xml_to_dict
+from cognitrix.utils.xml_stream import XMLStreamParser
 from cognitrix.tools.base import Tool
+from cognitrix.llms.clients import get_client, async_http_client
+from cognitrix.llms.call import llm_call
+from cognitrix.llms.registry import LazyProvider, get_provider, providers
+from cognitrix.storage.blobs import message_image_base64
 
 logging.basicConfig(
     format='%(asctime)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s',
@@ -17,10 +23,27 @@ logger = logging.getLogger('cognitrix.log')
 
 LLMList: TypeAlias = List['LLM']
 
+BatchQuery: TypeAlias = str | Dict[str, Any]
+"""A query of a batch: a chat message or the text of a user message"""
+
+FORMAT_CACHE_SIZE = 4096
+"""Number of formatted chat history entries kept in memory"""
+
+_format_cache: OrderedDict[tuple, tuple] = OrderedDict()
+
 class LLMResponse:
-    """Class to handle and separate LLM responses into text and tool calls."""
+    """Class to handle and separate LLM responses into text and tool calls.
+    
+    By default chunks are parsed incrementally with an ``XMLStreamParser``,
+    so each chunk is only parsed once and attributes are updated as their
+    elements close. Pass ``incremental=False`` to re-parse the full response
+    with ``xml_to_dict`` on every chunk instead.
+    """
+    
+    FIELDS = ('observation', 'mindspace', 'thought', 'type', 'result', 'tool_calls', 'artifacts', 'before', 'after')
+    """Elements of the response format set as attributes. Others are ignored, so they can't overwrite internals like parser or usage"""
     
-    def __init__(self, llm_response: Optional[str]=None):
+    def __init__(self, llm_response: Optional[str]=None, incremental: bool = True):
         self.chunks = []
         self.llm_response = llm_response
         self.current_chunk: str = ''
@@ -30,16 +53,64 @@ class LLMResponse:
         self.artifacts: Optional[Dict[str, Any]] = None
         self.observation: Optional[str] = None
         self.thought: Optional[str] = None
+        self.mindspace: Optional[str] = None
         self.type: Optional[str] = None
         self.before: Optional[str] = None
         self.after: Optional[str] = None
+        self.tools: List[Dict[str, Any]] = []
+        """Tool calls whose closing tag has been received, in order"""
+        self.usage: Dict[str, int] = {}
+        """prompt_tokens and completion_tokens reported by the provider"""
+        
+        self.parser: Optional[XMLStreamParser] = XMLStreamParser() if incremental else None
+        self._before_length = 0
+        """Length of the parser's text before the root element already added to text"""
 
         # self.parse_llm_response()
     
     def add_chunk(self, chunk):
         self.current_chunk = chunk
         self.chunks.append(chunk)
-        self.parse_llm_response()
+        if self.parser:
+            self.parse_chunk(chunk)
+        else:
+            self.parse_llm_response()
+
+    def parse_chunk(self, chunk: str):
+        """Feed a single chunk to the incremental parser"""
+        parser: XMLStreamParser = self.parser # type: ignore
+        events = parser.feed(chunk)
+        
+        if not parser.started:
+            # The leading whitespace is stripped once, then only the new text is added
+            delta = parser.before[self._before_length:]
+            self._before_length = len(parser.before)
+            self.text = self.text + delta if self.text else delta.lstrip()
+            return
+        
+        for event, tag, value in events:
+            if event == 'start':
+                self.text = None
+            elif event == 'element':
+                if tag == 'result':
+                    self.text = value
+                if tag in self.FIELDS:
+                    setattr(self, tag, value)
+            elif event == 'tool':
+                self.tools.append(value)
+            elif event == 'end':
+                if isinstance(value, dict):
+                    self.before = value['before']
+                else:
+                    self.text = value
+        
+        if parser.failed:
+            # The response isn't well-formed xml, so fall back to
+            # parsing it as a whole once the root element is complete
+            if parser.closed:
+                self.parse_llm_response()
+        elif parser.closed and self.before is not None:
+            self.after = parser.after.strip()
 
     def parse_llm_response(self):
         full_response = ''.join(self.chunks)
@@ -52,7 +123,8 @@ class LLMResponse:
                     for key, value in response.items():
                         if key == 'result':
                             self.text = value
-                        setattr(self, key, value)
+                        if key in self.FIELDS:
+                            setattr(self, key, value)
 
                 else:
                     self.text = response
@@ -91,6 +163,9 @@ class LLM(BaseModel):
     max_tokens: int = Field(default=512)
     """The maximum number of tokens to generate in the completion.""" 
     
+    context_window: int = 0
+    """Context window of the model in tokens. Looked up by model name when 0"""
+    
     supports_system_prompt: bool = Field(default=False)
     """Whether the model supports system prompts."""
     
@@ -106,55 +181,105 @@ class LLM(BaseModel):
     supports_tool_use: bool = True
     """Whether the provider supports tool use"""
     
-    client: Any = None
-    """The client object for the llm provider"""
+    cache: bool = False
+    """Whether to cache responses and replay them for identical queries"""
+    
+    requests_per_minute: int = 0
+    """Requests per minute allowed for the provider and api key. 0 for no limit"""
+    
+    tokens_per_minute: int = 0
+    """Tokens per minute allowed for the provider and api key. 0 for no limit"""
+    
+    max_concurrency: int = 0
+    """Maximum number of concurrent requests to the provider from this process. 0 for no limit"""
+    
+    max_retries: int = 3
+    """Retries of a request failing with a transient error, like a timeout or a rate limit"""
+    
+    stream_usage: bool = False
+    """Whether to ask the OpenAI compatible api for the token usage at the end of streams"""
+    
+    client: Any = Field(default=None, exclude=True)
+    """The client object for the llm provider. Shared clients from cognitrix.llms.clients are used when not set"""
     
     def __init__(self, **data):
         super().__init__(**data)
         if not 'provider' in data.keys():
             self.provider = self.__class__.__name__
     
-    def format_query(self, message: dict[str, str], chat_history: List[Dict[str, str]] = []) -> list:
-        """Formats a message for the Claude API.
+    def format_message(self, message: Dict[str, Any]) -> List[Any]:
+        """Formats a chat history entry for the provider api.
 
         Args:
-            message (dict[str, str]): The message to be formatted for the Claude API.
+            message (dict): Chat history entry with role, type and message or image
 
         Returns:
-            list: A list of formatted messages for the Claude API.
+            list: The provider messages for the entry
         """
+        if message['type'] == 'text':
+            return [{
+                "role": message['role'].lower(),
+                "content": message['message']
+            }]
+        elif message['type'] == 'image':
+            base64_image = message_image_base64(message)
+            return [{
+                "role": message['role'].lower(),
+                "content": [
+                    {
+                        "type": "text",
+                        "text": message.get('message') or "This is the result of the latest screenshot"
+                    },
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:image/jpeg;base64,{base64_image}"
+                        }
+                    }
+                ]
+            }]
         
-        formatted_message = [*chat_history, message]
-        
-        messages = []
+        logger.warning(f"Unsupported message type: {message['type']}")
+        return []
+    
+    def _message_key(self, message: Dict[str, Any]) -> Optional[tuple]:
+        """Key of a formatted message in the format cache, None if it can't be cached"""
+        if message.get('type') == 'image':
+            content = message.get('blob') or id(message.get('image'))
+        else:
+            content = message.get('message')
+        key = (self.__class__.__name__, message.get('type'), message.get('role'), content)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+    
+    def format_messages(self, messages: List[Dict[str, Any]]) -> list:
+        """Formats chat history entries for the provider api.
         
-        for fm in formatted_message:
-            if fm['type'] == 'text':
-                messages.append({
-                    "role": fm['role'].lower(),
-                    "content": fm['message']
-                })
-            elif fm['type'] == 'image':
-                base64_image = image_to_base64(fm['image']) # type: ignore
-                messages.append({
-                    "role": fm['role'].lower(),
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": "This is the result of the latest screenshot"
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}"
-                            }
-                        }
-                    ]
-                })
+        Formatted entries are cached, so on every turn only the newly added
+        messages are formatted and images are only encoded once.
+        """
+        formatted = []
+        for message in messages:
+            key = self._message_key(message)
+            cached = _format_cache.get(key) if key else None
+            if cached is None:
+                # The image is kept with the entry so its id isn't reused while cached
+                cached = (message.get('image'), self.format_message(message))
+                if key:
+                    _format_cache[key] = cached
+                    if len(_format_cache) > FORMAT_CACHE_SIZE:
+                        _format_cache.popitem(last=False)
             else:
-                print(fm)
-        
-        return messages
+                _format_cache.move_to_end(key)
+            formatted.extend(cached[1])
+        return formatted
+    
+    def format_query(self, message: Dict[str, Any], chat_history: List[Dict[str, Any]] = []) -> list:
+        """Formats the chat history followed by a new message for the provider api"""
+        return self.format_messages([*chat_history, message])
 
     
     # def format_tools(self, tools: list[dict[str, Any]]):
@@ -178,28 +303,132 @@ class LLM(BaseModel):
     #         self.tools.append(f_tool)
     
     @staticmethod
-    def list_llms():
-        """List all supported LLMs"""
-        try:
-            module = __import__(str(__package__), fromlist=['__init__'])
-            return  [f[1] for f in inspect.getmembers(module, inspect.isclass) if f[0] != 'LLM' and f[0] != 'LLMResponse']
-        except Exception as e:
-            logging.exception(e)
-            return []
+    def list_llms() -> List[LazyProvider]:
+        """List all supported LLMs.
+        
+        The providers are only imported when called, so listing them
+        doesn't load any provider sdk.
+        """
+        return sorted((provider for provider in providers().values() if provider.spec.listed), key=lambda provider: provider.__name__)
     
     @staticmethod
     def load_llm(provider: str):
         """Dynamically load LLMs based on name"""
         try:
-            provider = provider.lower()
-            module = __import__(str(__package__), fromlist=[provider])
-            llm = next((f[1] for f in inspect.getmembers(module, inspect.isclass) if (len(f) and f[0].lower() == provider)), None)
-            
-            return llm
+            llm = get_provider(provider)
+            return llm.load() if llm else None
         except Exception as e:
             logging.exception(e)
             return None
     
+    def metrics(self) -> Dict[str, Any]:
+        """Latency, token and error metrics of the calls made to this provider and model"""
+        from cognitrix.llms.metrics import get_metrics
+        return get_metrics().snapshot(self.provider, self.model or '').get(f"{self.provider}:{self.model or ''}", {})
+    
+    @staticmethod
+    def query_message(query: BatchQuery) -> Dict[str, Any]:
+        """Chat message of a query given as text"""
+        if isinstance(query, str):
+            return {'role': 'User', 'type': 'text', 'message': query}
+        return query
+    
+    async def complete(self, query: BatchQuery, system_prompt: str = '', chat_history: List[Dict[str, Any]] = [], **kwds: Any) -> 'LLMResponse':
+        """Generates the complete response to a query"""
+        response = LLMResponse()
+        async for response in self(self.query_message(query), system_prompt, chat_history, **kwds):
+            pass
+        return response
+    
+    async def as_completed(self, queries: List[BatchQuery], system_prompt: str = '', chat_history: List[Dict[str, Any]] = [], concurrency: int = 8, **kwds: Any) -> AsyncIterator[Tuple[int, 'LLMResponse | Exception']]:
+        """Generates responses to independent queries, at most `concurrency` at a time.
+
+        Yields:
+            tuple: The index of a query and its response, or the exception it raised, as they complete
+        """
+        pending: set[asyncio.Task] = set()
+        indexes: Dict[asyncio.Task, int] = {}
+        remaining = iter(enumerate(queries))
+        
+        def start_next() -> bool:
+            item = next(remaining, None)
+            if item is None:
+                return False
+            task = asyncio.create_task(self.complete(item[1], system_prompt, chat_history, **kwds))
+            indexes[task] = item[0]
+            pending.add(task)
+            return True
+        
+        try:
+            while len(pending) < max(concurrency, 1) and start_next():
+                pass
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    pending.discard(task)
+                    index = indexes.pop(task)
+                    if task.cancelled():
+                        yield index, RuntimeError(f"Query {index} was cancelled")
+                    else:
+                        error = task.exception()
+                        yield index, error if error else task.result()
+                    start_next()
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def batch(self, queries: List[BatchQuery], system_prompt: str = '', chat_history: List[Dict[str, Any]] = [], concurrency: int = 8, return_exceptions: bool = False, native: bool = False, **kwds: Any) -> List['LLMResponse | Exception']:
+        """Generates responses to independent queries, at most `concurrency` at a time.
+
+        Args:
+            queries (list): Chat messages, or texts of user messages
+            system_prompt (str): System prompt shared by the queries
+            chat_history (list): Chat history shared by the queries
+            concurrency (int): Maximum number of requests in flight
+            return_exceptions (bool): Return the exception of a failed query in its place instead of raising it
+            native (bool): Use the provider's batch endpoint when it has one. Cheaper, but can take hours
+
+        Returns:
+            list: The responses, in the order of the queries
+        """
+        if native:
+            try:
+                return await self.native_batch(queries, system_prompt, chat_history, return_exceptions)
+            except NotImplementedError:
+                logger.warning(f"{self.provider} has no batch endpoint, sending the queries separately")
+        
+        results: List[Any] = [None] * len(queries)
+        async with contextlib.aclosing(self.as_completed(queries, system_prompt, chat_history, concurrency, **kwds)) as responses:
+            async for index, result in responses:
+                if isinstance(result, Exception) and not return_exceptions:
+                    raise result
+                results[index] = result
+        return results
+    
+    async def native_batch(self, queries: List[BatchQuery], system_prompt: str = '', chat_history: List[Dict[str, Any]] = [], return_exceptions: bool = False) -> List['LLMResponse | Exception']:
+        """Generates responses to queries with the provider's batch endpoint"""
+        raise NotImplementedError
+    
+    def openai_client(self) -> Any:
+        """Client of the OpenAI compatible api of the provider"""
+        from openai import AsyncOpenAI
+        
+        return self.client or get_client(
+            'openai',
+            lambda: AsyncOpenAI(api_key=self.api_key, base_url=self.base_url or None, http_client=async_http_client()),
+            api_key=self.api_key,
+            base_url=self.base_url,
+            is_async=True
+        )
+    
+    def messages(self, query: Dict[str, Any], system_prompt: str, chat_history: List[Dict[str, Any]] = []) -> List[Dict[str, Any]]:
+        """Messages of a chat completion request"""
+        return [
+            {"role": "user", "content": system_prompt},
+            *self.format_query(query, chat_history)
+        ]
+    
+    @llm_call
     async def __call__(self, query: dict, system_prompt: str, chat_history: List[Dict[str, str]] = [], **kwds: Any):
         """Generates a response to a query using the OpenAI API.
 
@@ -212,25 +441,19 @@ class LLM(BaseModel):
             A string containing the generated response.
         """
 
-        if not self.client:
-            self.client = OpenAI(api_key=self.api_key)
-            if self.base_url:
-                self.client.base_url = self.base_url
-            
-        formatted_messages = self.format_query(query, chat_history)
-        
-        stream = self.client.chat.completions.create(
+        client = self.openai_client()
+        stream = await client.chat.completions.create(
             model=self.model,
-            messages=[
-                {"role": "user", "content": system_prompt},
-                *formatted_messages
-            ],
+            messages=self.messages(query, system_prompt, chat_history),
             temperature=self.temperature,
             max_tokens=self.max_tokens,
             stream=True,
+            **({'stream_options': {'include_usage': True}} if self.stream_usage else {})
         )
         response = LLMResponse()
-        for chunk in stream:
-            if chunk.choices[0].delta.content is not None:
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content is not None:
                 response.add_chunk(chunk.choices[0].delta.content)
-                yield response
\ No newline at end of file
+                yield response
+            if getattr(chunk, 'usage', None):
+                response.usage = {'prompt_tokens': chunk.usage.prompt_tokens, 'completion_tokens': chunk.usage.completion_tokens}
\ No newline at end of file
@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import aiofiles
+from pathlib import Path
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from cognitrix.config import CACHE_DIR
+
+logger = logging.getLogger('cognitrix.log')
+
+class ResponseCache:
+    """
+    Cache of complete LLM responses, stored as the list of streamed chunks.
+
+    Entries are kept in an in-memory LRU and in json files under
+    `~/.cognitrix/cache`. Entries older than `ttl` seconds are ignored and
+    the oldest files are removed once the directory grows past `max_bytes`.
+
+    Args:
+        directory (Path): Directory of the disk tier
+        max_entries (int): Number of responses kept in memory
+        max_bytes (int): Maximum size of the disk tier
+        ttl (float): Seconds a response stays valid
+    """
+
+    def __init__(self, directory: Path = CACHE_DIR, max_entries: int = 256, max_bytes: int = 100 * 1024 * 1024, ttl: float = 7 * 24 * 3600):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._memory: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        self._disk_bytes: Optional[int] = None
+
+    @staticmethod
+    def _default(value: Any) -> Any:
+        if hasattr(value, 'tobytes'):
+            # Images are keyed by their pixels
+            return hashlib.sha256(value.tobytes()).hexdigest()
+        if hasattr(value, 'dict'):
+            return value.dict()
+        return str(value)
+
+    @classmethod
+    def key(cls, **parts: Any) -> str:
+        """Hash of everything the response depends on"""
+        content = json.dumps(parts, sort_keys=True, default=cls._default)
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f'{key}.json'
+
+    def _expired(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry.get('created_at', 0) > self.ttl
+
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[List[str]]:
+        """Returns the chunks of a cached response"""
+        entry = self._memory.get(key)
+        if entry is None:
+            path = self._path(key)
+            if not path.exists():
+                return None
+            try:
+                async with aiofiles.open(path, 'r') as file:
+                    entry = json.loads(await file.read())
+            except (OSError, json.JSONDecodeError):
+                return None
+
+        if self._expired(entry):
+            self._memory.pop(key, None)
+            self._remove(self._path(key))
+            return None
+
+        self._remember(key, entry)
+        return entry['chunks']
+
+    async def set(self, key: str, chunks: List[str]):
+        """Cache the chunks of a response"""
+        entry = {'created_at': time.time(), 'chunks': chunks}
+        self._remember(key, entry)
+
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        content = json.dumps(entry)
+        replaced = self._size(path)
+        async with aiofiles.open(path, 'w') as file:
+            await file.write(content)
+
+        if self._disk_bytes is None:
+            self._disk_bytes = await asyncio.to_thread(self._disk_usage)
+        else:
+            # json.dumps escapes non-ascii characters, so the length is the size in bytes
+            self._disk_bytes += len(content) - replaced
+        if self._disk_bytes > self.max_bytes:
+            self._disk_bytes = await asyncio.to_thread(self._evict)
+
+    @staticmethod
+    def _size(path: Path) -> int:
+        try:
+            return path.stat().st_size
+        except OSError:
+            return 0
+
+    def _remove(self, path: Path):
+        size = self._size(path)
+        path.unlink(missing_ok=True)
+        if self._disk_bytes is not None:
+            self._disk_bytes = max(self._disk_bytes - size, 0)
+
+    def _files(self) -> List[os.DirEntry]:
+        if not self.directory.exists():
+            return []
+        return [entry for folder in os.scandir(self.directory) if folder.is_dir() for entry in os.scandir(folder.path)]
+
+    def _disk_usage(self) -> int:
+        return sum(entry.stat().st_size for entry in self._files())
+
+    def _evict(self) -> int:
+        """Remove the oldest files until the disk tier is under 90% of max_bytes. Returns its new size"""
+        files = sorted(self._files(), key=lambda entry: entry.stat().st_mtime)
+        size = sum(entry.stat().st_size for entry in files)
+        for entry in files:
+            if size <= self.max_bytes * 0.9:
+                break
+            size -= entry.stat().st_size
+            Path(entry.path).unlink(missing_ok=True)
+        return size
+
+    def clear(self):
+        """Remove all cached responses"""
+        self._memory.clear()
+        for entry in self._files():
+            Path(entry.path).unlink(missing_ok=True)
+        self._disk_bytes = 0
+
+_cache: Optional[ResponseCache] = None
+
+def get_cache() -> ResponseCache:
+    """Returns the process-wide response cache"""
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache()
+    return _cache
@@ -0,0 +1,170 @@
+import json
+import time
+import asyncio
+import logging
+import functools
+import contextlib
+from typing import Any, AsyncIterator, Callable
+
+from cognitrix.llms.cache import get_cache
+from cognitrix.llms.context import count_tokens
+from cognitrix.llms.metrics import CallMetrics, get_metrics
+from cognitrix.llms.scheduler import RateLimits, get_scheduler
+from cognitrix.llms.resilience import RetryPolicy, StreamInterruptedError, get_breaker, is_retryable
+
+logger = logging.getLogger('cognitrix.log')
+
+def estimate_prompt_tokens(args: tuple, kwargs: dict) -> int:
+    """Rough number of prompt tokens of a call: its arguments at 4 characters per token"""
+    return len(json.dumps([args, kwargs], default=str)) // 4
+
+def estimate_tokens(llm: Any, args: tuple, kwargs: dict) -> int:
+    """Rough number of tokens a call uses: its arguments and the completion"""
+    return estimate_prompt_tokens(args, kwargs) + (getattr(llm, 'max_tokens', 0) or 0)
+
+def llm_call(func: Callable[..., AsyncIterator[Any]]) -> Callable[..., AsyncIterator[Any]]:
+    """Decorator for the streaming `__call__` of LLM adapters.
+
+    When the llm's `cache` field is set, complete responses are cached,
+    keyed by provider, model, temperature, max_tokens and the call
+    arguments (query, system prompt and chat history). Cached responses are
+    replayed as a stream of chunks.
+
+    Calls to the provider wait for their turn in the scheduler when the llm
+    has rate limits set.
+
+    Transient errors are retried up to `max_retries` times with jittered
+    exponential backoff. When a stream breaks partway, the retried stream
+    is checked against the text already streamed and continues after it;
+    if it differs, StreamInterruptedError is raised. Each endpoint has a
+    circuit breaker failing calls fast while the provider is down.
+
+    The time to first chunk, latency, token usage and outcome of every call
+    are recorded in the metrics registry.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(self, *args: Any, **kwargs: Any):
+        metrics = CallMetrics(self.provider, self.model or '')
+        start = time.perf_counter()
+        response = None
+        try:
+            async with contextlib.aclosing(stream(self, metrics, args, kwargs)) as responses:
+                async for response in responses:
+                    if metrics.ttft is None:
+                        metrics.ttft = time.perf_counter() - start
+                    metrics.chunks += 1
+                    yield response
+        except Exception as e:
+            metrics.error = type(e).__name__
+            raise
+        finally:
+            metrics.latency = time.perf_counter() - start
+            usage = getattr(response, 'usage', None)
+            if usage:
+                metrics.prompt_tokens = usage.get('prompt_tokens') or 0
+                metrics.completion_tokens = usage.get('completion_tokens') or 0
+            elif not metrics.cached:
+                metrics.estimated = True
+                metrics.prompt_tokens = estimate_prompt_tokens(args, kwargs)
+                metrics.completion_tokens = count_tokens(''.join(response.chunks), self.model) if response else 0
+            get_metrics().record(metrics)
+
+    async def stream(self, metrics: CallMetrics, args: tuple, kwargs: dict):
+        key = None
+        if getattr(self, 'cache', False):
+            from cognitrix.llms.base import LLMResponse
+
+            cache = get_cache()
+            key = cache.key(
+                provider=self.provider,
+                model=self.model,
+                temperature=self.temperature,
+                max_tokens=getattr(self, 'max_tokens', None),
+                system_prompt=getattr(self, 'system_prompt', ''),
+                args=args,
+                kwargs=kwargs
+            )
+
+            chunks = await cache.get(key)
+            if chunks is not None:
+                metrics.cached = True
+                response = LLMResponse()
+                for chunk in chunks:
+                    response.add_chunk(chunk)
+                    yield response
+                return
+
+        limits = RateLimits(
+            getattr(self, 'requests_per_minute', 0),
+            getattr(self, 'tokens_per_minute', 0),
+            getattr(self, 'max_concurrency', 0)
+        )
+        scheduler = get_scheduler()
+        tokens = estimate_tokens(self, args, kwargs) if limits.tokens_per_minute else 0
+        bucket = scheduler.key(self.provider, getattr(self, 'api_key', None))
+        base_url = getattr(self, 'base_url', '')
+        breaker = get_breaker(f"{bucket}@{base_url}" if base_url else bucket)
+        policy = RetryPolicy(max_retries=getattr(self, 'max_retries', 0) or 0)
+
+        chunks = []
+        # The response yielded to the caller, kept when a broken stream is resumed
+        output = None
+        streamed = ''
+        attempt = 0
+        while True:
+            breaker.before_request()
+            resuming = bool(streamed)
+            received = ''
+            last = None
+            try:
+                async with scheduler.slot(bucket, limits, tokens):
+                    async for response in func(self, *args, **kwargs):
+                        last = response
+                        chunk = response.current_chunk
+                        if resuming:
+                            # Skip the text the caller already has
+                            received += chunk
+                            if len(received) <= len(streamed):
+                                if not streamed.startswith(received):
+                                    raise StreamInterruptedError(f"{self.provider} returned a different response when resuming a broken stream")
+                                continue
+                            if not received.startswith(streamed):
+                                raise StreamInterruptedError(f"{self.provider} returned a different response when resuming a broken stream")
+                            chunk = received[len(streamed):]
+                            resuming = False
+                            output.add_chunk(chunk) # type: ignore
+                        elif output is not None and response is not output:
+                            output.add_chunk(chunk)
+                        else:
+                            output = response
+                        streamed += chunk
+                        chunks.append(chunk)
+                        yield output
+                if resuming and received != streamed:
+                    raise StreamInterruptedError(f"{self.provider} returned a shorter response when resuming a broken stream")
+                if output is not None and last is not None and last is not output and last.usage:
+                    output.usage = last.usage
+            except StreamInterruptedError:
+                raise
+            except Exception as e:
+                breaker.record_failure(e)
+                if not is_retryable(e) or attempt >= policy.max_retries:
+                    raise
+                delay = policy.delay(attempt, e)
+                attempt += 1
+                breaker.stats.retries += 1
+                breaker.stats.resumed += bool(streamed)
+                logger.warning(f"{self.provider} request failed ({type(e).__name__}: {e}), retry {attempt}/{policy.max_retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            breaker.record_success()
+            break
+
+        if key and chunks:
+            try:
+                await get_cache().set(key, chunks)
+            except OSError as e:
+                logger.warning(f"Couldn't cache llm response: {e}")
+
+    return wrapper
@@ -1,5 +1,7 @@
 from clarifai.client.model import Model
 from cognitrix.llms.base import LLM, LLMResponse
+from cognitrix.llms.clients import get_client, run_sync
+from cognitrix.llms.call import llm_call
 from typing import Any, Dict, List, Optional
 from dotenv import load_dotenv
 import logging
@@ -39,6 +41,7 @@ class Clarifai(LLM):
     is_multimodal: bool = True
     """Whether the model is multimodal."""
 
+    @llm_call
     async def __call__(self, query: dict, system_prompt: str, chat_history: List[Dict[str, str]] = [], **kwds: Any):
         """Generates a response to a query using the Clarifai API.
 
@@ -49,13 +52,17 @@ class Clarifai(LLM):
         Returns:
         A string containing the generated response.
         """
-        if not self.client:
-            self.client = Model(url=self.model, pat=self.api_key)
+        client = self.client or get_client(
+            'clarifai',
+            lambda: Model(url=self.model, pat=self.api_key),
+            api_key=self.api_key,
+            base_url=self.model
+        )
             
         formatted_messages = self.format_query(query, chat_history)
         
         message = f"{system_prompt}\n {json.dumps(formatted_messages)}"
-        result = self.client.predict_by_bytes(message.encode(), input_type="text")
+        result = await run_sync(client.predict_by_bytes, message.encode(), input_type="text")
         response = LLMResponse()
         response.add_chunk(result.outputs[0].data.text.raw)
         yield response
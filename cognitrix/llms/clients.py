@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import threading
+import functools
+import weakref
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+import httpx
+
+from cognitrix.config import LLM_THREADS
+
+logger = logging.getLogger('cognitrix.log')
+
+HTTP2_ENABLED = importlib.util.find_spec('h2') is not None
+"""HTTP/2 is used when the optional h2 package is installed"""
+
+POOL_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=120)
+"""Connection limits of the shared http clients"""
+
+TIMEOUT = httpx.Timeout(600, connect=10)
+
+T = TypeVar('T')
+
+ClientKey = Tuple[str, Optional[str], Optional[str], Hashable]
+
+_lock = threading.Lock()
+_sync_clients: Dict[ClientKey, Any] = {}
+_async_clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[ClientKey, Any]]' = weakref.WeakKeyDictionary()
+_executor = ThreadPoolExecutor(max_workers=LLM_THREADS, thread_name_prefix='cognitrix-llm')
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+def _registry(is_async: bool) -> Dict[ClientKey, Any]:
+    if not is_async:
+        return _sync_clients
+    loop = _running_loop()
+    if loop is None:
+        raise RuntimeError('Async clients can only be created inside a running event loop')
+    if loop not in _async_clients:
+        _async_clients[loop] = {}
+    return _async_clients[loop]
+
+def get_client(provider: str, factory: Callable[[], Any], api_key: Optional[str] = None, base_url: Optional[str] = None, extra: Hashable = None, is_async: bool = False) -> Any:
+    """Returns the shared client for a provider, creating it with factory on first use.
+
+    Clients are keyed by (provider, api_key, base_url, extra) and shared by
+    every LLM instance in the process, so their connection pools are reused
+    across agents and sessions. Async clients are bound to the running event
+    loop, since their connections can't be used from another loop.
+
+    Args:
+        provider (str): Name of the provider
+        factory (Callable): Creates the client
+        api_key (str): Api key the client authenticates with
+        base_url (str): Base url of the api
+        extra (Hashable): Other settings the client depends on
+        is_async (bool): Whether the client is used with async/await
+    """
+    key = (provider, api_key, base_url, extra)
+    with _lock:
+        registry = _registry(is_async)
+        client = registry.get(key)
+        if client is None:
+            client = factory()
+            registry[key] = client
+        return client
+
+def http_client() -> httpx.Client:
+    """Shared keep-alive http client for synchronous sdks"""
+    return get_client('httpx', lambda: httpx.Client(http2=HTTP2_ENABLED, limits=POOL_LIMITS, timeout=TIMEOUT))
+
+def async_http_client() -> httpx.AsyncClient:
+    """Shared keep-alive http client for async sdks in the running event loop"""
+    return get_client('httpx', lambda: httpx.AsyncClient(http2=HTTP2_ENABLED, limits=POOL_LIMITS, timeout=TIMEOUT), is_async=True)
+
+async def close_clients():
+    """Close the async clients of the running event loop"""
+    loop = _running_loop()
+    with _lock:
+        clients = _async_clients.pop(loop, {}) if loop else {}
+
+    for client in clients.values():
+        close = getattr(client, 'aclose', None) or getattr(client, 'close', None)
+        if close is None:
+            continue
+        try:
+            result = close()
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception as e:
+            logger.warning(f"Error closing client: {e}")
+
+async def run_sync(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking sdk call in the llm thread pool, without blocking the event loop.
+    The pool size is set with the COGNITRIX_LLM_THREADS environment variable"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
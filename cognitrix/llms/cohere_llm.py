@@ -1,5 +1,7 @@
 import cohere
 from cognitrix.llms.base import LLM, LLMResponse
+from cognitrix.llms.clients import get_client, async_http_client
+from cognitrix.llms.call import llm_call
 from typing import Any, Dict, List, Optional
 from dotenv import load_dotenv
 import logging
@@ -38,17 +40,12 @@ class Cohere(LLM):
     
     supports_tool_use: bool = False
     
-    def format_query(self, chat_history: List[Dict[str, str]] = []) -> list:
-        """Formats messages for the Gemini API"""
-        formatted_messages = []
-        
-        for fm in chat_history:
-            msg = fm.copy()
-            if fm['role'].lower() != 'user':
-                msg['role'] = 'Chatbot'
-            formatted_messages.append(msg)
-
-        return formatted_messages
+    def format_message(self, message: dict) -> list:
+        """Formats a chat history entry for the Cohere API"""
+        msg = message.copy()
+        if message['role'].lower() != 'user':
+            msg['role'] = 'Chatbot'
+        return [msg]
     
     def format_tools(self, tools: list[dict[str, Any]]):
         """Format tools for the groq sdk"""
@@ -66,6 +63,7 @@ class Cohere(LLM):
             
             # self.tools.append(f_tool)
 
+    @llm_call
     async def __call__(self, query: dict, system_prompt: str, chat_history: List[Dict[str, str]] = [], **kwds: Any):
         """Generates a response to a query using the Cohere API.
 
@@ -77,13 +75,17 @@ class Cohere(LLM):
         A string containing the generated response.
         """
         
-        if not self.client:
-            self.client = cohere.Client(api_key=self.api_key)
+        client = self.client or get_client(
+            'cohere',
+            lambda: cohere.AsyncClient(api_key=self.api_key, httpx_client=async_http_client()),
+            api_key=self.api_key,
+            is_async=True
+        )
         
         response = LLMResponse()
-        chat_history = self.format_query(chat_history)
+        chat_history = self.format_messages(chat_history)
         
-        stream = self.client.chat_stream( 
+        stream = client.chat_stream( 
             model=self.model,
             message=query['message'],
             temperature=self.temperature,
@@ -99,7 +101,7 @@ class Cohere(LLM):
             # ]
         )
         
-        for event in stream:
+        async for event in stream:
             if event.event_type == 'text-generation' or event.event_type == 'tool-calls-chunk':
                 if hasattr(event, 'text'):
                     response.add_chunk(event.text)
@@ -107,5 +109,9 @@ class Cohere(LLM):
                 elif event.event_type == 'stream-end':
                     response.add_chunk(event.response.text)
                     yield response
+            elif event.event_type == 'stream-end':
+                units = getattr(getattr(event.response, 'meta', None), 'billed_units', None)
+                if units:
+                    response.usage = {'prompt_tokens': int(units.input_tokens or 0), 'completion_tokens': int(units.output_tokens or 0)}
         
         # yield response
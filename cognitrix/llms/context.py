@@ -0,0 +1,189 @@
+import json
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger('cognitrix.log')
+
+CONTEXT_WINDOWS: Dict[str, int] = {
+    'gpt-4o': 128000,
+    'gpt-4-turbo': 128000,
+    'gpt-4-32k': 32768,
+    'gpt-4': 8192,
+    'gpt-3.5-turbo': 16385,
+    'o1': 128000,
+    'claude': 200000,
+    'gemini-1.5': 1000000,
+    'gemini': 32768,
+    'command-r': 128000,
+    'llama-3.1': 128000,
+    'llama3.1': 128000,
+    'llama3': 8192,
+    'llama-3': 8192,
+    'mixtral': 32768,
+    'mistral': 32768,
+}
+"""Context window sizes by model name prefix. Longer prefixes win"""
+
+DEFAULT_CONTEXT_WINDOW = 8192
+
+IMAGE_TOKENS = 1000
+"""Approximate number of tokens an image costs"""
+
+MESSAGE_OVERHEAD = 4
+"""Tokens added by the provider around each message"""
+
+def context_window(model: Optional[str]) -> int:
+    """Returns the context window of a model"""
+    name = (model or '').lower().split('/')[-1]
+    for prefix in sorted(CONTEXT_WINDOWS, key=len, reverse=True):
+        if name.startswith(prefix):
+            return CONTEXT_WINDOWS[prefix]
+    return DEFAULT_CONTEXT_WINDOW
+
+_encoders: Dict[str, Optional[Callable[[str], int]]] = {}
+
+def _encoder(model: Optional[str]) -> Optional[Callable[[str], int]]:
+    """tiktoken counter for a model, or None if tiktoken isn't available"""
+    name = model or ''
+    if name not in _encoders:
+        try:
+            import tiktoken
+            try:
+                encoding = tiktoken.encoding_for_model(name)
+            except KeyError:
+                encoding = tiktoken.get_encoding('cl100k_base')
+            _encoders[name] = lambda text: len(encoding.encode(text, disallowed_special=()))
+        except Exception as e:
+            logger.debug(f"Falling back to approximate token counts: {e}")
+            _encoders[name] = None
+    return _encoders[name]
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Count the tokens of a text with tiktoken, or approximate it at 4 characters per token"""
+    encoder = _encoder(model)
+    if encoder:
+        return encoder(text)
+    return (len(text) + 3) // 4
+
+@dataclass
+class ContextSelection:
+    """Messages selected for the context window"""
+
+    messages: List[Dict[str, Any]]
+    """Chat history to send, in order"""
+
+    dropped: List[Dict[str, Any]] = field(default_factory=list)
+    """Messages left out of the context"""
+
+    tokens: int = 0
+    """Tokens of the selected history, system prompt and query"""
+
+    budget: int = 0
+    """Tokens available for the prompt"""
+
+class ContextManager:
+    """
+    Picks which part of the chat history fits in a model's context window.
+
+    Pinned messages, system messages like the task description of a task
+    session and messages flagged with `pinned` like its steps, are always
+    kept, then the most recent messages are added until the budget
+    is used up. Older messages are replaced by a single note saying how
+    many were left out. Token counts are cached per message.
+
+    Args:
+        model (str): Model the messages are counted for
+        window (int): Context window of the model, looked up by model name if not set
+        max_tokens (int): Tokens reserved for the completion
+        margin (float): Fraction of the window kept free for formatting overhead
+    """
+
+    def __init__(self, model: Optional[str], window: Optional[int] = None, max_tokens: int = 0, margin: float = 0.05, cache_size: int = 4096):
+        self.model = model
+        self.window = window or context_window(model)
+        self.max_tokens = max_tokens
+        self.margin = margin
+        self.cache_size = cache_size
+        self._counts: OrderedDict[str, int] = OrderedDict()
+
+    @classmethod
+    def for_llm(cls, llm: Any) -> 'ContextManager':
+        return cls(llm.model, getattr(llm, 'context_window', None), getattr(llm, 'max_tokens', 0) or 0)
+
+    @property
+    def budget(self) -> int:
+        """Tokens available for the prompt"""
+        return max(int(self.window * (1 - self.margin)) - self.max_tokens, 0)
+
+    def message_tokens(self, message: Dict[str, Any]) -> int:
+        """Tokens of a chat message, cached by its content"""
+        if message.get('type') == 'image':
+            return IMAGE_TOKENS + MESSAGE_OVERHEAD
+
+        text = message.get('message', '')
+        if not isinstance(text, str):
+            text = json.dumps(text, default=str)
+        key = hashlib.sha1(f"{message.get('role')}\0{text}".encode()).hexdigest()
+
+        count = self._counts.get(key)
+        if count is None:
+            count = count_tokens(text, self.model) + MESSAGE_OVERHEAD
+            self._counts[key] = count
+            if len(self._counts) > self.cache_size:
+                self._counts.popitem(last=False)
+        else:
+            self._counts.move_to_end(key)
+        return count
+
+    @staticmethod
+    def is_pinned(message: Dict[str, Any]) -> bool:
+        return bool(message.get('pinned')) or str(message.get('role', '')).lower() == 'system'
+
+    def select(self, chat_history: List[Dict[str, Any]], system_prompt: str = '', query: Optional[Dict[str, Any]] = None) -> ContextSelection:
+        """Select the history to send with a query"""
+        used = count_tokens(system_prompt, self.model) if system_prompt else 0
+        if query:
+            used += self.message_tokens(query)
+
+        counts = [self.message_tokens(message) for message in chat_history]
+        total = used + sum(counts)
+        if total <= self.budget:
+            return ContextSelection(list(chat_history), tokens=total, budget=self.budget)
+
+        selected = set()
+        for index, message in enumerate(chat_history):
+            if self.is_pinned(message):
+                selected.add(index)
+                used += counts[index]
+
+        note_tokens = 20
+        for index in range(len(chat_history) - 1, -1, -1):
+            if index in selected:
+                continue
+            if used + counts[index] + note_tokens > self.budget:
+                break
+            selected.add(index)
+            used += counts[index]
+
+        dropped = [message for index, message in enumerate(chat_history) if index not in selected]
+        messages: List[Dict[str, Any]] = []
+        for index, message in enumerate(chat_history):
+            if index in selected:
+                messages.append(message)
+            elif messages and 'elided' in messages[-1]:
+                messages[-1]['elided'] += 1
+            else:
+                messages.append({'role': 'system', 'type': 'text', 'message': '', 'elided': 1})
+
+        for message in messages:
+            if 'elided' in message:
+                message['message'] = f"[{message.pop('elided')} earlier messages were left out to fit the context window]"
+                used += self.message_tokens(message)
+
+        if used > self.budget:
+            logger.warning(f"Prompt uses {used} tokens, more than the {self.budget} available for {self.model}")
+        logger.info(f"Left {len(dropped)} of {len(chat_history)} messages out of the context for {self.model}")
+        return ContextSelection(messages, dropped, used, self.budget)
@@ -1,4 +1,6 @@
 from cognitrix.llms.base import LLM, LLMResponse
+from cognitrix.llms.clients import get_client
+from cognitrix.llms.call import llm_call
 from typing import Any, Dict, List
 import google.generativeai as genai
 from google.generativeai import GenerationConfig
@@ -9,7 +11,7 @@ import sys
 import os
 import io
 
-from cognitrix.utils import image_to_base64
+from cognitrix.storage.blobs import message_image
 
 logging.basicConfig(
     format='%(asctime)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s',
@@ -53,27 +55,30 @@ class Google(LLM):
     is_multimodal: bool = True
     """Whether the model is multimodal."""
     
-    def format_query(self, message: dict[str, str], system_prompt: str, chat_history: List[Dict[str, str]]) -> list:
-        """Formats messages for the Gemini API"""
-        formatted_message = [*chat_history, message]
-        
-        messages = []
-        if system_prompt:
-            messages.append(system_prompt)
-        
-        for fm in formatted_message:
-            if fm['type'] == 'text': 
-                messages.append(fm['message'])
-            elif fm['type'] == 'image':
+    def format_message(self, message: dict) -> list:
+        """Formats a chat history entry for the Gemini API"""
+        if message['type'] == 'text': 
+            return [message['message']]
+        elif message['type'] == 'image':
+            if message.get('blob'):
+                upload_image = message_image(message)
+            else:
                 screenshot_bytes = io.BytesIO()
-                
-                fm['image'].save(screenshot_bytes, format='JPEG') # type: ignore
+                message['image'].save(screenshot_bytes, format='JPEG') # type: ignore
                 upload_image = Image.open(screenshot_bytes)
-                messages.append(upload_image)
-                messages.append('Above is the screenshot')
+            return [upload_image, message.get('message') or 'Above is the screenshot']
+        return []
+    
+    def format_query(self, message: dict[str, str], system_prompt: str, chat_history: List[Dict[str, str]]) -> list:
+        """Formats messages for the Gemini API"""
+        messages = [system_prompt] if system_prompt else []
+        return messages + self.format_messages([*chat_history, message])
 
-        return messages
+    def _create_client(self, generation_config: GenerationConfig) -> genai.GenerativeModel:
+        genai.configure(api_key=self.api_key)
+        return genai.GenerativeModel(model_name=self.model, generation_config=generation_config)
 
+    @llm_call
     async def __call__(self, query: dict, system_prompt: str, chat_history: List[Dict[str, str]] = [], **kwds: Any):
         """Generates a response to a query using the Gemini API.
 
@@ -84,8 +89,6 @@ class Google(LLM):
         Returns:
         A string containing the generated response.
         """
-        genai.configure(api_key=self.api_key)
-
         generation_config = GenerationConfig(
             temperature=self.temperature,
             top_p=0.95,
@@ -95,18 +98,25 @@ class Google(LLM):
         
         contents = self.format_query(query, system_prompt, chat_history)
 
-        if not self.client:
-            self.client = genai.GenerativeModel(model_name=self.model, generation_config=generation_config)
+        client = self.client or get_client(
+            'google',
+            lambda: self._create_client(generation_config),
+            api_key=self.api_key,
+            extra=(self.model, self.temperature, self.max_tokens)
+        )
         
         response = LLMResponse()
         
-        stream =  self.client.generate_content(
+        stream = await client.generate_content_async(
             contents,
             stream=True
         )
-        for chunk in stream:
+        async for chunk in stream:
             response.add_chunk(chunk.text)
             yield response
+            usage = getattr(chunk, 'usage_metadata', None)
+            if usage:
+                response.usage = {'prompt_tokens': usage.prompt_token_count, 'completion_tokens': usage.candidates_token_count}
             
         # response.parse_llm_response()
         # yield response
@@ -1,4 +1,3 @@
-from groq import Groq as GroqLLM
 from cognitrix.llms.base import LLM, LLMResponse
 from typing import Any, Dict, List, Optional
 from dotenv import load_dotenv
@@ -1,7 +1,9 @@
-from openai import OpenAI as OpenAILLM
+from openai import AsyncOpenAI as OpenAILLM
 from cognitrix.llms.base import LLM, LLMResponse
-from cognitrix.utils import image_to_base64
-from typing import Any, Optional
+from cognitrix.llms.clients import get_client, async_http_client
+from cognitrix.llms.call import llm_call
+from cognitrix.storage.blobs import message_image_base64
+from typing import Any, Dict, List, Optional
 from dotenv import load_dotenv
 import logging
 import sys
@@ -56,69 +58,74 @@ class Local(LLM):
     system_prompt: str = ""
     """System prompt to prepend to queries"""
     
-    def format_query(self, message: dict[str, str]) -> list:
-        """Formats a message for the Claude API.
+    def format_message(self, message: dict) -> list:
+        """Formats a chat history entry for the chat completions API."""
+        if message['type'] == 'text':
+            return [{
+                "role": message['role'].lower(),
+                "content": message['message']
+            }]
+        
+        base64_image = message_image_base64(message)
+        return [{
+            "role": message['role'].lower(),
+            "content": [
+                {
+                    "type": "text",
+                    "text": message.get('message') or "This is the result of the latest screenshot"
+                },
+                {
+                    "type": "image_url",
+                    "image_url": f"data:image/jpeg;base64,{base64_image}"
+                }
+            ]
+        }]
 
-        Args:
-            message (dict[str, str]): The message to be formatted for the Claude API.
+    def select_model(self, messages: List[Dict[str, Any]]) -> str:
+        """Use the vision model when the messages contain an image"""
+        return self.vision_model if any(message['type'] == 'image' for message in messages) else self.model
 
-        Returns:
-            list: A list of formatted messages for the Claude API.
-        """
-        
-        formatted_message = [*self.chat_history, message]
-        
-        messages = []
-        
-        for fm in formatted_message:
-            if fm['type'] == 'text':
-                messages.append({
-                    "role": fm['role'].lower(),
-                    "content": fm['message']
-                })
-            else:
-                base64_image = image_to_base64(fm['image'])
-                self.model = self.vision_model
-                messages.append({
-                    "role": fm['role'].lower(),
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": "This is the result of the latest screenshot"
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": f"data:image/jpeg;base64,{base64_image}"
-                        }
-                    ]
-                })
-            
-        return messages
+    def messages(self, query: Dict[str, Any], system_prompt: str, chat_history: List[Dict[str, Any]] = []) -> List[Dict[str, Any]]:
+        """Messages of a chat completion request"""
+        return [
+            {"role": "system", "content": system_prompt},
+            *self.format_query(query, chat_history)
+        ]
 
-    def __call__(self, query: dict, **kwds: dict):
+    @llm_call
+    async def __call__(self, query: dict, system_prompt: str, chat_history: List[Dict[str, str]] = [], **kwds: Any):
         """Generates a response to a query using the OpenAI API.
 
         Args:
             query (dict): The query to generate a response to.
+            system_prompt (str): System prompt for the agent
+            chat_history (list): Chat history
             kwds (dict): Additional keyword arguments to pass to the OpenAI API.
 
         Returns:
             A string containing the generated response.
         """
         
-        if not self.client:
-            self.client = OpenAILLM(base_url=self.base_url, api_key=self.api_key)
-        
-        formatted_messages = self.format_query(query)
+        client = self.client or get_client(
+            'local',
+            lambda: OpenAILLM(base_url=self.base_url, api_key=self.api_key, http_client=async_http_client()),
+            api_key=self.api_key,
+            base_url=self.base_url,
+            is_async=True
+        )
         
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": self.system_prompt},
-                *formatted_messages
-            ],
+        stream = await client.chat.completions.create(
+            model=self.select_model([*chat_history, query]),
+            messages=self.messages(query, system_prompt, chat_history),
             temperature=self.temperature,
-            max_tokens=self.max_tokens
+            max_tokens=self.max_tokens,
+            stream=True
         )
-            
-        return LLMResponse(response.choices[0].message.content)                   #type: ignore
+        
+        response = LLMResponse()
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content is not None:
+                response.add_chunk(chunk.choices[0].delta.content)
+                yield response
+            if getattr(chunk, 'usage', None):
+                response.usage = {'prompt_tokens': chunk.usage.prompt_tokens, 'completion_tokens': chunk.usage.completion_tokens}
@@ -0,0 +1,224 @@
+import json
+import time
+import logging
+import logging.handlers
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from cognitrix.config import METRICS_LOG, METRICS_LOG_MAX_BYTES
+
+logger = logging.getLogger('cognitrix.log')
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+"""Upper bounds in seconds of the latency histogram buckets"""
+
+@dataclass
+class CallMetrics:
+    """Measurements of a single llm call"""
+
+    provider: str
+    model: str
+    started_at: float = field(default_factory=time.time)
+    ttft: Optional[float] = None
+    """Seconds to the first chunk"""
+    latency: float = 0.0
+    """Seconds to the end of the stream"""
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    estimated: bool = False
+    """Whether the token counts are estimates because the provider didn't report usage"""
+    chunks: int = 0
+    cached: bool = False
+    error: Optional[str] = None
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """Completion tokens per second after the first chunk"""
+        streaming = self.latency - (self.ttft or 0)
+        if not self.completion_tokens or streaming <= 0:
+            return None
+        return self.completion_tokens / streaming
+
+    def dict(self) -> Dict[str, Any]:
+        return {**asdict(self), 'tokens_per_second': self.tokens_per_second}
+
+class Histogram:
+    """Cumulative histogram in the Prometheus layout"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q quantile, or the largest bound if it's above all of them"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, count in zip(self.buckets, self.counts):
+            if count >= rank:
+                return bound
+        return self.buckets[-1]
+
+@dataclass
+class ModelStats:
+    """Aggregated metrics of the calls to a provider and model"""
+
+    calls: int = 0
+    errors: int = 0
+    cached: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    ttft: Histogram = field(default_factory=Histogram)
+    latency: Histogram = field(default_factory=Histogram)
+    tokens_per_second: Histogram = field(default_factory=lambda: Histogram((5, 10, 20, 40, 80, 160, 320, 640, 1280)))
+
+    def dict(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'error_rate': self.errors / self.calls if self.calls else 0.0,
+            'cached': self.cached,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'ttft_p50': self.ttft.quantile(0.5),
+            'ttft_p99': self.ttft.quantile(0.99),
+            'latency_p50': self.latency.quantile(0.5),
+            'latency_p99': self.latency.quantile(0.99),
+            'tokens_per_second_p50': self.tokens_per_second.quantile(0.5),
+        }
+
+class MetricsRegistry:
+    """
+    In-process registry of llm call metrics.
+
+    Every call is aggregated per provider and model and, when `log_path`
+    is set, written as a json line to the metrics log, which is rotated
+    once it reaches `max_bytes`. The aggregates can be exported in the
+    Prometheus text format.
+
+    Args:
+        log_path (str): Json lines file of the calls, empty to disable
+        max_bytes (int): Size at which the log is rotated
+        backups (int): Rotated logs kept
+    """
+
+    def __init__(self, log_path: str = METRICS_LOG, max_bytes: int = METRICS_LOG_MAX_BYTES, backups: int = 3):
+        self.stats: Dict[Tuple[str, str], ModelStats] = {}
+        self.log_path = log_path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._log: Optional[logging.Logger] = None
+
+    def _json_log(self) -> logging.Logger:
+        if self._log is None:
+            self._log = logging.getLogger('cognitrix.metrics')
+            self._log.propagate = False
+            self._log.setLevel(logging.INFO)
+            if not self._log.handlers:
+                try:
+                    handler = logging.handlers.RotatingFileHandler(self.log_path, maxBytes=self.max_bytes, backupCount=self.backups, delay=True)
+                    handler.setFormatter(logging.Formatter('%(message)s'))
+                    self._log.addHandler(handler)
+                except OSError as e:
+                    logger.warning(f"Couldn't open the metrics log: {e}")
+        return self._log
+
+    def record(self, metrics: CallMetrics):
+        key = (metrics.provider, metrics.model or '')
+        stats = self.stats.setdefault(key, ModelStats())
+        stats.calls += 1
+        stats.errors += metrics.error is not None
+        stats.cached += metrics.cached
+        stats.prompt_tokens += metrics.prompt_tokens
+        stats.completion_tokens += metrics.completion_tokens
+        if not metrics.cached:
+            if metrics.ttft is not None:
+                stats.ttft.observe(metrics.ttft)
+            if metrics.error is None:
+                stats.latency.observe(metrics.latency)
+                if metrics.tokens_per_second:
+                    stats.tokens_per_second.observe(metrics.tokens_per_second)
+
+        if self.log_path:
+            self._json_log().info(json.dumps(metrics.dict()))
+
+    def snapshot(self, provider: Optional[str] = None, model: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Aggregates keyed by 'provider:model', optionally of a single provider or model"""
+        return {
+            f"{key[0]}:{key[1]}": stats.dict()
+            for key, stats in self.stats.items()
+            if (provider is None or key[0] == provider) and (model is None or key[1] == model)
+        }
+
+    @staticmethod
+    def _labels(**labels: str) -> str:
+        escaped = (name + '="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"' for name, value in labels.items())
+        return '{' + ','.join(escaped) + '}'
+
+    def prometheus(self) -> str:
+        """The metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+
+        def counter(name: str, help: str, attribute: str):
+            lines.extend([f'# HELP {name} {help}', f'# TYPE {name} counter'])
+            for (provider, model), stats in self.stats.items():
+                lines.append(f'{name}{self._labels(provider=provider, model=model)} {getattr(stats, attribute)}')
+
+        def histogram(name: str, help: str, attribute: str):
+            lines.extend([f'# HELP {name} {help}', f'# TYPE {name} histogram'])
+            for (provider, model), stats in self.stats.items():
+                values: Histogram = getattr(stats, attribute)
+                for bound, count in zip(values.buckets, values.counts):
+                    lines.append(f'{name}_bucket{self._labels(provider=provider, model=model, le=str(bound))} {count}')
+                lines.append(f'{name}_bucket{self._labels(provider=provider, model=model, le="+Inf")} {values.count}')
+                lines.append(f'{name}_sum{self._labels(provider=provider, model=model)} {values.sum}')
+                lines.append(f'{name}_count{self._labels(provider=provider, model=model)} {values.count}')
+
+        counter('cognitrix_llm_calls_total', 'LLM calls', 'calls')
+        counter('cognitrix_llm_errors_total', 'LLM calls that failed', 'errors')
+        counter('cognitrix_llm_cache_hits_total', 'LLM calls answered from the response cache', 'cached')
+        counter('cognitrix_llm_prompt_tokens_total', 'Prompt tokens sent', 'prompt_tokens')
+        counter('cognitrix_llm_completion_tokens_total', 'Completion tokens received', 'completion_tokens')
+        histogram('cognitrix_llm_ttft_seconds', 'Time to the first chunk', 'ttft')
+        histogram('cognitrix_llm_latency_seconds', 'Time to the end of the response', 'latency')
+        histogram('cognitrix_llm_tokens_per_second', 'Completion tokens per second after the first chunk', 'tokens_per_second')
+
+        from cognitrix.llms.resilience import resilience_stats
+        endpoints = resilience_stats()
+        if endpoints:
+            lines.extend(['# HELP cognitrix_llm_retries_total Retried llm requests', '# TYPE cognitrix_llm_retries_total counter'])
+            lines.extend(f'cognitrix_llm_retries_total{self._labels(endpoint=endpoint)} {stats["retries"]}' for endpoint, stats in endpoints.items())
+            lines.extend(['# HELP cognitrix_llm_rejected_total Requests failed fast by an open circuit breaker', '# TYPE cognitrix_llm_rejected_total counter'])
+            lines.extend(f'cognitrix_llm_rejected_total{self._labels(endpoint=endpoint)} {stats["rejected"]}' for endpoint, stats in endpoints.items())
+            lines.extend(['# HELP cognitrix_llm_circuit_open Whether the circuit breaker of an endpoint is open', '# TYPE cognitrix_llm_circuit_open gauge'])
+            lines.extend(f'cognitrix_llm_circuit_open{self._labels(endpoint=endpoint)} {int(stats["state"] != "closed")}' for endpoint, stats in endpoints.items())
+
+        from cognitrix.tools.executor import tool_stats
+        tools = tool_stats()
+        if tools:
+            lines.extend(['# HELP cognitrix_tool_calls_total Tool calls', '# TYPE cognitrix_tool_calls_total counter'])
+            lines.extend(f'cognitrix_tool_calls_total{self._labels(tool=tool)} {stats["calls"]}' for tool, stats in tools.items())
+            lines.extend(['# HELP cognitrix_tool_errors_total Tool calls that failed', '# TYPE cognitrix_tool_errors_total counter'])
+            lines.extend(f'cognitrix_tool_errors_total{self._labels(tool=tool)} {stats["errors"]}' for tool, stats in tools.items())
+            lines.extend(['# HELP cognitrix_tool_seconds_total Seconds spent running tools', '# TYPE cognitrix_tool_seconds_total counter'])
+            lines.extend(f'cognitrix_tool_seconds_total{self._labels(tool=tool)} {stats["total_time"]}' for tool, stats in tools.items())
+
+        return '\n'.join(lines) + '\n'
+
+_registry: Optional[MetricsRegistry] = None
+
+def get_metrics() -> MetricsRegistry:
+    """Returns the process-wide metrics registry"""
+    global _registry
+    if _registry is None:
+        _registry = MetricsRegistry()
+    return _registry
@@ -11,4 +11,7 @@ class MindsDB(OpenAI):
     base_url: str = 'https://llm.mdb.ai'
     
     is_multimodal: bool = True
-    """Whether the model is multimodal."""
\ No newline at end of file
+    """Whether the model is multimodal."""
+    
+    stream_usage: bool = False
+    """stream_options is an OpenAI extension which compatible apis may reject"""
\ No newline at end of file
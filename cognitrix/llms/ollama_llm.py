@@ -1,8 +1,10 @@
 from cognitrix.llms.base import LLM, LLMResponse
-from cognitrix.utils import image_to_base64
-from typing import Any, Optional
+from cognitrix.llms.clients import get_client
+from cognitrix.llms.call import llm_call
+from cognitrix.storage.blobs import message_image_base64
+from typing import Any, Dict, List, Optional
 from dotenv import load_dotenv
-from ollama import Client
+from ollama import AsyncClient
 import logging
 import sys
 import os
@@ -56,61 +58,53 @@ class Ollama(LLM):
     system_prompt: str = ""
     """System prompt to prepend to queries"""
     
-    def format_query(self, message: dict[str, str]) -> list:
-        """Formats a message for the Claude API.
-
-        Args:
-            message (dict[str, str]): The message to be formatted for the Claude API.
-
-        Returns:
-            list: A list of formatted messages for the Claude API.
-        """
+    def format_message(self, message: dict) -> list:
+        """Formats a chat history entry for the Ollama API."""
+        if message['type'] == 'text':
+            return [{
+                "role": message['role'].lower(),
+                "content": message['message']
+            }]
         
-        formatted_message = [*self.chat_history, message]
-        
-        messages = []
-        
-        for fm in formatted_message:
-            if fm['type'] == 'text':
-                messages.append({
-                    "role": fm['role'].lower(),
-                    "content": fm['message']
-                })
-            else:
-                base64_image = image_to_base64(fm['image'])
-                self.model = self.vision_model
-                new_message = {
-                    "role": fm['role'].lower(),
-                    "content": "This is the result of the latest screenshot",
-                    "images": [base64_image]
-                }
-                messages.append(new_message)
-            
-        return messages
+        base64_image = message_image_base64(message)
+        return [{
+            "role": message['role'].lower(),
+            "content": message.get('message') or "This is the result of the latest screenshot",
+            "images": [base64_image]
+        }]
 
-    def __call__(self, query: dict, **kwds: dict):
-        """Generates a response to a query using the OpenAI API.
+    def select_model(self, messages: List[Dict[str, Any]]) -> str:
+        """Use the vision model when the messages contain an image"""
+        return self.vision_model if any(message['type'] == 'image' for message in messages) else self.model
+
+    @llm_call
+    async def __call__(self, query: dict, system_prompt: str, chat_history: List[Dict[str, str]] = [], **kwds: Any):
+        """Generates a response to a query using the Ollama API.
 
         Args:
             query (dict): The query to generate a response to.
-            kwds (dict): Additional keyword arguments to pass to the OpenAI API.
+            system_prompt (str): System prompt for the agent
+            chat_history (list): Chat history
+            kwds (dict): Additional keyword arguments to pass to the Ollama API.
 
         Returns:
             A string containing the generated response.
         """
         
-        if not self.client:
-            self.client = Client('http://localhost:11434')
-        
-        formatted_messages = self.format_query(query)
+        client = self.client or get_client('ollama', lambda: AsyncClient(self.base_url), base_url=self.base_url, is_async=True)
         
-        response = self.client.chat(
-            model=self.model,
-            messages=[
-                {"role": "user", "content": self.system_prompt},
-                *formatted_messages
-            ],
-            stream=False,
+        stream = await client.chat(
+            model=self.select_model([*chat_history, query]),
+            messages=self.messages(query, system_prompt, chat_history),
+            options={'temperature': self.temperature, 'num_predict': self.max_tokens},
+            stream=True,
         )
         
-        return LLMResponse(response['message']['content'])                        #type: ignore
+        response = LLMResponse()
+        async for part in stream:
+            content = part.get('message', {}).get('content')
+            if content:
+                response.add_chunk(content)
+                yield response
+            if part.get('done'):
+                response.usage = {'prompt_tokens': part.get('prompt_eval_count', 0), 'completion_tokens': part.get('eval_count', 0)}
@@ -1,10 +1,11 @@
-from openai import OpenAI as OpenAILLM
-from cognitrix.llms.base import LLM, LLMResponse
+from cognitrix.llms.base import LLM, LLMResponse, BatchQuery
 from cognitrix.tools.base import Tool
 from cognitrix.utils import image_to_base64
-from typing import Any, List, Optional
+from typing import Any, Dict, List, Optional
 from dotenv import load_dotenv
 import logging
+import asyncio
+import json
 import sys
 import os
 
@@ -52,4 +53,67 @@ class OpenAI(LLM):
     """System prompt to prepend to queries"""
     
     is_multimodal: bool = True
-    """Whether the model is multimodal."""
\ No newline at end of file
+    """Whether the model is multimodal."""
+    
+    stream_usage: bool = True
+    """Whether to ask the OpenAI api for the token usage at the end of streams"""
+    
+    batch_poll_interval: float = 30
+    """Seconds between checks of the status of a batch job"""
+    
+    async def native_batch(self, queries: List[BatchQuery], system_prompt: str = '', chat_history: List[Dict[str, Any]] = [], return_exceptions: bool = False) -> List[LLMResponse | Exception]:
+        """Generates responses to queries with the OpenAI Batch API.
+
+        The requests are uploaded as a jsonl file and the batch job is polled
+        every `batch_poll_interval` seconds until it ends, which can take up
+        to 24 hours.
+        """
+        if self.base_url:
+            # OpenAI compatible servers rarely implement the batch endpoints
+            raise NotImplementedError
+        
+        client = self.openai_client()
+        requests = [
+            json.dumps({
+                'custom_id': str(index),
+                'method': 'POST',
+                'url': '/v1/chat/completions',
+                'body': {
+                    'model': self.model,
+                    'messages': self.messages(self.query_message(query), system_prompt, chat_history),
+                    'temperature': self.temperature,
+                    'max_tokens': self.max_tokens
+                }
+            })
+            for index, query in enumerate(queries)
+        ]
+        batch_file = await client.files.create(file=('batch.jsonl', '\n'.join(requests).encode()), purpose='batch')
+        job = await client.batches.create(input_file_id=batch_file.id, endpoint='/v1/chat/completions', completion_window='24h')
+        
+        while job.status not in ('completed', 'failed', 'expired', 'cancelled'):
+            await asyncio.sleep(self.batch_poll_interval)
+            job = await client.batches.retrieve(job.id)
+        
+        results: List[Any] = [RuntimeError(f"Batch {job.id} {job.status} without a response") for _ in queries]
+        for file_id in (job.output_file_id, job.error_file_id):
+            if not file_id:
+                continue
+            content = await client.files.content(file_id)
+            for line in content.text.splitlines():
+                if not line.strip():
+                    continue
+                result = json.loads(line)
+                body = (result.get('response') or {}).get('body') or {}
+                if body.get('choices'):
+                    response = LLMResponse()
+                    response.add_chunk(body['choices'][0]['message']['content'] or '')
+                    results[int(result['custom_id'])] = response
+                else:
+                    error = result.get('error') or body.get('error') or 'unknown error'
+                    results[int(result['custom_id'])] = RuntimeError(f"Batch request failed: {error}")
+        
+        if not return_exceptions:
+            error = next((result for result in results if isinstance(result, Exception)), None)
+            if error:
+                raise error
+        return results
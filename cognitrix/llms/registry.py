@@ -0,0 +1,105 @@
+import logging
+import importlib
+import importlib.util
+from dataclasses import dataclass
+from importlib.metadata import entry_points
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger('cognitrix.log')
+
+ENTRY_POINT_GROUP = 'cognitrix.llms'
+"""Entry point group of llm providers installed by other packages"""
+
+@dataclass(frozen=True)
+class ProviderSpec:
+    """Where a provider class lives and what it needs, known without importing it"""
+
+    name: str
+    """Class name of the provider"""
+    target: str
+    """'module:Class' path of the provider class"""
+    description: str = ''
+    sdk: str = ''
+    """Module of the sdk the provider needs"""
+    api_key_env: str = ''
+    """Environment variable holding the api key"""
+    listed: bool = True
+    """Whether the provider is offered in provider lists"""
+
+    @property
+    def available(self) -> bool:
+        """Whether the sdk of the provider is installed"""
+        if not self.sdk:
+            return True
+        try:
+            return importlib.util.find_spec(self.sdk) is not None
+        except ModuleNotFoundError:
+            return False
+
+PROVIDERS: List[ProviderSpec] = [
+    ProviderSpec('AIMLAPI', 'cognitrix.llms.aimlapi_llm:AIMLAPI', 'AI/ML API models', 'openai', 'AIMLAPI_API_KEY'),
+    ProviderSpec('Anthropic', 'cognitrix.llms.anthropic_llm:Anthropic', 'Claude models', 'anthropic', 'ANTHROPIC_API_KEY'),
+    ProviderSpec('Clarifai', 'cognitrix.llms.clarifai_llm:Clarifai', 'Models hosted on Clarifai', 'clarifai', 'CLARIFAI_ACCESS_TOKEN'),
+    ProviderSpec('Cohere', 'cognitrix.llms.cohere_llm:Cohere', 'Command models', 'cohere', 'CO_API_KEY'),
+    ProviderSpec('Google', 'cognitrix.llms.google_llm:Google', 'Gemini models', 'google.generativeai', 'GOOGLE_API_KEY'),
+    ProviderSpec('Groq', 'cognitrix.llms.groq_llm:Groq', 'Models hosted on Groq', 'openai', 'GROQ_API_KEY'),
+    ProviderSpec('Local', 'cognitrix.llms.local_llm:Local', 'OpenAI compatible local server', 'openai'),
+    ProviderSpec('MindsDB', 'cognitrix.llms.mindsdb_llm:MindsDB', 'Minds hosted on MindsDB', 'openai', 'MINDS_API_KEY'),
+    ProviderSpec('Ollama', 'cognitrix.llms.ollama_llm:Ollama', 'Models served by Ollama', 'ollama'),
+    ProviderSpec('OpenAI', 'cognitrix.llms.openai_llm:OpenAI', 'GPT models', 'openai', 'OPENAI_API_KEY'),
+    ProviderSpec('Replay', 'cognitrix.llms.replay_llm:Replay', 'Scripted or recorded responses, offline', listed=False),
+    ProviderSpec('Router', 'cognitrix.llms.router:Router', 'Hedged requests over several providers', listed=False),
+    ProviderSpec('Together', 'cognitrix.llms.together_llm:Together', 'Models hosted on Together', 'openai', 'TOGETHER_API_KEY'),
+]
+"""Built-in providers"""
+
+class LazyProvider:
+    """
+    A provider class imported on first use.
+
+    It has the `__name__` of the class and calling it creates an instance,
+    so it can stand in for the class in provider lists.
+    """
+
+    def __init__(self, spec: ProviderSpec):
+        self.spec = spec
+        self.__name__ = spec.name
+        self._cls: Optional[type] = None
+
+    def load(self) -> type:
+        """Import the provider class"""
+        if self._cls is None:
+            module, _, name = self.spec.target.partition(':')
+            self._cls = getattr(importlib.import_module(module), name)
+        return self._cls
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self.load()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"<provider {self.spec.name} ({self.spec.target})>"
+
+_providers: Optional[Dict[str, LazyProvider]] = None
+
+def providers() -> Dict[str, LazyProvider]:
+    """Built-in providers and those registered under the 'cognitrix.llms' entry point group, by lowercase name"""
+    global _providers
+    if _providers is None:
+        registry = {spec.name.lower(): LazyProvider(spec) for spec in PROVIDERS}
+        try:
+            for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+                if entry_point.name.lower() in registry:
+                    logger.warning(f"Provider '{entry_point.name}' from {entry_point.value} is already registered")
+                    continue
+                registry[entry_point.name.lower()] = LazyProvider(ProviderSpec(entry_point.name, entry_point.value))
+        except Exception as e:
+            logger.warning(f"Couldn't read the llm provider entry points: {e}")
+        _providers = registry
+    return _providers
+
+def register_provider(spec: ProviderSpec):
+    """Register a provider, replacing any with the same name"""
+    providers()[spec.name.lower()] = LazyProvider(spec)
+
+def get_provider(name: str) -> Optional[LazyProvider]:
+    return providers().get(name.lower())
@@ -0,0 +1,141 @@
+import re
+import json
+import random
+import asyncio
+import logging
+import aiofiles
+from xml.sax.saxutils import escape
+from pydantic import PrivateAttr
+from typing import Any, Dict, List, Optional
+
+from cognitrix.llms.base import LLM, LLMResponse
+from cognitrix.llms.call import llm_call
+
+logger = logging.getLogger('cognitrix.log')
+
+class Replay(LLM):
+    """
+    Offline provider streaming scripted or recorded responses.
+
+    Responses are taken in turn from `responses`, or from the `recording`
+    file when it's empty, and streamed word by word with a configurable
+    time to first token, speed and jitter. Without any response, the
+    query is echoed back as a final answer.
+
+    Args:
+        responses (list): Responses to stream, in turn
+        recording (str): Path of a session log or of a json lines file of {"response": ...} records
+        ttft (float): Seconds before the first token
+        tokens_per_second (float): Streaming speed after the first token
+        jitter (float): Relative random variation of the delays
+        seed (int): Seed of the jitter
+    """
+
+    model: str = 'replay'
+    """model endpoint to use"""
+
+    responses: List[str] = []
+    """Responses to stream, in turn. Read from `recording` when empty"""
+
+    recording: str = ''
+    """Path of a json lines file with the responses to replay: a session log, or lines of {"response": "..."}"""
+
+    ttft: float = 0.0
+    """Seconds before the first token"""
+
+    tokens_per_second: float = 0.0
+    """Streaming speed after the first token. 0 to stream without delay"""
+
+    jitter: float = 0.0
+    """Relative random variation of the delays, e.g. 0.2 for +/-20%"""
+
+    seed: Optional[int] = None
+    """Seed of the jitter, for repeatable runs"""
+
+    supports_system_prompt: bool = True
+    """Flag to indicate if system prompt should be supported"""
+
+    is_multimodal: bool = True
+    """Whether the model is multimodal."""
+
+    _turn: int = PrivateAttr(default=0)
+    _random: random.Random = PrivateAttr(default_factory=random.Random)
+    _loaded: bool = PrivateAttr(default=False)
+
+    def __init__(self, **data):
+        super().__init__(**data)
+        self._random = random.Random(self.seed)
+
+    @staticmethod
+    def parse_recording(content: str) -> List[str]:
+        """Responses of a recording. In a session log, they are the text messages of the agents"""
+        responses = []
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(record, dict):
+                continue
+            if 'response' in record:
+                responses.append(str(record['response']))
+            elif record.get('type') == 'text' and str(record.get('role', '')).lower() not in ('user', 'system'):
+                responses.append(str(record.get('message', '')))
+        return responses
+
+    async def load_recording(self):
+        if self._loaded or self.responses or not self.recording:
+            return
+        async with aiofiles.open(self.recording, 'r') as file:
+            self.responses = self.parse_recording(await file.read())
+        self._loaded = True
+        if not self.responses:
+            logger.warning(f"No responses found in {self.recording}")
+
+    @staticmethod
+    def echo(query: Dict[str, Any]) -> str:
+        message = query.get('message', '') if isinstance(query, dict) else str(query)
+        if not isinstance(message, str):
+            message = json.dumps(message, default=str)
+        return f"<response>\n<type>final_answer</type>\n<result>{escape(message)}</result>\n</response>"
+
+    def next_response(self, query: Dict[str, Any]) -> str:
+        """The response to a query: the next scripted one, or the query echoed back"""
+        if not self.responses:
+            return self.echo(query)
+        response = self.responses[self._turn % len(self.responses)]
+        self._turn += 1
+        return response
+
+    @staticmethod
+    def tokens(text: str) -> List[str]:
+        """Split a response into the chunks streamed, roughly one per word"""
+        return re.findall(r'\s*\S+|\s+$', text)
+
+    def delay(self, seconds: float) -> float:
+        if self.jitter:
+            seconds *= max(1 + self._random.uniform(-self.jitter, self.jitter), 0)
+        return seconds
+
+    @llm_call
+    async def __call__(self, query: dict, system_prompt: str = '', chat_history: List[Dict[str, Any]] = [], **kwds: Any):
+        """Streams the next response.
+
+        Args:
+            query (dict): The query to generate a response to.
+            system_prompt (str): System prompt for the agent
+            chat_history (list): Chat history
+        """
+        await self.load_recording()
+        text = self.next_response(query)
+
+        response = LLMResponse()
+        if self.ttft:
+            await asyncio.sleep(self.delay(self.ttft))
+        for index, token in enumerate(self.tokens(text)):
+            if index and self.tokens_per_second:
+                await asyncio.sleep(self.delay(1 / self.tokens_per_second))
+            response.add_chunk(token)
+            yield response
@@ -0,0 +1,77 @@
+import json
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from cognitrix.llms.replay_llm import Replay
+
+def message_text(content: Any) -> str:
+    """Text of the content of an OpenAI chat message"""
+    if isinstance(content, list):
+        return '\n'.join(part.get('text', '') for part in content if isinstance(part, dict) and part.get('type') == 'text')
+    return content or ''
+
+def create_app(llm: Optional[Replay] = None) -> FastAPI:
+    """
+    OpenAI compatible server streaming the responses of a Replay llm.
+
+    Point any OpenAI compatible provider at it, e.g.
+    `Local(base_url='http://127.0.0.1:8100/v1')`, to run the agent loop
+    without a real model.
+    """
+    replay = llm or Replay()
+    app = FastAPI(title='Cognitrix replay server')
+
+    def chunk(completion_id: str, created: int, model: str, delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+        data = {
+            'id': completion_id,
+            'object': 'chat.completion.chunk',
+            'created': created,
+            'model': model,
+            'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]
+        }
+        return f"data: {json.dumps(data)}\n\n"
+
+    @app.get('/v1/models')
+    async def models():
+        return JSONResponse({'object': 'list', 'data': [{'id': replay.model, 'object': 'model', 'created': 0, 'owned_by': 'cognitrix'}]})
+
+    @app.post('/v1/chat/completions')
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages: List[Dict[str, Any]] = body.get('messages', [])
+        model = body.get('model') or replay.model
+        query = {'role': 'User', 'type': 'text', 'message': message_text(messages[-1].get('content')) if messages else ''}
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+
+        if body.get('stream'):
+            async def events():
+                yield chunk(completion_id, created, model, {'role': 'assistant', 'content': ''})
+                async for response in replay(query):
+                    yield chunk(completion_id, created, model, {'content': response.current_chunk})
+                yield chunk(completion_id, created, model, {}, 'stop')
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type='text/event-stream')
+
+        content = ''
+        async for response in replay(query):
+            content = ''.join(response.chunks)
+        return JSONResponse({
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': created,
+            'model': model,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': len(Replay.tokens(content)), 'total_tokens': len(Replay.tokens(content))}
+        })
+
+    return app
+
+def serve(llm: Optional[Replay] = None, host: str = '127.0.0.1', port: int = 8100):
+    import uvicorn
+    uvicorn.run(create_app(llm), host=host, port=port)
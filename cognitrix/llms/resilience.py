@@ -0,0 +1,165 @@
+import time
+import random
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger('cognitrix.log')
+
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504, 520, 522, 524, 529}
+"""Http statuses of transient provider errors"""
+
+RETRYABLE_NAMES = (
+    'timeout', 'connection', 'network', 'transport', 'ratelimit', 'overloaded',
+    'unavailable', 'internalserver', 'deadlineexceeded', 'resourceexhausted', 'remoteprotocol'
+)
+"""Parts of the class names of transient errors raised by the provider sdks"""
+
+class CircuitOpenError(Exception):
+    """Raised without calling the provider while its circuit breaker is open"""
+
+class StreamInterruptedError(Exception):
+    """Raised when a broken stream can't be resumed because the retried response differs"""
+
+def status_code(error: BaseException) -> Optional[int]:
+    """Http status of a provider error, if it has one"""
+    for attribute in ('status_code', 'http_status', 'status', 'code'):
+        value = getattr(error, attribute, None)
+        if isinstance(value, int) and 100 <= value < 600:
+            return value
+    response = getattr(error, 'response', None)
+    value = getattr(response, 'status_code', None)
+    return value if isinstance(value, int) else None
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an error is transient: a timeout, a dropped connection, a rate limit or a server error"""
+    if isinstance(error, (CircuitOpenError, StreamInterruptedError)):
+        return False
+    status = status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    names = [cls.__name__.lower() for cls in type(error).__mro__]
+    return any(part in name for name in names for part in RETRYABLE_NAMES)
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the provider asked to wait before retrying"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+@dataclass
+class RetryPolicy:
+    """Jittered exponential backoff between attempts"""
+
+    max_retries: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+
+    def delay(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        """Seconds to wait before retry number `attempt`, starting at 0"""
+        requested = retry_after(error) if error else None
+        if requested is not None:
+            return min(requested, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+@dataclass
+class EndpointStats:
+    """Counters of the requests to an endpoint"""
+
+    requests: int = 0
+    failures: int = 0
+    retries: int = 0
+    resumed: int = 0
+    """Streams resumed after breaking partway"""
+    rejected: int = 0
+    """Requests failed fast while the circuit was open"""
+    circuit_opened: int = 0
+    errors: Dict[str, int] = field(default_factory=dict)
+    """Failures by error class"""
+
+class CircuitBreaker:
+    """
+    Fails requests to an endpoint fast while it's down.
+
+    The circuit opens after `failure_threshold` consecutive failures. While
+    open, requests are rejected with CircuitOpenError. After `reset_timeout`
+    seconds a single trial request is let through: the circuit closes if it
+    succeeds and opens again if it fails.
+
+    Args:
+        name (str): Name of the endpoint, for logs
+        failure_threshold (int): Consecutive failures opening the circuit
+        reset_timeout (float): Seconds before a trial request
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial = False
+        self.stats = EndpointStats()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if self.trial or time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def before_request(self):
+        """Raises CircuitOpenError if the request can't go ahead"""
+        self.stats.requests += 1
+        state = self.state
+        if state == 'closed':
+            return
+        if state == 'half_open' and not self.trial:
+            self.trial = True
+            return
+        self.stats.rejected += 1
+        raise CircuitOpenError(f"{self.name} is unavailable, failing fast for up to {self.reset_timeout:.0f}s after its last failure")
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+
+    def record_failure(self, error: BaseException):
+        self.stats.failures += 1
+        name = type(error).__name__
+        self.stats.errors[name] = self.stats.errors.get(name, 0) + 1
+        if not is_retryable(error):
+            # Bad requests say nothing about the health of the provider
+            self.trial = False
+            return
+        self.failures += 1
+        if self.trial or self.failures >= self.failure_threshold:
+            if self.opened_at is None or self.trial:
+                self.stats.circuit_opened += 1
+                logger.error(f"Circuit breaker of {self.name} opened after {self.failures} failures: {error}")
+            self.opened_at = time.monotonic()
+            self.trial = False
+
+    def dict(self) -> Dict[str, Any]:
+        return {'state': self.state, 'consecutive_failures': self.failures, **self.stats.__dict__}
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+def get_breaker(key: str) -> CircuitBreaker:
+    """Circuit breaker of an endpoint"""
+    if key not in _breakers:
+        _breakers[key] = CircuitBreaker(key)
+    return _breakers[key]
+
+def resilience_stats() -> Dict[str, Dict[str, Any]]:
+    """State and counters of the circuit breaker of every endpoint"""
+    return {key: breaker.dict() for key, breaker in _breakers.items()}
@@ -0,0 +1,191 @@
+import math
+import time
+import asyncio
+import logging
+from collections import deque
+from pydantic import PrivateAttr
+from typing import Any, Deque, Dict, List, Optional
+
+from cognitrix.llms.base import LLM
+from cognitrix.llms.context import context_window
+
+logger = logging.getLogger('cognitrix.log')
+
+class LatencyStats:
+    """Time to first token and outcome counts of a route"""
+
+    def __init__(self, window: int = 1000):
+        self.ttft: Deque[float] = deque(maxlen=window)
+        """Seconds to the first token of the latest requests"""
+        self.requests = 0
+        self.errors = 0
+        self.hedges = 0
+        """Requests started because an earlier route was too slow"""
+        self.wins = 0
+        """Requests whose stream was used"""
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.ttft:
+            return None
+        samples = sorted(self.ttft)
+        return samples[max(math.ceil(p * len(samples)) - 1, 0)]
+
+    def dict(self) -> Dict[str, Any]:
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'hedges': self.hedges,
+            'wins': self.wins,
+            'ttft_p50': self.percentile(0.5),
+            'ttft_p90': self.percentile(0.9),
+            'ttft_p99': self.percentile(0.99),
+        }
+
+class Router(LLM):
+    """
+    Routes queries over an ordered list of llms.
+
+    The first route is queried, and if its first token doesn't arrive
+    within `hedge_after` seconds the next route is queried as well. The
+    stream that produces a token first is used and the others are
+    cancelled. When a route fails before producing a token, the next one
+    takes over.
+
+    Args:
+        routes (list): Settings of the llms, each with a provider name and the fields of that provider
+        hedge_after (float): Seconds to wait for the first token before hedging, 0 to only fail over on errors
+    """
+
+    routes: List[Dict[str, Any]] = []
+    """Settings of the llms to route to, in order, e.g. {'provider': 'openai', 'model': 'gpt-4o'}"""
+
+    hedge_after: float = 2.0
+    """Seconds to wait for the first token before also querying the next route. 0 to only fail over on errors"""
+
+    supports_system_prompt: bool = True
+
+    _llms: Optional[List[LLM]] = PrivateAttr(default=None)
+    _stats: Dict[str, LatencyStats] = PrivateAttr(default_factory=dict)
+
+    def __init__(self, **data):
+        super().__init__(**data)
+        if self.routes:
+            self.model = self.model or self.routes[0].get('model')
+            if not self.context_window:
+                self.context_window = min(route.get('context_window') or context_window(route.get('model')) for route in self.routes)
+
+    @staticmethod
+    def route_name(llm: LLM) -> str:
+        return f"{llm.provider}:{llm.model}"
+
+    def llms(self) -> List[LLM]:
+        """The llms of the routes, loaded on first use"""
+        if self._llms is None:
+            llms = []
+            for route in self.routes:
+                settings = dict(route)
+                provider = LLM.load_llm(settings.pop('provider', ''))
+                if not provider or provider is Router:
+                    raise ValueError(f"Unknown llm provider in route {route}")
+                llms.append(provider(**settings))
+            self._llms = llms
+        return self._llms
+
+    def stats(self, name: str = 'router') -> LatencyStats:
+        if name not in self._stats:
+            self._stats[name] = LatencyStats()
+        return self._stats[name]
+
+    def latency_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Time to first token percentiles and counts per route, and of the router as a whole under 'router'"""
+        return {name: stats.dict() for name, stats in self._stats.items()}
+
+    async def __call__(self, *args: Any, **kwds: Any):
+        """Streams the response of the fastest route.
+
+        Takes the same arguments as the llms of the routes.
+        """
+        llms = self.llms()
+        if not llms:
+            raise ValueError("Router has no routes")
+
+        events: asyncio.Queue = asyncio.Queue()
+        tasks: Dict[int, asyncio.Task] = {}
+        started = time.perf_counter()
+        deadline = started + self.hedge_after
+        winner: Optional[int] = None
+        error: Optional[BaseException] = None
+
+        async def run(index: int, llm: LLM):
+            start = time.perf_counter()
+            first = True
+            try:
+                async for response in llm(*args, **kwds):
+                    if first:
+                        first = False
+                        await events.put((index, 'first', time.perf_counter() - start))
+                    await events.put((index, 'chunk', response))
+                await events.put((index, 'done', None))
+            except Exception as e:
+                await events.put((index, 'error', e))
+
+        def start_next(hedge: bool = False) -> bool:
+            nonlocal deadline
+            index = len(tasks)
+            if index >= len(llms):
+                return False
+            stats = self.stats(self.route_name(llms[index]))
+            stats.requests += 1
+            stats.hedges += hedge
+            self.stats().hedges += hedge
+            tasks[index] = asyncio.create_task(run(index, llms[index]))
+            deadline = time.perf_counter() + self.hedge_after
+            return True
+
+        self.stats().requests += 1
+        start_next()
+        try:
+            while True:
+                timeout = None
+                if winner is None and self.hedge_after > 0 and len(tasks) < len(llms):
+                    timeout = max(deadline - time.perf_counter(), 0)
+                try:
+                    index, event, value = await asyncio.wait_for(events.get(), timeout)
+                except asyncio.TimeoutError:
+                    logger.info(f"No token from {self.route_name(llms[len(tasks) - 1])} after {time.perf_counter() - started:.1f}s, hedging")
+                    start_next(hedge=True)
+                    continue
+
+                if winner is not None and index != winner:
+                    continue
+
+                name = self.route_name(llms[index])
+                if event == 'first':
+                    winner = index
+                    self.stats(name).ttft.append(value)
+                    self.stats(name).wins += 1
+                    self.stats().ttft.append(time.perf_counter() - started)
+                    for other, task in tasks.items():
+                        if other != index:
+                            task.cancel()
+                elif event == 'chunk':
+                    yield value
+                elif event == 'done':
+                    if winner is None:
+                        # The route finished without any tokens, treat it as the winner
+                        self.stats(name).wins += 1
+                    return
+                elif event == 'error':
+                    self.stats(name).errors += 1
+                    error = value
+                    if winner is not None:
+                        self.stats().errors += 1
+                        raise value
+                    logger.warning(f"Route {name} failed: {value}")
+                    running = [task for other, task in tasks.items() if other != index and not task.done()]
+                    if not running and not start_next():
+                        self.stats().errors += 1
+                        raise error
+        finally:
+            for task in tasks.values():
+                task.cancel()
@@ -0,0 +1,268 @@
+import json
+import time
+import heapq
+import asyncio
+import hashlib
+import logging
+import itertools
+import contextvars
+from enum import IntEnum
+from abc import ABC, abstractmethod
+from pathlib import Path
+from dataclasses import dataclass
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from cognitrix.config import RATE_LIMITER, RATE_LIMITS_FILE
+
+logger = logging.getLogger('cognitrix.log')
+
+class Priority(IntEnum):
+    """Priority classes of llm requests. Lower values go first"""
+    INTERACTIVE = 0
+    DEFAULT = 1
+    BACKGROUND = 2
+
+_priority: contextvars.ContextVar[Priority] = contextvars.ContextVar('llm_priority', default=Priority.DEFAULT)
+
+@contextmanager
+def request_priority(priority: Priority) -> Iterator[None]:
+    """Run the llm requests made inside the block, including in tasks it starts, with a priority"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def set_priority(priority: Priority) -> contextvars.Token:
+    """Set the priority of the llm requests made by the current task"""
+    return _priority.set(priority)
+
+def current_priority() -> Priority:
+    return _priority.get()
+
+@dataclass(frozen=True)
+class RateLimits:
+    """Limits of a (provider, api key) pair. 0 means unlimited"""
+
+    requests_per_minute: int = 0
+    tokens_per_minute: int = 0
+    max_concurrency: int = 0
+
+    @property
+    def limited(self) -> bool:
+        return bool(self.requests_per_minute or self.tokens_per_minute or self.max_concurrency)
+
+def take_from_buckets(state: Dict[str, float], now: float, limits: RateLimits, tokens: int) -> float:
+    """Refill the request and token buckets in state and take one request and `tokens` tokens from them.
+
+    Returns:
+        float: 0 if the request can go ahead, otherwise the seconds to wait before trying again
+    """
+    rpm, tpm = limits.requests_per_minute, limits.tokens_per_minute
+    elapsed = max(now - state.get('updated_at', now), 0)
+    requests = min(rpm, state.get('requests', rpm) + elapsed * rpm / 60) if rpm else 0
+    available = min(tpm, state.get('tokens', tpm) + elapsed * tpm / 60) if tpm else 0
+    # A request larger than the bucket can only wait for a full bucket
+    tokens = min(tokens, tpm)
+
+    wait = 0.0
+    if rpm and requests < 1:
+        wait = max(wait, (1 - requests) * 60 / rpm)
+    if tpm and available < tokens:
+        wait = max(wait, (tokens - available) * 60 / tpm)
+
+    if not wait:
+        requests -= 1 if rpm else 0
+        available -= tokens if tpm else 0
+    state.update(requests=requests, tokens=available, updated_at=now)
+    return wait
+
+class Coordinator(ABC):
+    """Keeps the rate limit buckets, possibly shared between processes"""
+
+    @abstractmethod
+    async def take(self, key: str, limits: RateLimits, tokens: int) -> float:
+        """Take a request from the buckets of key. Returns the seconds to wait if they are empty"""
+
+class LocalCoordinator(Coordinator):
+    """Buckets kept in memory, for a single process"""
+
+    def __init__(self):
+        self.buckets: Dict[str, Dict[str, float]] = {}
+
+    async def take(self, key: str, limits: RateLimits, tokens: int) -> float:
+        return take_from_buckets(self.buckets.setdefault(key, {}), time.time(), limits, tokens)
+
+class FileCoordinator(Coordinator):
+    """Buckets kept in a json file locked with flock, shared by the processes of a host"""
+
+    def __init__(self, path: Path = RATE_LIMITS_FILE):
+        import fcntl
+        self._fcntl = fcntl
+        self.path = Path(path)
+
+    def _take(self, key: str, limits: RateLimits, tokens: int) -> float:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a+') as file:
+            self._fcntl.flock(file, self._fcntl.LOCK_EX)
+            try:
+                file.seek(0)
+                content = file.read()
+                buckets = json.loads(content) if content else {}
+                wait = take_from_buckets(buckets.setdefault(key, {}), time.time(), limits, tokens)
+                file.seek(0)
+                file.truncate()
+                file.write(json.dumps(buckets))
+                file.flush()
+                return wait
+            finally:
+                self._fcntl.flock(file, self._fcntl.LOCK_UN)
+
+    async def take(self, key: str, limits: RateLimits, tokens: int) -> float:
+        return await asyncio.to_thread(self._take, key, limits, tokens)
+
+class RedisCoordinator(Coordinator):
+    """Buckets kept in redis, shared by every process using the server"""
+
+    SCRIPT = """
+    local now = tonumber(ARGV[1])
+    local rpm = tonumber(ARGV[2])
+    local tpm = tonumber(ARGV[3])
+    local tokens = math.min(tonumber(ARGV[4]), tpm)
+    local state = redis.call('HMGET', KEYS[1], 'requests', 'tokens', 'updated_at')
+    local elapsed = math.max(now - (tonumber(state[3]) or now), 0)
+    local requests = 0
+    local available = 0
+    if rpm > 0 then requests = math.min(rpm, (tonumber(state[1]) or rpm) + elapsed * rpm / 60) end
+    if tpm > 0 then available = math.min(tpm, (tonumber(state[2]) or tpm) + elapsed * tpm / 60) end
+    local wait = 0
+    if rpm > 0 and requests < 1 then wait = math.max(wait, (1 - requests) * 60 / rpm) end
+    if tpm > 0 and available < tokens then wait = math.max(wait, (tokens - available) * 60 / tpm) end
+    if wait == 0 then
+        if rpm > 0 then requests = requests - 1 end
+        if tpm > 0 then available = available - tokens end
+    end
+    redis.call('HSET', KEYS[1], 'requests', requests, 'tokens', available, 'updated_at', now)
+    redis.call('EXPIRE', KEYS[1], 120)
+    return tostring(wait)
+    """
+
+    def __init__(self, url: str):
+        from redis.asyncio import Redis
+        self.redis = Redis.from_url(url)
+        self._script = self.redis.register_script(self.SCRIPT)
+
+    async def take(self, key: str, limits: RateLimits, tokens: int) -> float:
+        wait = await self._script(
+            keys=[f'cognitrix:ratelimit:{key}'],
+            args=[time.time(), limits.requests_per_minute, limits.tokens_per_minute, tokens]
+        )
+        return float(wait)
+
+class _Queue:
+    """Waiting requests and running count of a (provider, api key) pair"""
+
+    def __init__(self):
+        self.waiting: List[Tuple[int, int]] = []
+        self.running = 0
+        self.changed = asyncio.Condition()
+
+class Scheduler:
+    """
+    Rate limits and orders llm requests per (provider, api key).
+
+    Requests wait in a priority queue until they are first in line, a
+    concurrency slot is free and the coordinator's token buckets allow
+    their requests/min and tokens/min. Interactive chats therefore go
+    ahead of background task steps.
+
+    Concurrency is limited per process; the buckets are shared through the
+    coordinator.
+
+    Args:
+        coordinator (Coordinator): Keeps the token buckets
+    """
+
+    def __init__(self, coordinator: Optional[Coordinator] = None):
+        self.coordinator = coordinator or LocalCoordinator()
+        self._queues: Dict[Tuple[asyncio.AbstractEventLoop, str], _Queue] = {}
+        self._counter = itertools.count()
+
+    @staticmethod
+    def key(provider: str, api_key: Optional[str]) -> str:
+        """Bucket key of a provider and api key, without the key itself"""
+        return f"{provider.lower()}:{hashlib.sha256((api_key or '').encode()).hexdigest()[:16]}"
+
+    def _queue(self, key: str) -> _Queue:
+        loop_key = (asyncio.get_running_loop(), key)
+        if loop_key not in self._queues:
+            self._queues = {k: v for k, v in self._queues.items() if not k[0].is_closed()}
+            self._queues[loop_key] = _Queue()
+        return self._queues[loop_key]
+
+    @asynccontextmanager
+    async def slot(self, key: str, limits: RateLimits, tokens: int = 0, priority: Optional[Priority] = None) -> AsyncIterator[None]:
+        """Wait for the turn of a request and hold a concurrency slot while it runs"""
+        if not limits.limited:
+            yield
+            return
+
+        queue = self._queue(key)
+        entry = (int(priority if priority is not None else current_priority()), next(self._counter))
+        heapq.heappush(queue.waiting, entry)
+        try:
+            while True:
+                async with queue.changed:
+                    await queue.changed.wait_for(
+                        lambda: queue.waiting[0] == entry and (not limits.max_concurrency or queue.running < limits.max_concurrency)
+                    )
+                wait = await self.coordinator.take(key, limits, tokens)
+                if not wait:
+                    break
+                logger.info(f"Rate limit of {key.split(':')[0]} reached, waiting {wait:.1f}s")
+                await asyncio.sleep(wait)
+        except BaseException:
+            queue.waiting.remove(entry)
+            heapq.heapify(queue.waiting)
+            await self._notify(queue)
+            raise
+
+        heapq.heappop(queue.waiting)
+        queue.running += 1
+        await self._notify(queue)
+        try:
+            yield
+        finally:
+            queue.running -= 1
+            await self._notify(queue)
+
+    @staticmethod
+    async def _notify(queue: _Queue):
+        async with queue.changed:
+            queue.changed.notify_all()
+
+_scheduler: Optional[Scheduler] = None
+
+def get_scheduler() -> Scheduler:
+    """Returns the scheduler, with the coordinator selected with the COGNITRIX_RATE_LIMITER
+    environment variable: 'local' (default), 'file' or a redis url"""
+    global _scheduler
+    if _scheduler is None:
+        coordinator: Coordinator
+        try:
+            if RATE_LIMITER.startswith(('redis://', 'rediss://', 'unix://')):
+                coordinator = RedisCoordinator(RATE_LIMITER)
+            elif RATE_LIMITER == 'file':
+                coordinator = FileCoordinator()
+            else:
+                coordinator = LocalCoordinator()
+        except ImportError as e:
+            logger.warning(f"Rate limiter '{RATE_LIMITER}' isn't available ({e}), limiting per process")
+            coordinator = LocalCoordinator()
+        _scheduler = Scheduler(coordinator)
+    return _scheduler
+
+def set_scheduler(scheduler: Scheduler):
+    global _scheduler
+    _scheduler = scheduler
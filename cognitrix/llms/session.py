@@ -2,17 +2,21 @@ import uuid
 import asyncio
 import logging
 import logging
-import aiofiles
 from rich import print
-from flask import json
 from datetime import datetime
-from pydantic import BaseModel, Field
-from typing import IO, Any, Callable, List, Literal, Optional, Dict, Self
+from pydantic import BaseModel, Field, PrivateAttr
+from typing import IO, Any, AsyncIterator, Callable, List, Literal, Optional, Dict, Self, Set
 
 from cognitrix.agents import Agent
 from cognitrix.agents import AIAssistant
-from cognitrix.config import SESSIONS_FILE
+from cognitrix.storage import get_storage
+from cognitrix.storage.session_log import SessionLog
+from cognitrix.storage.blobs import get_blob_store
+from cognitrix.config import SESSIONS_DIR
 from cognitrix.llms.base import LLMResponse
+from cognitrix.llms.context import ContextManager, ContextSelection
+from cognitrix.utils.stream import ChunkCoalescer
+from cognitrix.utils.screen import ScreenCapture, screen_capture
 
 logger = logging.getLogger('cognitrix.log')
 
@@ -41,53 +45,103 @@ class Session(BaseModel):
     pid: Optional[str] = None
     """Worker Id of task"""
     
-    @classmethod
-    async def _load_sessions_from_file(cls) -> Dict[str, Dict]:
-        async with aiofiles.open(SESSIONS_FILE, 'r') as file:
-            content = await file.read()
-            return json.loads(content) if content else {}
-
-    @classmethod
-    async def _save_sessions_to_file(cls, sessions: Dict[str, Dict]):
-        async with aiofiles.open(SESSIONS_FILE, 'w') as file:
-            await file.write(json.dumps(sessions, indent=4))
-
+    _saved_messages: int = PrivateAttr(default=0)
+    """Number of chat messages already written to the session log"""
+    
+    _context_manager: Optional[ContextManager] = PrivateAttr(default=None)
+    
+    _screen: ScreenCapture = PrivateAttr(default_factory=ScreenCapture)
+    """Screen capture of the screenshot and mouse tools called in this session"""
+    
+    context: Optional[ContextSelection] = Field(default=None, exclude=True)
+    """Chat history sent with the last query, and the messages left out of it"""
+    
+    @property
+    def log(self) -> SessionLog:
+        """Append-only log holding the chat history"""
+        return SessionLog(self.id)
+    
     async def save(self):
-        """Save current session"""
-        sessions = await self._load_sessions_from_file()
-        sessions[self.id] = self.dict()
-        await self._save_sessions_to_file(sessions)
+        """Save current session
+        
+        The session metadata is saved to the storage backend, while new chat
+        messages are appended to the session log. The log is only rewritten
+        when the history was cleared or shortened.
+        """
+        await get_storage().save('sessions', self.id, self.dict(exclude={'chat'}))
+        
+        if len(self.chat) < self._saved_messages:
+            await self.log.rewrite(self.chat)
+        elif len(self.chat) > self._saved_messages:
+            await self.log.append(self.chat[self._saved_messages:])
+        self._saved_messages = len(self.chat)
         return self.id
+    
+    @classmethod
+    async def _from_data(cls, session_data: Dict[str, Any], limit: Optional[int] = None, load_chat: bool = True) -> Self:
+        """Build a session from its metadata, reading the chat from its log
+        
+        Sessions saved before the log existed keep their chat inline, which
+        is moved to the log the next time they are saved.
+        """
+        session = cls(**session_data)
+        if not load_chat:
+            session.chat = []
+        elif session.log.exists():
+            session.chat = await (session.log.tail(limit) if limit else session.log.read())
+            session._saved_messages = len(session.chat)
+        elif limit:
+            session.chat = session.chat[-limit:]
+        return session
 
     @classmethod
-    async def load(cls, session_id: Optional[str]) -> Self:
-        """Load an existing session or create a new one if it doesn't exist"""
-        sessions = await cls._load_sessions_from_file()
+    async def load(cls, session_id: Optional[str], limit: Optional[int] = None) -> Self:
+        """Load an existing session or create a new one if it doesn't exist
+        
+        Args:
+            session_id (str): Id of the session to load
+            limit (int): Only load the last `limit` chat messages
+        """
         session_data = None
         if session_id:
-            session_data = sessions.get(session_id)
+            session_data = await get_storage().get('sessions', session_id)
         
         if not session_data:
             new_session = cls()
             await new_session.save()
-            session_data =  new_session.dict()
+            return new_session
             
-        return cls(**session_data)
+        return await cls._from_data(session_data, limit)
 
     @classmethod
-    async def list_sessions(cls) -> List[Self]:
-        sessions = await cls._load_sessions_from_file()
-        return [cls(**session_data) for session_data in sessions.values()]
+    async def list_sessions(cls, load_chat: bool = False) -> List[Self]:
+        """List saved sessions. The chat history is only read with load_chat"""
+        sessions = await get_storage().all('sessions')
+        return [await cls._from_data(session_data, load_chat=load_chat) for session_data in sessions.values()]
 
     @classmethod
     async def delete(cls, session_id: str):
-        """Delete session by id"""
-        sessions = await cls._load_sessions_from_file()
-        if session_id in sessions:
-            del sessions[session_id]
-            await cls._save_sessions_to_file(sessions)
-            return True
-        return False
+        """Delete session by id, with the blobs no other session references"""
+        log = SessionLog(session_id)
+        blob_ids = await log.blob_ids()
+        await log.delete()
+        deleted = await get_storage().delete('sessions', session_id)
+        if blob_ids:
+            await cls.collect_blobs(blob_ids)
+        return deleted
+
+    @staticmethod
+    async def collect_blobs(candidates: Optional[Set[str]] = None) -> int:
+        """Delete the blobs which no session log references, optionally only among candidates. Returns the number deleted"""
+        referenced: Set[str] = set()
+        for path in SESSIONS_DIR.glob('*.jsonl'):
+            referenced |= await SessionLog(path.stem, path.parent).blob_ids()
+        return await asyncio.to_thread(get_blob_store().collect, referenced, candidates)
+
+    async def stream_chat(self) -> AsyncIterator[Dict[str, Any]]:
+        """Iterate over the saved chat history without loading it at once"""
+        async for message in self.log.stream():
+            yield message
 
     def update_history(self, message: Dict[str, str]):
         self.chat.append(message)
@@ -106,10 +160,9 @@ class Session(BaseModel):
     @classmethod
     async def get_by_agent_id(cls, agent_id: str) -> Self:
         """Retrieve a session by agent_id"""
-        sessions = await cls._load_sessions_from_file()
-        for session_data in sessions.values():
-            if session_data.get('agent_id') == agent_id:
-                return cls(**session_data)
+        session_data = await get_storage().find_one('sessions', agent_id=agent_id)
+        if session_data:
+            return await cls._from_data(session_data)
         new_session = cls(agent_id=agent_id)
         await new_session.save()
         return new_session
@@ -117,55 +170,131 @@ class Session(BaseModel):
     @classmethod
     async def get_by_task_id(cls, task_id: str) -> List[Self]:
         """Retrieve a session by task_id"""
-        sessions = await cls._load_sessions_from_file()
-        task_sessions: List[Self] = []
-        for session_data in sessions.values():
-            if session_data.get('task_id') == task_id:
-                task_sessions.append(cls(**session_data))
-
-        return task_sessions
+        sessions = await get_storage().find('sessions', task_id=task_id)
+        return [await cls._from_data(session_data) for session_data in sessions]
+    
+    async def _join_tool_calls(self, pending_tools: List[asyncio.Task], agent: Agent|AIAssistant) -> dict|str:
+        """Wait for early dispatched tool calls and combine their results"""
+        results = await asyncio.gather(*pending_tools, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.error(result)
+                return str(result)
+        
+        return agent.format_tool_calls_result(list(results))
+    
+    @staticmethod
+    async def _cancel_tool_calls(pending_tools: List[asyncio.Task]):
+        """Cancel early dispatched tool calls which are still running and wait for them to stop"""
+        for task in pending_tools:
+            task.cancel()
+        if pending_tools:
+            await asyncio.gather(*pending_tools, return_exceptions=True)
+        pending_tools.clear()
+    
+    def select_context(self, agent: Agent|AIAssistant, query: dict, system_prompt: str, attachments: List[dict] = []) -> ContextSelection:
+        """Select the chat history, followed by any attachments of the query, which fits in the context window of the agent's llm"""
+        llm = agent.llm
+        manager = self._context_manager
+        if not manager or manager.model != llm.model or manager.max_tokens != llm.max_tokens:
+            manager = self._context_manager = ContextManager.for_llm(llm)
+        
+        self.context = manager.select([*self.chat, *attachments], system_prompt, query)
+        return self.context
+    
+    def _stream_writer(self, interface: Literal['cli', 'web'], output: Callable, wsquery: Dict[str, str]) -> ChunkCoalescer:
+        """Coalesces streamed chunks into fewer cli writes or websocket frames"""
+        if interface == 'cli':
+            return ChunkCoalescer(lambda text: output(text, end=""))
+        
+        return ChunkCoalescer(lambda text: output({'type': wsquery['type'], 'content': text, 'action': wsquery['action'], 'complete': False}))
     
-    async def __call__(self, message: str|dict, agent: Agent|AIAssistant, interface: Literal['cli', 'web'] = 'cli', streaming: bool = False, output: Callable = print, wsquery: Dict[str, str]= {}, save_history: bool = True):
+    async def __call__(self, message: str|dict, agent: Agent|AIAssistant, interface: Literal['cli', 'web'] = 'cli', streaming: bool = False, output: Callable = print, wsquery: Dict[str, str]= {}, save_history: bool = True, early_dispatch: bool = True, pinned: bool = False):
+        """Run a chat turn, and the follow-up turns for any tool calls.
+        
+        With early_dispatch each tool call starts running as soon as its
+        closing tag is streamed, and the results are joined when the turn ends.
+        If the streamed xml turns out to be malformed, the dispatched calls are
+        cancelled and the tool calls are read from the full response instead.
+        
+        A pinned message, like a step of a task, is always kept in the
+        context of the following turns.
+        """
         system_prompt = agent.formatted_system_prompt()
         tool_calls: bool = False
+        screen = screen_capture.set(self._screen)
         
         try:
             if not agent:
                 raise Exception('Agent not initialized')
             
             while message:
+                pending_tools: List[asyncio.Task] = []
+                writer: ChunkCoalescer | None = None
                 try:
-                    full_prompt = agent.process_prompt(message)
+                    # Images returned by tools are sent as image messages before their results
+                    attachments = await agent.image_prompts(message)
+                    full_prompt = await agent.aprocess_prompt(message)
+                    if pinned:
+                        # Only the query itself, not the tool results which follow it
+                        full_prompt['pinned'] = True
+                        pinned = False
                     message = ''
                     response: LLMResponse | None = None
                     called_tools: bool = False
-                    async for response in agent.llm(full_prompt, system_prompt, self.chat):   
-                        if streaming:
-                            if interface == 'cli':
-                                output(f"{response.current_chunk}", end="")
-                            else:
-                                await output({'type': wsquery['type'], 'content': response.current_chunk, 'action': wsquery['action'], 'complete': False})
+                    dispatching: bool = early_dispatch
+                    result: dict[Any, Any] | str | None = None
+                    if streaming:
+                        writer = self._stream_writer(interface, output, wsquery)
+                    
+                    context = self.select_context(agent, full_prompt, system_prompt, attachments)
+                    
+                    async for response in agent.llm(full_prompt, system_prompt, context.messages):   
+                        if writer:
+                            await writer.add(response.current_chunk)
+                        
+                        if dispatching and response.parser and response.parser.failed:
+                            # Tool calls parsed before the xml broke may be incomplete
+                            dispatching = False
+                            await self._cancel_tool_calls(pending_tools)
                         
-                        if response.tool_calls and not called_tools and not response.text:
+                        if dispatching:
+                            if not response.text:
+                                for tool_call in response.tools[len(pending_tools):]:
+                                    pending_tools.append(asyncio.create_task(agent.call_tool(tool_call)))
+                        
+                        elif response.tool_calls and not called_tools and not response.text:
                             called_tools = True
-                            result: dict[Any, Any] | str = await agent.call_tools(response.tool_calls)
-                            
-                            if isinstance(result, dict) and result['type'] == 'tool_calls_result':
-                                message = result
-                            else:
-                                if interface == 'cli':
-                                    output(result)
-                                else:
-                                    await output({'type': wsquery['type'], 'content': result, 'action': wsquery['action']})
+                            result = await agent.call_tools(response.tool_calls)
                         
                         if response.artifacts:
                             if 'artifact' in response.artifacts.keys():
                                 if interface == 'ws':
                                     await output({'type': wsquery['type'], 'content': '', 'action': wsquery['action'], 'artifacts': response.artifacts['artifact']})
                         
-                        await asyncio.sleep(0.01)
+                        await asyncio.sleep(0)
+                    
+                    if writer:
+                        await writer.close()
+                    
+                    if pending_tools:
+                        result = await self._join_tool_calls(pending_tools, agent)
+                    elif dispatching and response and response.tool_calls and not response.text:
+                        # Tool calls that couldn't be picked up while streaming
+                        result = await agent.call_tools(response.tool_calls)
+                    
+                    if result is not None:
+                        if isinstance(result, dict) and result['type'] == 'tool_calls_result':
+                            message = result
+                        else:
+                            if interface == 'cli':
+                                output(result)
+                            else:
+                                await output({'type': wsquery['type'], 'content': result, 'action': wsquery['action']})
                 
                     if response and save_history:
+                        for attachment in attachments:
+                            self.update_history(attachment)
                         self.update_history(full_prompt)
                         self.update_history({'role': agent.name, 'type': 'text', 'message': ''.join(response.chunks)})
                         
@@ -181,8 +310,22 @@ class Session(BaseModel):
                     if not message:
                         break
                 except Exception as e:
-                    logger.warn(e)
-                    continue
+                    # The message was consumed, so report the failed turn instead of retrying it forever
+                    logger.exception(e)
+                    error = f"Error: {e}"
+                    if interface == 'cli':
+                        output(error)
+                    else:
+                        await output({'type': wsquery['type'], 'content': error, 'action': wsquery['action'], 'complete': True})
+                    break
+                finally:
+                    # Tool calls left running by a failed turn would otherwise keep going unobserved
+                    await self._cancel_tool_calls(pending_tools)
+                    if writer:
+                        # Writes out what a failed turn streamed, before its timer could fire later
+                        await writer.close()
                 
         except Exception as e:
             logger.exception(e)
+        finally:
+            screen_capture.reset(screen)
@@ -0,0 +1,56 @@
+import logging
+from typing import Dict, Optional
+
+from cognitrix.config import STORAGE_BACKEND
+from cognitrix.storage.base import Storage, INDEXED_FIELDS
+from cognitrix.storage.repository import Repository
+from cognitrix.storage.json_storage import JSONStorage
+from cognitrix.storage.sqlite_storage import SQLiteStorage
+
+logger = logging.getLogger('cognitrix.log')
+
+_storage: Optional[Storage] = None
+
+def get_storage() -> Storage:
+    """Returns the storage backend selected with the COGNITRIX_STORAGE environment variable,
+    behind a write-behind Repository cache"""
+    global _storage
+    if _storage is None:
+        if STORAGE_BACKEND.lower() == 'sqlite':
+            _storage = Repository(SQLiteStorage())
+        else:
+            _storage = Repository(JSONStorage())
+    return _storage
+
+def set_storage(storage: Storage):
+    """Replace the storage backend used by agents, sessions, tasks and teams"""
+    global _storage
+    _storage = storage
+
+async def flush_storage():
+    """Write pending changes of the storage cache to the backend"""
+    if isinstance(_storage, Repository):
+        await _storage.flush()
+
+async def migrate_storage(source: Optional[Storage] = None, target: Optional[Storage] = None) -> Dict[str, int]:
+    """Copy every collection from one backend to another, by default from the json files to sqlite.
+
+    Returns:
+        dict: Number of documents copied per collection
+    """
+    source = source or JSONStorage()
+    target = target or SQLiteStorage()
+    copied: Dict[str, int] = {}
+
+    for collection in INDEXED_FIELDS:
+        try:
+            documents = await source.all(collection)
+        except Exception as e:
+            logger.exception(e)
+            documents = {}
+
+        if documents:
+            await target.save_many(collection, documents)
+        copied[collection] = len(documents)
+
+    return copied
@@ -0,0 +1,65 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+INDEXED_FIELDS: Dict[str, Tuple[str, ...]] = {
+    'agents': ('name', 'parent_id'),
+    'sessions': ('agent_id', 'task_id'),
+    'tasks': (),
+    'teams': ('name',),
+}
+"""Fields each collection can be looked up by with Storage.find"""
+
+CASE_INSENSITIVE_FIELDS = ('name',)
+"""Fields which are matched case-insensitively"""
+
+def index_key(field: str, value: Any) -> Any:
+    """Normalizes a field value for lookups"""
+    if field in CASE_INSENSITIVE_FIELDS and isinstance(value, str):
+        return value.lower()
+    return value
+
+class Storage(ABC):
+    """
+    Base class for storage backends.
+
+    Documents are plain dicts stored by id in named collections
+    ('agents', 'sessions', 'tasks' and 'teams').
+    """
+
+    @abstractmethod
+    async def get(self, collection: str, id: str) -> Optional[Dict[str, Any]]:
+        """Retrieve a document by id"""
+
+    @abstractmethod
+    async def all(self, collection: str) -> Dict[str, Dict[str, Any]]:
+        """Retrieve all documents of a collection keyed by id"""
+
+    @abstractmethod
+    async def find(self, collection: str, **filters: Any) -> List[Dict[str, Any]]:
+        """Retrieve documents matching all filters. Names are compared case-insensitively"""
+
+    @abstractmethod
+    async def save(self, collection: str, id: str, data: Dict[str, Any]):
+        """Insert or update a document"""
+
+    @abstractmethod
+    async def save_many(self, collection: str, documents: Dict[str, Dict[str, Any]]):
+        """Insert or update several documents at once"""
+
+    @abstractmethod
+    async def delete(self, collection: str, id: str) -> bool:
+        """Delete a document by id. Returns whether it existed"""
+
+    async def version(self, collection: str) -> Any:
+        """Token which changes whenever the collection is modified, including by other processes.
+        Returns None if the backend can't tell"""
+        return None
+
+    async def find_one(self, collection: str, **filters: Any) -> Optional[Dict[str, Any]]:
+        """Retrieve the first document matching all filters"""
+        documents = await self.find(collection, **filters)
+        return documents[0] if documents else None
+
+    @staticmethod
+    def matches(data: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+        return all(index_key(field, data.get(field)) == index_key(field, value) for field, value in filters.items())
@@ -0,0 +1,151 @@
+import io
+import os
+import time
+import mmap
+import base64
+import asyncio
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Set
+
+from PIL import Image
+
+from cognitrix.config import BLOBS_DIR
+from cognitrix.utils import image_to_base64
+
+class BlobStore:
+    """
+    Content-addressed store for binary data like screenshots.
+
+    Blobs are saved once under `~/.cognitrix/blobs/<id[:2]>/<id>`, where the
+    id is the sha256 of their content, so identical blobs are only stored
+    once. Chat messages reference images by blob id and the bytes are only
+    read, memory-mapped, when a provider needs them. Blobs no chat message
+    references anymore are removed with `collect`.
+
+    Args:
+        directory (Path): Directory holding the blobs
+    """
+
+    def __init__(self, directory: Path = BLOBS_DIR):
+        self.directory = Path(directory)
+
+    def path(self, blob_id: str) -> Path:
+        if len(blob_id) != 64 or not all(c in '0123456789abcdef' for c in blob_id):
+            raise ValueError(f"Invalid blob id '{blob_id}'")
+        return self.directory / blob_id[:2] / blob_id
+
+    def exists(self, blob_id: str) -> bool:
+        return self.path(blob_id).exists()
+
+    def put(self, data: bytes) -> str:
+        """Save data and return its blob id"""
+        blob_id = hashlib.sha256(data).hexdigest()
+        path = self.path(blob_id)
+        if path.exists():
+            # Saving a blob again marks it as recent, so it isn't collected before it's referenced
+            os.utime(path)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as file:
+                file.write(data)
+            os.replace(file.name, path)
+        return blob_id
+
+    def open(self, blob_id: str) -> mmap.mmap:
+        """Memory-map a blob for reading"""
+        with open(self.path(blob_id), 'rb') as file:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def get(self, blob_id: str) -> bytes:
+        """Read the content of a blob"""
+        return self.path(blob_id).read_bytes()
+
+    def base64(self, blob_id: str) -> str:
+        """Base64 encoded content of a blob"""
+        with self.open(blob_id) as data:
+            return base64.b64encode(data).decode('utf-8')
+
+    def put_image(self, image: Image.Image) -> str:
+        """Encode an image as JPEG once and save it"""
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        output = io.BytesIO()
+        image.save(output, format='JPEG')
+        return self.put(output.getvalue())
+
+    def get_image(self, blob_id: str) -> Image.Image:
+        image = Image.open(io.BytesIO(self.get(blob_id)))
+        image.load()
+        return image
+
+    def delete(self, blob_id: str) -> bool:
+        path = self.path(blob_id)
+        if not path.exists():
+            return False
+        path.unlink()
+        return True
+
+    def blob_ids(self) -> Iterator[str]:
+        """Ids of all saved blobs"""
+        if not self.directory.exists():
+            return
+        for path in self.directory.glob('??/*'):
+            if len(path.name) == 64:
+                yield path.name
+
+    def collect(self, referenced: Set[str], candidates: Optional[Iterable[str]] = None, grace: float = 600) -> int:
+        """Delete the blobs which aren't referenced, and weren't saved in the last `grace` seconds.
+
+        Args:
+            referenced (set): Ids of the blobs still in use
+            candidates (Iterable): Only consider these blobs instead of all of them
+            grace (float): Seconds a new blob is kept while it's not referenced yet
+
+        Returns:
+            int: Number of blobs deleted
+        """
+        deleted = 0
+        cutoff = time.time() - grace
+        for blob_id in (self.blob_ids() if candidates is None else candidates):
+            if blob_id in referenced:
+                continue
+            try:
+                path = self.path(blob_id)
+                if path.stat().st_mtime <= cutoff:
+                    path.unlink()
+                    deleted += 1
+            except (OSError, ValueError):
+                continue
+        return deleted
+
+_blob_store: Optional[BlobStore] = None
+
+def get_blob_store() -> BlobStore:
+    """Returns the blob store in the cognitrix directory"""
+    global _blob_store
+    if _blob_store is None:
+        _blob_store = BlobStore()
+    return _blob_store
+
+async def store_image(image: Image.Image) -> str:
+    """Encode and save an image in a thread, without blocking the event loop. Returns its blob id"""
+    return await asyncio.to_thread(get_blob_store().put_image, image)
+
+def image_message(image: Image.Image | str, role: str = 'User') -> Dict[str, Any]:
+    """Chat message referencing an image, saving it in the blob store unless it's already a blob id"""
+    blob_id = image if isinstance(image, str) else get_blob_store().put_image(image)
+    return {'role': role, 'type': 'image', 'blob': blob_id, 'message': ''}
+
+def message_image_base64(message: Dict[str, Any]) -> str:
+    """Base64 JPEG of the image of a chat message, read from the blob store when referenced by id"""
+    if message.get('blob'):
+        return get_blob_store().base64(message['blob'])
+    return image_to_base64(message['image'])
+
+def message_image(message: Dict[str, Any]) -> Image.Image:
+    """Image of a chat message, loaded from the blob store when referenced by id"""
+    if message.get('blob'):
+        return get_blob_store().get_image(message['blob'])
+    return message['image']
@@ -0,0 +1,188 @@
+import os
+import json
+import asyncio
+import logging
+import aiofiles
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from cognitrix.config import AGENTS_FILE, SESSIONS_FILE, TASKS_FILE, TEAMS_FILE
+from cognitrix.storage.base import Storage, INDEXED_FIELDS, index_key
+
+logger = logging.getLogger('cognitrix.log')
+
+COLLECTION_FILES: Dict[str, Path] = {
+    'agents': AGENTS_FILE,
+    'sessions': SESSIONS_FILE,
+    'tasks': TASKS_FILE,
+    'teams': TEAMS_FILE,
+}
+
+Index = Dict[str, Dict[str, List[str]]]
+"""Document ids keyed by field, then by the json encoded field value"""
+
+class JSONStorage(Storage):
+    """
+    Stores every collection as a single json file.
+
+    This is the original storage format: each write reads the whole
+    file, updates it and writes it back.
+
+    Lookups by the INDEXED_FIELDS of a collection use a secondary index
+    persisted next to the collection file (e.g. `sessions.index.json`)
+    and updated on every save and delete. Parsed files and their indexes
+    are cached until the file is modified by another process.
+    """
+
+    def __init__(self, files: Optional[Dict[str, Path]] = None):
+        self.files = files or COLLECTION_FILES
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._cache: Dict[str, Tuple[Tuple[int, int], Dict[str, Dict[str, Any]], Index]] = {}
+
+    def _lock(self, collection: str) -> asyncio.Lock:
+        if collection not in self._locks:
+            self._locks[collection] = asyncio.Lock()
+        return self._locks[collection]
+
+    def _index_path(self, collection: str) -> Path:
+        return self.files[collection].with_suffix('.index.json')
+
+    def _version(self, collection: str) -> Optional[Tuple[int, int]]:
+        """Modification time and size of the collection file"""
+        try:
+            stat = os.stat(self.files[collection])
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    @staticmethod
+    def _key(field: str, value: Any) -> str:
+        return json.dumps(index_key(field, value))
+
+    def _build_index(self, collection: str, documents: Dict[str, Dict[str, Any]]) -> Index:
+        index: Index = {field: {} for field in INDEXED_FIELDS.get(collection, ())}
+        for id, data in documents.items():
+            self._add_to_index(index, id, data)
+        return index
+
+    def _add_to_index(self, index: Index, id: str, data: Dict[str, Any]):
+        for field, entries in index.items():
+            entries.setdefault(self._key(field, data.get(field)), []).append(id)
+
+    def _remove_from_index(self, index: Index, id: str, data: Dict[str, Any]):
+        for field, entries in index.items():
+            key = self._key(field, data.get(field))
+            ids = entries.get(key, [])
+            if id in ids:
+                ids.remove(id)
+            if not ids:
+                entries.pop(key, None)
+
+    async def _load_index(self, collection: str, version: Tuple[int, int]) -> Optional[Index]:
+        """Load the persisted index if it was written for the current version of the collection file"""
+        path = self._index_path(collection)
+        if not path.exists():
+            return None
+        try:
+            async with aiofiles.open(path, 'r') as file:
+                content = json.loads(await file.read())
+        except (OSError, json.JSONDecodeError):
+            return None
+        index = content.get('index', {})
+        if tuple(content.get('version') or ()) != version or set(index) != set(INDEXED_FIELDS.get(collection, ())):
+            return None
+        return index
+
+    async def _dump_index(self, collection: str, index: Index):
+        content = {'version': self._version(collection), 'index': index}
+        async with aiofiles.open(self._index_path(collection), 'w') as file:
+            await file.write(json.dumps(content))
+
+    async def _load(self, collection: str) -> Tuple[Dict[str, Dict[str, Any]], Index]:
+        """Returns the documents of a collection and their index"""
+        version = self._version(collection)
+        if version is None:
+            self._cache.pop(collection, None)
+            return {}, self._build_index(collection, {})
+
+        cached = self._cache.get(collection)
+        if cached and cached[0] == version:
+            return cached[1], cached[2]
+
+        async with aiofiles.open(self.files[collection], 'r') as file:
+            content = await file.read()
+            documents = json.loads(content) if content else {}
+
+        index = await self._load_index(collection, version)
+        if index is None:
+            index = self._build_index(collection, documents)
+            try:
+                await self._dump_index(collection, index)
+            except OSError as e:
+                logger.warning(f"Couldn't save the {collection} index: {e}")
+
+        self._cache[collection] = (version, documents, index)
+        return documents, index
+
+    async def _dump(self, collection: str, documents: Dict[str, Dict[str, Any]], index: Index):
+        async with aiofiles.open(self.files[collection], 'w') as file:
+            await file.write(json.dumps(documents, indent=4))
+        await self._dump_index(collection, index)
+        self._cache[collection] = (self._version(collection), documents, index)
+
+    def _lookup(self, collection: str, index: Index, filters: Dict[str, Any]) -> Optional[List[str]]:
+        """Ids of the documents matching the filters, or None if a filter isn't indexed"""
+        if not filters or any(field not in index for field in filters):
+            return None
+        matched: Optional[Set[str]] = None
+        ordered: List[str] = []
+        for field, value in filters.items():
+            ids = index[field].get(self._key(field, value), [])
+            if matched is None:
+                ordered = ids
+                matched = set(ids)
+            else:
+                matched &= set(ids)
+        return [id for id in ordered if id in (matched or ())]
+
+    async def version(self, collection: str) -> Optional[Tuple[int, int]]:
+        return self._version(collection)
+
+    async def get(self, collection: str, id: str) -> Optional[Dict[str, Any]]:
+        documents, _ = await self._load(collection)
+        return documents.get(id)
+
+    async def all(self, collection: str) -> Dict[str, Dict[str, Any]]:
+        documents, _ = await self._load(collection)
+        return dict(documents)
+
+    async def find(self, collection: str, **filters: Any) -> List[Dict[str, Any]]:
+        documents, index = await self._load(collection)
+        ids = self._lookup(collection, index, filters)
+        if ids is None:
+            return [data for data in documents.values() if self.matches(data, filters)]
+        return [documents[id] for id in ids if id in documents]
+
+    async def save(self, collection: str, id: str, data: Dict[str, Any]):
+        await self.save_many(collection, {id: data})
+
+    async def save_many(self, collection: str, documents: Dict[str, Dict[str, Any]]):
+        async with self._lock(collection):
+            stored, index = await self._load(collection)
+            stored, index = dict(stored), json.loads(json.dumps(index))
+            for id, data in documents.items():
+                if id in stored:
+                    self._remove_from_index(index, id, stored[id])
+                stored[id] = data
+                self._add_to_index(index, id, data)
+            await self._dump(collection, stored, index)
+
+    async def delete(self, collection: str, id: str) -> bool:
+        async with self._lock(collection):
+            stored, index = await self._load(collection)
+            if id not in stored:
+                return False
+            stored, index = dict(stored), json.loads(json.dumps(index))
+            self._remove_from_index(index, id, stored.pop(id))
+            await self._dump(collection, stored, index)
+            return True
@@ -0,0 +1,189 @@
+import time
+import atexit
+import asyncio
+import logging
+import weakref
+from typing import Any, Dict, List, Optional, Set
+
+from cognitrix.storage.base import Storage
+
+logger = logging.getLogger('cognitrix.log')
+
+class Repository(Storage):
+    """
+    Write-behind cache in front of a storage backend.
+
+    Documents read or saved are kept in an identity map, so repeated reads
+    within a process don't touch the backend. Saves and deletes only mark
+    documents dirty; they are written to the backend in one batch per
+    collection `flush_delay` seconds after the first pending write.
+
+    Changes made by other processes are picked up by comparing the
+    backend's collection version, checked at most every
+    `refresh_interval` seconds. Pending writes are flushed before the
+    event loop running them shuts down and when the process exits.
+
+    Args:
+        backend (Storage): Storage the documents are persisted to
+        flush_delay (float): Seconds to wait for more writes before flushing
+        refresh_interval (float): Seconds between checks for external changes
+    """
+
+    def __init__(self, backend: Storage, flush_delay: float = 0.5, refresh_interval: float = 1.0):
+        self.backend = backend
+        self.flush_delay = flush_delay
+        self.refresh_interval = refresh_interval
+        self._documents: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._complete: Set[str] = set()
+        self._dirty: Dict[str, Set[str]] = {}
+        self._deleted: Dict[str, Set[str]] = {}
+        self._versions: Dict[str, Any] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_locks: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        atexit.register(self._flush_at_exit)
+
+    @property
+    def pending(self) -> bool:
+        """Whether there are writes which haven't been flushed yet"""
+        return any(self._dirty.values()) or any(self._deleted.values())
+
+    def _collection(self, collection: str) -> Dict[str, Dict[str, Any]]:
+        return self._documents.setdefault(collection, {})
+
+    def _is_pending(self, collection: str, id: str) -> bool:
+        return id in self._dirty.get(collection, ()) or id in self._deleted.get(collection, ())
+
+    async def _refresh(self, collection: str):
+        """Drop cached documents of a collection modified by another process"""
+        now = time.monotonic()
+        if now - self._checked_at.get(collection, 0) < self.refresh_interval:
+            return
+        self._checked_at[collection] = now
+
+        version = await self.backend.version(collection)
+        if version is None or version == self._versions.get(collection):
+            return
+        if collection in self._versions:
+            documents = self._collection(collection)
+            for id in list(documents):
+                if not self._is_pending(collection, id):
+                    del documents[id]
+            self._complete.discard(collection)
+        self._versions[collection] = version
+
+    def _overlay(self, collection: str, documents: Dict[str, Dict[str, Any]]):
+        """Cache documents read from the backend, keeping pending writes"""
+        cached = self._collection(collection)
+        for id, data in documents.items():
+            if not self._is_pending(collection, id):
+                cached[id] = data
+
+    async def get(self, collection: str, id: str) -> Optional[Dict[str, Any]]:
+        await self._refresh(collection)
+        documents = self._collection(collection)
+        if id in documents:
+            return documents[id]
+        if collection in self._complete or id in self._deleted.get(collection, ()):
+            return None
+
+        data = await self.backend.get(collection, id)
+        if data is not None:
+            self._overlay(collection, {id: data})
+        return documents.get(id)
+
+    async def all(self, collection: str) -> Dict[str, Dict[str, Any]]:
+        await self._refresh(collection)
+        if collection not in self._complete:
+            self._overlay(collection, await self.backend.all(collection))
+            self._complete.add(collection)
+        return dict(self._collection(collection))
+
+    async def find(self, collection: str, **filters: Any) -> List[Dict[str, Any]]:
+        await self._refresh(collection)
+        documents = self._collection(collection)
+        if collection in self._complete:
+            return [data for data in documents.values() if self.matches(data, filters)]
+
+        # Use the backend's indexes, then apply the writes it hasn't seen yet
+        found = {data['id']: data for data in await self.backend.find(collection, **filters) if 'id' in data}
+        self._overlay(collection, found)
+        results = [documents[id] for id in found if id in documents and self.matches(documents[id], filters)]
+        dirty = self._dirty.get(collection, set())
+        # In the order they were saved, like the backend returns them
+        results.extend(data for id, data in documents.items() if id in dirty and id not in found and self.matches(data, filters))
+        return results
+
+    async def save(self, collection: str, id: str, data: Dict[str, Any]):
+        await self.save_many(collection, {id: data})
+
+    async def save_many(self, collection: str, documents: Dict[str, Dict[str, Any]]):
+        self._collection(collection).update(documents)
+        self._dirty.setdefault(collection, set()).update(documents)
+        self._deleted.setdefault(collection, set()).difference_update(documents)
+        self._schedule_flush()
+
+    async def delete(self, collection: str, id: str) -> bool:
+        existed = await self.get(collection, id) is not None
+        if existed:
+            self._collection(collection).pop(id, None)
+            self._dirty.setdefault(collection, set()).discard(id)
+            self._deleted.setdefault(collection, set()).add(id)
+            self._schedule_flush()
+        return existed
+
+    async def version(self, collection: str) -> Any:
+        return await self.backend.version(collection)
+
+    def _schedule_flush(self):
+        loop = asyncio.get_running_loop()
+        if self._flush_task and not self._flush_task.done() and self._flush_task.get_loop() is loop:
+            return
+        self._flush_task = loop.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        try:
+            await asyncio.sleep(self.flush_delay)
+        except asyncio.CancelledError:
+            # The event loop is shutting down, write the pending changes first
+            await self.flush()
+            raise
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Error flushing storage: {e}")
+
+    async def flush(self):
+        """Write all pending changes to the backend"""
+        loop = asyncio.get_running_loop()
+        if loop not in self._flush_locks:
+            self._flush_locks[loop] = asyncio.Lock()
+
+        async with self._flush_locks[loop]:
+            for collection in list(self._dirty.keys() | self._deleted.keys()):
+                dirty = self._dirty.get(collection, set())
+                deleted = self._deleted.get(collection, set())
+                documents = {id: data for id, data in self._documents[collection].items() if id in dirty}
+                ids = list(deleted)
+                dirty.clear()
+                deleted.clear()
+
+                try:
+                    if documents:
+                        await self.backend.save_many(collection, documents)
+                    for id in ids:
+                        await self.backend.delete(collection, id)
+                except Exception:
+                    self._dirty.setdefault(collection, set()).update(id for id in documents if id in self._documents[collection])
+                    self._deleted.setdefault(collection, set()).update(ids)
+                    raise
+
+                # Our own writes shouldn't invalidate the cache
+                self._versions[collection] = await self.backend.version(collection)
+
+    def _flush_at_exit(self):
+        if self.pending:
+            try:
+                asyncio.run(self.flush())
+            except Exception as e:
+                logger.error(f"Error flushing storage on exit: {e}")
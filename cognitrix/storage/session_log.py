@@ -0,0 +1,142 @@
+import os
+import json
+import logging
+import aiofiles
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+from cognitrix.config import SESSIONS_DIR
+
+logger = logging.getLogger('cognitrix.log')
+
+LOG_VERSION = 1
+
+class SessionLog:
+    """
+    Append-only chat log of a single session.
+
+    The log is a json lines file. Its first line is a small header
+    ({"header": {"session_id": ..., "version": ..., "created_at": ...}})
+    and every following line is one chat message, so saving a turn only
+    appends the new messages.
+
+    Args:
+        session_id (str): Id of the session the log belongs to
+        directory (Path): Directory holding the session logs
+    """
+
+    BLOCK_SIZE = 64 * 1024
+
+    def __init__(self, session_id: str, directory: Path = SESSIONS_DIR):
+        self.session_id = session_id
+        self.path = Path(directory) / f'{session_id}.jsonl'
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def _header(self) -> str:
+        header = {
+            'session_id': self.session_id,
+            'version': LOG_VERSION,
+            'created_at': (datetime.now()).strftime("%a %b %d %Y %H:%M:%S")
+        }
+        return json.dumps({'header': header}) + '\n'
+
+    @staticmethod
+    def _lines(messages: List[Dict[str, Any]]) -> str:
+        return ''.join(json.dumps(message) + '\n' for message in messages)
+
+    def _parse(self, line: str) -> Optional[Dict[str, Any]]:
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            logger.warning(f"Skipping corrupt record in {self.path}")
+            return None
+        if isinstance(record, dict) and 'header' in record:
+            return None
+        return record
+
+    async def append(self, messages: List[Dict[str, Any]]):
+        """Append messages to the log, creating it if needed"""
+        if not messages:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        content = self._lines(messages)
+        if not self.exists():
+            content = self._header() + content
+        async with aiofiles.open(self.path, 'a') as file:
+            await file.write(content)
+
+    async def rewrite(self, messages: List[Dict[str, Any]]):
+        """Replace the whole log with the given messages"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix('.tmp')
+        async with aiofiles.open(temp_path, 'w') as file:
+            await file.write(self._header() + self._lines(messages))
+        os.replace(temp_path, self.path)
+
+    async def stream(self) -> AsyncIterator[Dict[str, Any]]:
+        """Iterate over the messages of the log from the oldest"""
+        if not self.exists():
+            return
+        async with aiofiles.open(self.path, 'r') as file:
+            async for line in file:
+                if line.strip():
+                    message = self._parse(line)
+                    if message is not None:
+                        yield message
+
+    async def read(self) -> List[Dict[str, Any]]:
+        """Read all messages of the log"""
+        return [message async for message in self.stream()]
+
+    async def tail(self, limit: int) -> List[Dict[str, Any]]:
+        """Read the last `limit` messages without reading the whole log"""
+        if limit <= 0 or not self.exists():
+            return []
+
+        async with aiofiles.open(self.path, 'rb') as file:
+            end = await file.seek(0, os.SEEK_END)
+            position = end
+            data = b''
+            # Read blocks backwards until there are enough complete lines
+            while position > 0 and data.count(b'\n') <= limit:
+                size = min(self.BLOCK_SIZE, position)
+                position -= size
+                await file.seek(position)
+                data = await file.read(size) + data
+
+        lines = data.split(b'\n')
+        if position > 0:
+            # The first line may have been cut by the block boundary
+            lines = lines[1:]
+
+        messages = []
+        for line in lines[-(limit + 2):]:
+            if line.strip():
+                message = self._parse(line.decode('utf-8'))
+                if message is not None:
+                    messages.append(message)
+        return messages[-limit:]
+
+    async def blob_ids(self) -> Set[str]:
+        """Ids of the blobs referenced by the messages of the log"""
+        blob_ids: Set[str] = set()
+        if not self.exists():
+            return blob_ids
+        async with aiofiles.open(self.path, 'r') as file:
+            async for line in file:
+                # Only the lines of image messages need to be parsed
+                if '"blob"' in line:
+                    message = self._parse(line)
+                    if message and message.get('blob'):
+                        blob_ids.add(message['blob'])
+        return blob_ids
+
+    async def delete(self) -> bool:
+        """Delete the log file"""
+        if not self.exists():
+            return False
+        self.path.unlink()
+        return True
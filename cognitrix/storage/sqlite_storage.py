@@ -0,0 +1,166 @@
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from cognitrix.config import DATABASE_FILE
+from cognitrix.storage.base import Storage, INDEXED_FIELDS, index_key
+
+class SQLiteStorage(Storage):
+    """
+    Stores collections as tables of an SQLite database in WAL mode.
+
+    Every collection is a table with the document id as primary key, the
+    document as json and an indexed column for each of its INDEXED_FIELDS,
+    so saving a document only writes its own row. WAL mode and a busy
+    timeout let the api process and celery workers use the database at
+    the same time.
+
+    Queries run in worker threads, each with its own connection.
+    """
+
+    def __init__(self, path: Path | str = DATABASE_FILE, timeout: float = 30.0):
+        self.path = Path(path)
+        self.timeout = timeout
+        self._local = threading.local()
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection: Optional[sqlite3.Connection] = getattr(self._local, 'connection', None)
+        if connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(f'PRAGMA busy_timeout={int(self.timeout * 1000)}')
+            self._local.connection = connection
+            self._create_schema(connection)
+        return connection
+
+    def _create_schema(self, connection: sqlite3.Connection):
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            for collection, fields in INDEXED_FIELDS.items():
+                columns = ''.join(f', {field} TEXT' for field in fields)
+                connection.execute(
+                    f'CREATE TABLE IF NOT EXISTS {collection} '
+                    f'(id TEXT PRIMARY KEY{columns}, data TEXT NOT NULL, updated_at REAL)'
+                )
+                for field in fields:
+                    connection.execute(f'CREATE INDEX IF NOT EXISTS {collection}_{field} ON {collection} ({field})')
+            connection.execute('CREATE TABLE IF NOT EXISTS versions (collection TEXT PRIMARY KEY, version INTEGER NOT NULL)')
+            self._schema_ready = True
+
+    @staticmethod
+    def _table(collection: str) -> Tuple[str, ...]:
+        if collection not in INDEXED_FIELDS:
+            raise ValueError(f"Unknown collection '{collection}'")
+        return INDEXED_FIELDS[collection]
+
+    def _row(self, collection: str, id: str, data: Dict[str, Any]) -> tuple:
+        fields = self._table(collection)
+        return (id, *(index_key(field, data.get(field)) for field in fields), json.dumps(data), time.time())
+
+    def _upsert_sql(self, collection: str) -> str:
+        fields = self._table(collection)
+        columns = ['id', *fields, 'data', 'updated_at']
+        updates = ', '.join(f'{column}=excluded.{column}' for column in columns[1:])
+        return (
+            f"INSERT INTO {collection} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT(id) DO UPDATE SET {updates}"
+        )
+
+    def _get(self, collection: str, id: str) -> Optional[Dict[str, Any]]:
+        self._table(collection)
+        row = self._connect().execute(f'SELECT data FROM {collection} WHERE id = ?', (id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _all(self, collection: str) -> Dict[str, Dict[str, Any]]:
+        self._table(collection)
+        rows = self._connect().execute(f'SELECT id, data FROM {collection} ORDER BY rowid').fetchall()
+        return {id: json.loads(data) for id, data in rows}
+
+    def _find(self, collection: str, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        fields = self._table(collection)
+        unknown = [field for field in filters if field not in fields]
+        if unknown:
+            raise ValueError(f"Can't look up {collection} by {', '.join(unknown)}")
+
+        query = f'SELECT data FROM {collection}'
+        params = []
+        if filters:
+            clauses = []
+            for field, value in filters.items():
+                if value is None:
+                    clauses.append(f'{field} IS NULL')
+                else:
+                    clauses.append(f'{field} = ?')
+                    params.append(index_key(field, value))
+            query += ' WHERE ' + ' AND '.join(clauses)
+        rows = self._connect().execute(query + ' ORDER BY rowid', params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    @staticmethod
+    def _bump_version(connection: sqlite3.Connection, collection: str):
+        connection.execute(
+            'INSERT INTO versions (collection, version) VALUES (?, 1) '
+            'ON CONFLICT(collection) DO UPDATE SET version = version + 1',
+            (collection,)
+        )
+
+    def _version(self, collection: str) -> int:
+        self._table(collection)
+        row = self._connect().execute('SELECT version FROM versions WHERE collection = ?', (collection,)).fetchone()
+        return row[0] if row else 0
+
+    def _save_many(self, collection: str, documents: Dict[str, Dict[str, Any]]):
+        connection = self._connect()
+        rows = [self._row(collection, id, data) for id, data in documents.items()]
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.executemany(self._upsert_sql(collection), rows)
+            self._bump_version(connection, collection)
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+
+    def _delete(self, collection: str, id: str) -> bool:
+        self._table(collection)
+        connection = self._connect()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = connection.execute(f'DELETE FROM {collection} WHERE id = ?', (id,))
+            if cursor.rowcount > 0:
+                self._bump_version(connection, collection)
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        return cursor.rowcount > 0
+
+    async def version(self, collection: str) -> int:
+        return await asyncio.to_thread(self._version, collection)
+
+    async def get(self, collection: str, id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._get, collection, id)
+
+    async def all(self, collection: str) -> Dict[str, Dict[str, Any]]:
+        return await asyncio.to_thread(self._all, collection)
+
+    async def find(self, collection: str, **filters: Any) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self._find, collection, filters)
+
+    async def save(self, collection: str, id: str, data: Dict[str, Any]):
+        await asyncio.to_thread(self._save_many, collection, {id: data})
+
+    async def save_many(self, collection: str, documents: Dict[str, Dict[str, Any]]):
+        await asyncio.to_thread(self._save_many, collection, documents)
+
+    async def delete(self, collection: str, id: str) -> bool:
+        return await asyncio.to_thread(self._delete, collection, id)
@@ -2,15 +2,15 @@ import json
 import asyncio
 import logging
 import uuid
-import aiofiles
 from datetime import datetime
 from pydantic import BaseModel, Field
 from typing import Any, Dict, List, Literal, Optional, Callable, Self, TypeAlias
 from cognitrix.agents.evaluator import Evaluator
 
-from cognitrix.config import TASKS_FILE
+from cognitrix.storage import get_storage
 from cognitrix.agents.base import Agent
 from cognitrix.llms.session import Session
+from cognitrix.llms.scheduler import Priority, request_priority
 from cognitrix.utils import xml_to_dict
 
 logger = logging.getLogger('cognitrix.log')
@@ -98,12 +98,14 @@ class Task(BaseModel):
                     if self.status == 'in-progress':
                         prompt = f'Step #{key + 1}: '+ value['step']
                         
-                        await session(prompt, agent, streaming=True)
+                        with request_priority(Priority.BACKGROUND):
+                            await session(prompt, agent, streaming=True, pinned=True)
                         
                         eval_prompt = "Task: "+value['step']
                         eval_prompt += "\n\nAgent Response:\n"+session.chat[-1]['message']
                         
-                        await session(eval_prompt, evaluator, streaming=True)
+                        with request_priority(Priority.BACKGROUND):
+                            await session(eval_prompt, evaluator, streaming=True)
                         self.step_instructions[key]['done'] = True
                         
                         await self.save()
@@ -113,29 +115,15 @@ class Task(BaseModel):
                 self.status = 'completed'
                 await self.save()
     
-    @classmethod
-    async def _load_tasks_from_file(cls) -> Dict[str, Dict]:
-        async with aiofiles.open(TASKS_FILE, 'r') as file:
-            content = await file.read()
-            return json.loads(content) if content else {}
-
-    @classmethod
-    async def _save_tasks_to_file(cls, tasks: Dict[str, Dict]):
-        async with aiofiles.open(TASKS_FILE, 'w') as file:
-            await file.write(json.dumps(tasks, indent=4))
-
     async def save(self):
         """Save current task"""
         self.step_instructions = Task.extract_steps(self.description)
-        tasks = await self._load_tasks_from_file()
-        tasks[self.id] = self.dict()
-        await self._save_tasks_to_file(tasks)
+        await get_storage().save('tasks', self.id, self.dict())
         return self.id
 
     @classmethod
     async def get(cls, id) -> Optional[Self]:
-        tasks = await cls._load_tasks_from_file()
-        task_data = tasks.get(id)
+        task_data = await get_storage().get('tasks', id)
         if task_data:
             return cls(**task_data)
         return None
@@ -143,7 +131,7 @@ class Task(BaseModel):
     @classmethod
     async def list_tasks(cls) -> TaskList:
         try:
-            tasks = await cls._load_tasks_from_file()
+            tasks = await get_storage().all('tasks')
             return [cls(**task_data) for task_data in tasks.values()]
         except Exception as e:
             logger.exception(e)
@@ -152,12 +140,7 @@ class Task(BaseModel):
     @classmethod
     async def delete(cls, task_id: str):
         """Delete task by id"""
-        tasks = await cls._load_tasks_from_file()
-        if task_id in tasks:
-            del tasks[task_id]
-            await cls._save_tasks_to_file(tasks)
-            return True
-        return False
+        return await get_storage().delete('tasks', task_id)
 
     @staticmethod
     def extract_steps(text):
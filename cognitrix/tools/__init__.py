@@ -1,13 +1,13 @@
+import importlib
+
 from cognitrix.tools.base import Tool
 from cognitrix.tools.tool import tool
-from cognitrix.tools.misc import (
-    Calculator, YoutubePlayer,FSBrowser,
-    InternetBrowser, take_screenshot,
-    text_input, key_press, mouse_click,
-    mouse_double_click, mouse_right_click,
-    hot_key, create_sub_agent, call_sub_agent,
-    web_scraper, internet_search, brave_search,
-    wikipedia
-)
+from cognitrix.tools.registry import TOOLS, ToolSpec, register_tool
 
-from cognitrix.tools.python import PythonREPL
\ No newline at end of file
+def __getattr__(name: str):
+    """Tools are imported on first use, so importing the package loads none of their dependencies"""
+    spec = next((spec for spec in TOOLS if spec.target.endswith(f':{name}')), None)
+    if spec is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module, _, attribute = spec.target.partition(':')
+    return getattr(importlib.import_module(module), attribute)
@@ -1,4 +1,3 @@
-import inspect
 import logging
 from pathlib import Path
 import sys
@@ -25,6 +24,12 @@ class Tool(BaseModel):
     parameters: Any = {}
     """Used for type hinting for function tools"""
     
+    max_concurrency: Optional[int] = None
+    """Maximum number of calls of the tool running at once, no limit if None"""
+    
+    concurrency_group: str = ''
+    """Tools in the same group share a single max_concurrency limit"""
+    
     class Config:
         arbitrary_types_allowed = True
     
@@ -36,46 +41,45 @@ class Tool(BaseModel):
         """Asynchronous implementation"""
         pass
     
+    @property
+    def is_async(self) -> bool:
+        """Whether the tool runs with arun instead of run"""
+        return False
+    
     @staticmethod
     def list_all_tools():
         """List all tools"""
-        try:
-            module = __import__(__package__, fromlist=['__init__']) # type: ignore
-            tools = []
-            func_tools  = [f[1] for f in inspect.getmembers(module) if not f[0].startswith('__') and f[0].lower() != 'tool' and isinstance(f[1], Tool)]
-            tools.extend(func_tools)
-            class_tools  = [f[1]() for f in inspect.getmembers(module, inspect.isclass) if not f[0].startswith('__') and f[0].lower() != 'tool']
-            tools.extend(class_tools)
-            return tools
-        except Exception as e:
-            logging.exception(e)
-            return []
+        from cognitrix.tools.registry import tool_specs, load_tool
+        tools = []
+        for spec in tool_specs().values():
+            try:
+                tools.append(load_tool(spec))
+            except Exception as e:
+                logging.exception(e)
+        return tools
     
     @staticmethod
     def get_tools_by_category(category: str):
         """Retrieve all tools by category"""
-        try:
-            module = __import__(__package__, fromlist=['__init__'])  # type: ignore
-            tools_by_category = [f[1] for f in inspect.getmembers(module) if not f[0].startswith('__') and f[0].lower() != 'tool' and isinstance(f[1], Tool) and f[1].category == category]
-            class_tools_by_category = [f[1]() for f in inspect.getmembers(module, inspect.isclass) if not f[0].startswith('__') and f[0].lower() != 'tool'  and isinstance(f[1](), Tool) and f[1]().category == category]
-            tools_by_category.extend(class_tools_by_category)
-            return tools_by_category
-        except Exception as e:
-            logging.exception(e)
-            return []
+        from cognitrix.tools.registry import tool_specs, load_tool
+        tools_by_category = []
+        for spec in tool_specs().values():
+            if spec.category and spec.category != category:
+                continue
+            try:
+                tool = load_tool(spec)
+                if tool.category == category:
+                    tools_by_category.append(tool)
+            except Exception as e:
+                logging.exception(e)
+        return tools_by_category
     
     @classmethod
     def get_by_name(cls, name: str)-> Optional[Self]:
-        """Dynamically load tool by name"""
+        """Load a tool by name, importing only the module it lives in. Names are matched case and separator insensitively"""
+        from cognitrix.tools.registry import get_tool
         try:
-            module = __import__(__package__, fromlist=[name]) # type: ignore
-            tools  = [f[1] for f in inspect.getmembers(module) if not f[0].startswith('__') and f[0].lower() != 'tool' and isinstance(f[1], Tool)]
-            class_tools  = [f[1]() for f in inspect.getmembers(module, inspect.isclass) if not f[0].startswith('__') and f[0].lower() != 'tool']
-            tools.extend(class_tools)
-            tool = next((t for t in tools if t.name.lower() == name.lower()), None)
-            return tool
-        except IndexError:
-            return None
+            return get_tool(name)
         except Exception as e:
             logging.exception(e)
-            return None
\ No newline at end of file
+            return None
@@ -0,0 +1,97 @@
+import time
+import asyncio
+import logging
+import functools
+import contextvars
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from cognitrix.config import TOOL_THREADS
+from cognitrix.tools.base import Tool
+
+logger = logging.getLogger('cognitrix.log')
+
+@dataclass
+class ToolStats:
+    """Timing of the calls of a tool"""
+
+    calls: int = 0
+    errors: int = 0
+    total_time: float = 0.0
+    """Seconds spent running the tool, summed over its calls"""
+    max_time: float = 0.0
+    last_time: float = 0.0
+
+    def dict(self) -> Dict[str, Any]:
+        return {**self.__dict__, 'mean_time': self.total_time / self.calls if self.calls else 0.0}
+
+class ToolExecutor:
+    """
+    Runs tool calls without blocking the event loop.
+
+    Async tools run on the event loop and sync tools in a bounded thread
+    pool. A tool's `max_concurrency` caps how many of its calls, or of the
+    calls of its `concurrency_group`, run at once; calls waiting for the
+    limit start in the order they were made.
+
+    Args:
+        max_workers (int): Threads running sync tools
+    """
+
+    def __init__(self, max_workers: int = TOOL_THREADS):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='cognitrix-tool')
+        self._limits: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Semaphore] = {}
+        self.stats: Dict[str, ToolStats] = {}
+
+    def _limit(self, tool: Tool) -> Optional[asyncio.Semaphore]:
+        if not tool.max_concurrency:
+            return None
+        loop_key = (asyncio.get_running_loop(), tool.concurrency_group or tool.name)
+        if loop_key not in self._limits:
+            self._limits = {k: v for k, v in self._limits.items() if not k[0].is_closed()}
+            self._limits[loop_key] = asyncio.Semaphore(tool.max_concurrency)
+        return self._limits[loop_key]
+
+    def _record(self, name: str, elapsed: float, failed: bool):
+        stats = self.stats.setdefault(name, ToolStats())
+        stats.calls += 1
+        stats.errors += failed
+        stats.total_time += elapsed
+        stats.max_time = max(stats.max_time, elapsed)
+        stats.last_time = elapsed
+        logger.debug(f"Tool '{name}' ran in {elapsed:.3f}s")
+
+    async def run(self, tool: Tool, arguments: Dict[str, Any]) -> Any:
+        """Run a tool with its arguments and return its result"""
+        async with self._limit(tool) or nullcontext():
+            started = time.perf_counter()
+            failed = True
+            try:
+                if tool.is_async:
+                    result = await tool.arun(**arguments)
+                else:
+                    # Like asyncio.to_thread, the tool sees the caller's context variables
+                    call = functools.partial(contextvars.copy_context().run, tool.run, **arguments)
+                    result = await asyncio.get_running_loop().run_in_executor(self._pool, call)
+                failed = False
+                return result
+            finally:
+                self._record(tool.name, time.perf_counter() - started, failed)
+
+_executor: Optional[ToolExecutor] = None
+
+def get_tool_executor() -> ToolExecutor:
+    """Returns the process-wide tool executor.
+    Its thread pool size is set with the COGNITRIX_TOOL_THREADS environment variable"""
+    global _executor
+    if _executor is None:
+        _executor = ToolExecutor()
+    return _executor
+
+def tool_stats() -> Dict[str, Dict[str, Any]]:
+    """Timing of the calls of every tool that ran"""
+    if _executor is None:
+        return {}
+    return {name: stats.dict() for name, stats in _executor.stats.items()}
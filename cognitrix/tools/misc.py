@@ -1,26 +1,20 @@
 import json
 import shutil
 from webbrowser import open_new_tab
-from typing import Union, Optional, Any, Tuple, Dict, List
-from webbrowser import open_new_tab
+from typing import TYPE_CHECKING, Union, Optional, Any, Tuple, Dict, List
 from cognitrix.tools.base import Tool
 from cognitrix.tools.tool import tool
-from cognitrix.agents import Agent
-from cognitrix.llms import LLM
 from cognitrix.utils import xml_return_format
-from tavily import TavilyClient
-from bs4 import BeautifulSoup
+from cognitrix.utils.screen import current_screen, parse_bool, parse_region
 from pathlib import Path
 from rich import print
-from PIL import Image
-import wikipedia as wk
-import pyautogui
-import requests
 import logging 
-import aiohttp
 import sys
 import os
 
+if TYPE_CHECKING:
+    from cognitrix.agents import Agent
+
 NotImplementedErrorMessage = 'this tool does not suport async'
 
 logging.basicConfig(
@@ -83,6 +77,8 @@ class YoutubePlayer(Tool):
     def run(self, topic: str):
         """Play a YouTube Video"""
 
+        import requests
+
         url = f"https://www.youtube.com/results?q={topic}"
         count = 0
         cont = requests.get(url)
@@ -468,10 +464,17 @@ class FSBrowser(Tool):
         
         return 'Delete operation successfull'
     
-@tool(category='system')
-def take_screenshot():
+@tool(category='system', max_concurrency=1, concurrency_group='screen')
+def take_screenshot(max_size: int = 0, region: str = '', diff: bool = False):
     """Use this tool to take a screenshot of the screen.
     
+    Args:
+        max_size (int): Maximum width or height of the screenshot in pixels. Larger screenshots are downscaled, 0 keeps the full size.
+        region (str): Optional area of the screen to capture as "x,y,width,height".
+        diff (bool): Only show what changed since the previous screenshot. Unchanged screens aren't sent again.
+    
+    Coordinates given to the mouse tools are relative to the last screenshot.
+    
     Usage Example:
     
     User: take a screenshot
@@ -495,11 +498,13 @@ def take_screenshot():
         <artifacts></artifacts>
     </response>
     """
-    screenshot = pyautogui.screenshot()
+    image, caption = current_screen().capture(int(max_size or 0), parse_region(region), parse_bool(diff))
+    if image is None:
+        return caption
     
-    return ['image', screenshot]
+    return ['image', image, caption]
 
-@tool(category='system')
+@tool(category='system', max_concurrency=1, concurrency_group='screen')
 def text_input(text: str):
     """Use this tool to take make text inputs.
     Args:
@@ -534,11 +539,13 @@ def text_input(text: str):
         <artifacts></artifacts>
     </response>
     """
+    import pyautogui
+
     screenshot = pyautogui.write(text, 0.15)
     
     return 'Text input completed'
 
-@tool(category='system')
+@tool(category='system', max_concurrency=1, concurrency_group='screen')
 def key_press(key: str):
     """Use this tool to take make key presses.
     Args:
@@ -558,11 +565,13 @@ def key_press(key: str):
         "arguments": ["win"]
     }
     """
+    import pyautogui
+
     screenshot = pyautogui.press(key.lower())
     
     return 'Keypress completed'
 
-@tool(category='system')
+@tool(category='system', max_concurrency=1, concurrency_group='screen')
 def hot_key(hotkeys: list):
     """Use this tool to take make hot key presses.
     Args:
@@ -581,11 +590,13 @@ def hot_key(hotkeys: list):
             "arguments": ["ctrl", "v"]
         }
     """
+    import pyautogui
+
     screenshot = pyautogui.hotkey(*hotkeys)
     
     return 'Keypress completed'
 
-@tool(category='system')
+@tool(category='system', max_concurrency=1, concurrency_group='screen')
 def mouse_click(x: int, y: int):
     """Use this tool to take make mouse clicks.
     Args:
@@ -605,11 +616,13 @@ def mouse_click(x: int, y: int):
             "arguments": ["123", "456"]
         }
     """
-    screenshot = pyautogui.click(x, y)
+    import pyautogui
+
+    screenshot = pyautogui.click(*current_screen().to_screen(x, y))
     
     return 'Mouse Click completed'
 
-@tool(category='system')
+@tool(category='system', max_concurrency=1, concurrency_group='screen')
 def mouse_double_click(x: int, y: int):
     """Use this tool to take make mouse double clicks.
     Args:
@@ -629,11 +642,13 @@ def mouse_double_click(x: int, y: int):
             "arguments": ["123", "456"]
         }
     """
-    screenshot = pyautogui.doubleClick(x, y)
+    import pyautogui
+
+    screenshot = pyautogui.doubleClick(*current_screen().to_screen(x, y))
     
     return 'Mouse double-click completed.'
 
-@tool(category='system')
+@tool(category='system', max_concurrency=1, concurrency_group='screen')
 def mouse_right_click(x: int, y: int):
     """Use this tool to take make mouse right clicks.
     Args:
@@ -669,12 +684,14 @@ def mouse_right_click(x: int, y: int):
             <artifacts></artifacts>
         </response>
     """
-    screenshot = pyautogui.rightClick(x, y)
+    import pyautogui
+
+    screenshot = pyautogui.rightClick(*current_screen().to_screen(x, y))
     
     return 'Mouse double-click completed.'
 
 @tool(category='system')
-async def create_sub_agent(name: str, llm: str, description: str, tools: List[str], parent: Agent):
+async def create_sub_agent(name: str, llm: str, description: str, tools: List[str], parent: 'Agent'):
     """Use this tool to create sub agents for specific tasks.
     
     Args:
@@ -748,6 +765,8 @@ async def create_sub_agent(name: str, llm: str, description: str, tools: List[st
             <artifacts></artifacts>
         </response>
     """
+    from cognitrix.agents import Agent
+    from cognitrix.llms import LLM
     
     sub_agent: Optional[Agent] = None
     
@@ -787,7 +806,7 @@ async def create_sub_agent(name: str, llm: str, description: str, tools: List[st
     return "Error creating sub agent"
 
 @tool(category='system')
-def call_sub_agent(name: str, task: str, parent: Agent):
+def call_sub_agent(name: str, task: str, parent: 'Agent'):
     """Run a task with a sub agent
     
     Args:
@@ -863,6 +882,7 @@ def internet_search(query: str, search_depth: str = "basic"):
             <artifacts></artifacts>
         </response>
     """
+    from tavily import TavilyClient
     
     tavily = TavilyClient(api_key=os.getenv('TAVILY_API_KEY', ''))
     
@@ -907,7 +927,8 @@ def web_scraper(url: str|List[str]):
             <artifacts></artifacts>
         </response>
     """
-    
+    import requests
+    from bs4 import BeautifulSoup
     
     results: List[str] = []
     if isinstance(url, str):
@@ -968,6 +989,8 @@ def brave_search(query: str):
             <artifacts></artifacts>
         </response>
     """
+    import requests
+
     url = "https://api.search.brave.com/res/v1/web/search"
     
     params = {
@@ -1033,6 +1056,8 @@ def wikipedia(query: str, search_depth: str = 'basic'):
         <artifacts></artifacts>
     </response>
     """
+    import wikipedia as wk
+
     results = ''
     try:
         if search_depth == 'basic':
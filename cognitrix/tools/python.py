@@ -31,6 +31,7 @@ class PythonREPL(Tool):
     
     name: str = "Python REPL"
     category: str = "system"
+    max_concurrency: Optional[int] = 1
     description: str = """Use this tool to execute python code.
     
     :param code: the valid python code to execute
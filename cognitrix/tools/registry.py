@@ -0,0 +1,98 @@
+import logging
+import importlib
+from dataclasses import dataclass
+from importlib.metadata import entry_points
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from cognitrix.tools.base import Tool
+
+logger = logging.getLogger('cognitrix.log')
+
+ENTRY_POINT_GROUP = 'cognitrix.tools'
+"""Entry point group of tools installed by other packages"""
+
+@dataclass(frozen=True)
+class ToolSpec:
+    """Where a tool lives and what it needs, known without importing it"""
+
+    name: str
+    """Name of the tool, as the agents call it"""
+    category: str
+    """Category of the tool, empty if only known once it's imported"""
+    target: str
+    """'module:attribute' path of the tool function or class"""
+    requires: Tuple[str, ...] = ()
+    """Modules the tool imports when it runs"""
+
+TOOLS: List[ToolSpec] = [
+    ToolSpec('Calculator', 'general', 'cognitrix.tools.misc:Calculator'),
+    ToolSpec('Youtube Player', 'web', 'cognitrix.tools.misc:YoutubePlayer', ('requests',)),
+    ToolSpec('Internet Browser', 'web', 'cognitrix.tools.misc:InternetBrowser'),
+    ToolSpec('File System Browser', 'system', 'cognitrix.tools.misc:FSBrowser'),
+    ToolSpec('Take Screenshot', 'system', 'cognitrix.tools.misc:take_screenshot', ('pyautogui',)),
+    ToolSpec('Text Input', 'system', 'cognitrix.tools.misc:text_input', ('pyautogui',)),
+    ToolSpec('Key Press', 'system', 'cognitrix.tools.misc:key_press', ('pyautogui',)),
+    ToolSpec('Hot Key', 'system', 'cognitrix.tools.misc:hot_key', ('pyautogui',)),
+    ToolSpec('Mouse Click', 'system', 'cognitrix.tools.misc:mouse_click', ('pyautogui',)),
+    ToolSpec('Mouse Double Click', 'system', 'cognitrix.tools.misc:mouse_double_click', ('pyautogui',)),
+    ToolSpec('Mouse Right Click', 'system', 'cognitrix.tools.misc:mouse_right_click', ('pyautogui',)),
+    ToolSpec('Create Sub Agent', 'system', 'cognitrix.tools.misc:create_sub_agent'),
+    ToolSpec('Call Sub Agent', 'system', 'cognitrix.tools.misc:call_sub_agent'),
+    ToolSpec('Internet Search', 'web', 'cognitrix.tools.misc:internet_search', ('tavily',)),
+    ToolSpec('Web Scraper', 'web', 'cognitrix.tools.misc:web_scraper', ('requests', 'bs4')),
+    ToolSpec('Brave Search', 'web', 'cognitrix.tools.misc:brave_search', ('requests',)),
+    ToolSpec('Wikipedia', 'web', 'cognitrix.tools.misc:wikipedia', ('wikipedia',)),
+    ToolSpec('Python REPL', 'system', 'cognitrix.tools.python:PythonREPL'),
+]
+"""Built-in tools"""
+
+_tools: Optional[Dict[str, ToolSpec]] = None
+_loaded: Dict[str, 'Tool'] = {}
+
+def normalize_name(name: str) -> str:
+    """Lowercase name with single spaces, so 'Web Scraper', 'web_scraper' and 'web-scraper' match"""
+    return ' '.join(name.replace('_', ' ').replace('-', ' ').split()).lower()
+
+def tool_specs() -> Dict[str, ToolSpec]:
+    """Built-in tools and those registered under the 'cognitrix.tools' entry point group, by normalized name"""
+    global _tools
+    if _tools is None:
+        registry = {normalize_name(spec.name): spec for spec in TOOLS}
+        try:
+            for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+                name = entry_point.name.replace('_', ' ')
+                if normalize_name(name) in registry:
+                    logger.warning(f"Tool '{entry_point.name}' from {entry_point.value} is already registered")
+                    continue
+                registry[normalize_name(name)] = ToolSpec(name, '', entry_point.value)
+        except Exception as e:
+            logger.warning(f"Couldn't read the tool entry points: {e}")
+        _tools = registry
+    return _tools
+
+def register_tool(spec: ToolSpec):
+    """Register a tool, replacing any with the same name"""
+    key = normalize_name(spec.name)
+    tool_specs()[key] = spec
+    _loaded.pop(key, None)
+
+def get_tool_spec(name: str) -> Optional[ToolSpec]:
+    return tool_specs().get(normalize_name(name))
+
+def load_tool(spec: ToolSpec) -> 'Tool':
+    """
+    Import a tool. Function tools are used as is and tool classes are
+    instantiated, once per process, so a tool keeps its state between calls.
+    """
+    key = normalize_name(spec.name)
+    if key not in _loaded:
+        module, _, attribute = spec.target.partition(':')
+        tool = getattr(importlib.import_module(module), attribute)
+        _loaded[key] = tool() if isinstance(tool, type) else tool
+    return _loaded[key]
+
+def get_tool(name: str) -> Optional['Tool']:
+    """The tool with a name, loaded on first use"""
+    spec = get_tool_spec(name)
+    return load_tool(spec) if spec else None
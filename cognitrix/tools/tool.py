@@ -1,6 +1,6 @@
 from functools import wraps
 from typing import Callable
-from cognitrix.tools import Tool
+from cognitrix.tools.base import Tool
 from typing import Any
 import inspect
 
@@ -20,17 +20,23 @@ def tool(*args: Any, **kwargs: Any):
                 if inspect.iscoroutinefunction(func):
                     return await wrapper(*args, **kwargs)
                 raise NotImplementedError("Synchronous execution is not supported for synchronous functions")
+            
+            @property
+            def is_async(self) -> bool:
+                return inspect.iscoroutinefunction(func)
 
         new_tool = GenericTool(
             name=' '.join(func.__name__.split('_')).title(),
             description=str(func.__doc__),
-            category=kwargs.get('category', 'general')
+            category=kwargs.get('category', 'general'),
+            max_concurrency=kwargs.get('max_concurrency'),
+            concurrency_group=kwargs.get('concurrency_group', '')
         )
         
         func_signatures = inspect.signature(func)
         func_parameters = func_signatures.parameters
         
-        new_tool.parameters = {key: value.annotation.__name__ for key, value in func_parameters.items()}
+        new_tool.parameters = {key: getattr(value.annotation, '__name__', str(value.annotation)) for key, value in func_parameters.items()}
 
         return new_tool
     
@@ -1,7 +1,7 @@
 from PIL import Image
-from typing import Dict
+from typing import Any, Dict
 import xml.etree.ElementTree as ET
-from cognitrix.tools import Tool
+from cognitrix.tools.base import Tool
 import base64
 import io
 import re
@@ -244,6 +244,33 @@ def extract_parts(text):
     else:
         return None, None, None
 
+def add_child_value(result: dict, tag: str, value: Any):
+    """Adds a parsed child element to a dict, turning repeated tags into lists"""
+    if tag in result:
+        if isinstance(result[tag], list):
+            result[tag].append(value)
+        else:
+            result[tag] = [result[tag], value]
+    else:
+        result[tag] = value
+
+def element_to_dict(element: ET.Element) -> dict | str:
+    """
+    Recursively convert an XML element into a dictionary.
+
+    Elements with non-blank text are returned as the stripped text,
+    otherwise their children are converted and repeated tags are
+    collected into lists.
+    """
+    if element.text and element.text.strip():
+        return element.text.strip()
+    
+    result: dict = {}
+    for child in element:
+        add_child_value(result, child.tag, element_to_dict(child))
+    
+    return result
+
 def xml_to_dict(xml_string) -> dict | str:
     """
     Convert an XML string to a Python dictionary.
@@ -280,28 +307,12 @@ def xml_to_dict(xml_string) -> dict | str:
         
         root = ET.fromstring(xml_string)
         
-        def parse_element(element):
-            result = {}
-            if element.text and element.text.strip():
-                return element.text.strip()
-            
-            for child in element:
-                child_data = parse_element(child)
-                if child.tag in result:
-                    if isinstance(result[child.tag], list):
-                        result[child.tag].append(child_data)
-                    else:
-                        result[child.tag] = [result[child.tag], child_data]
-                else:
-                    result[child.tag] = child_data
-
-            if element.tag.lower() == 'response':
-                result['before'] = before
-                result['after'] = after
-            
-            return result
+        result = element_to_dict(root)
+        if isinstance(result, dict):
+            result['before'] = before
+            result['after'] = after
         
-        return {root.tag: parse_element(root)}
+        return {root.tag: result}
     except Exception as e:
         # logging.exception(e)
         return xml_string
@@ -0,0 +1,111 @@
+import hashlib
+from contextvars import ContextVar
+from typing import Callable, Optional, Tuple
+
+from PIL import Image, ImageChops
+
+Region = Tuple[int, int, int, int]
+"""Left, top, width and height of a screen area"""
+
+def parse_region(region: str | Region | None) -> Optional[Region]:
+    """Parse a region given as "x,y,width,height" """
+    if not region:
+        return None
+    if isinstance(region, str):
+        values = [int(float(value)) for value in region.replace(' ', ',').split(',') if value]
+    else:
+        values = [int(value) for value in region]
+    if len(values) != 4 or values[2] <= 0 or values[3] <= 0:
+        raise ValueError(f"Region should be 'x,y,width,height', got {region!r}")
+    return (values[0], values[1], values[2], values[3])
+
+def parse_bool(value: str | bool | None) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+def grab_screen(*args, **kwargs) -> Image.Image:
+    # pyautogui needs a display, so it's only imported once a screen tool runs
+    import pyautogui
+    return pyautogui.screenshot(*args, **kwargs)
+
+class ScreenCapture:
+    """
+    Takes screenshots sized for vision models.
+
+    Screenshots can be limited to a region and are downscaled so their
+    longest side is at most `max_size`. In diff mode, a screenshot which
+    didn't change since the previous one is skipped, and one which did is
+    cropped to the changed area.
+
+    The capture remembers where the last screenshot sits on the screen, so
+    coordinates picked on it can be mapped back with `to_screen`.
+
+    Args:
+        grab (Callable): Takes a screenshot, optionally of a region
+        margin (int): Pixels kept around the changed area in diff mode
+    """
+
+    def __init__(self, grab: Callable[..., Image.Image] = grab_screen, margin: int = 16):
+        self.grab = grab
+        self.margin = margin
+        self.left = 0.0
+        self.top = 0.0
+        self.scale = 1.0
+        self._previous: Optional[Tuple[tuple, str, Image.Image]] = None
+
+    def to_screen(self, x: float, y: float) -> Tuple[int, int]:
+        """Map coordinates on the last screenshot to screen coordinates"""
+        return round(self.left + float(x) / self.scale), round(self.top + float(y) / self.scale)
+
+    @staticmethod
+    def resize(image: Image.Image, max_size: int) -> Tuple[Image.Image, float]:
+        """Downscale an image so its longest side is at most max_size. Returns the image and the scale"""
+        longest = max(image.size)
+        if not max_size or longest <= max_size:
+            return image, 1.0
+        scale = max_size / longest
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        return image.resize(size, Image.Resampling.LANCZOS), scale
+
+    def capture(self, max_size: int = 0, region: Optional[Region] = None, diff: bool = False) -> Tuple[Optional[Image.Image], str]:
+        """Take a screenshot.
+
+        Returns:
+            The image, or None when diff is set and the screen didn't change,
+            and a short description of what the image shows
+        """
+        screenshot = self.grab(region=region) if region else self.grab()
+        image, scale = self.resize(screenshot, max_size)
+        left, top = (region[0], region[1]) if region else (0, 0)
+
+        key = (region, image.size)
+        digest = hashlib.sha1(image.tobytes()).hexdigest()
+        previous = self._previous if self._previous and self._previous[0] == key else None
+        self._previous = (key, digest, image)
+
+        if diff and previous:
+            if previous[1] == digest:
+                return None, 'The screen has not changed since the last screenshot.'
+
+            box = ImageChops.difference(previous[2].convert('RGB'), image.convert('RGB')).getbbox()
+            if box:
+                box = (
+                    max(box[0] - self.margin, 0),
+                    max(box[1] - self.margin, 0),
+                    min(box[2] + self.margin, image.width),
+                    min(box[3] + self.margin, image.height)
+                )
+                if (box[2] - box[0]) * (box[3] - box[1]) < image.width * image.height:
+                    self.left, self.top, self.scale = left + box[0] / scale, top + box[1] / scale, scale
+                    return image.crop(box), 'This is the part of the screen which changed since the last screenshot.'
+
+        self.left, self.top, self.scale = left, top, scale
+        return image, 'This is the result of the latest screenshot'
+
+screen_capture: ContextVar[Optional[ScreenCapture]] = ContextVar('screen_capture', default=None)
+"""Screen capture of the running session, so each session diffs and maps coordinates against its own screenshots"""
+
+def current_screen() -> ScreenCapture:
+    """The screen capture of the running session, or a new one outside of a session"""
+    return screen_capture.get() or ScreenCapture()
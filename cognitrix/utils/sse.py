@@ -5,6 +5,7 @@ from fastapi import FastAPI, Request
 from sse_starlette.sse import EventSourceResponse
 from cognitrix.agents import PromptGenerator
 from cognitrix.llms.session import Session
+from cognitrix.llms.scheduler import Priority, set_priority
 from cognitrix.agents import Agent, AIAssistant
 import asyncio
 
@@ -19,6 +20,7 @@ class SSEManager:
 
     async def sse_endpoint(self, request: Request):
         async def event_generator():
+            set_priority(Priority.INTERACTIVE)
             while True:
                 if await request.is_disconnected():
                     break
@@ -48,13 +50,13 @@ class SSEManager:
                         if loaded_agent:
                             self.agent = loaded_agent
                             self.agent.llm.chat_history = session.chat
-                            session.save()
+                            await session.save()
                             await self.agent.save()
                         yield {'event': 'message', 'data': json.dumps({'type': 'chat_history', 'content': session.chat, 'agent_name': self.agent.name, 'action': 'delete'})}
                             
                 elif action['type'] == 'sessions':
                     if action['action'] == 'list':
-                        sessions = [sess.dict() for sess in Session.list_sessions()]
+                        sessions = [sess.dict() for sess in await Session.list_sessions()]
                         yield {'event': 'message', 'data': json.dumps({'type': 'sessions', 'content': sessions, 'action': 'list'})}
                     
                     elif action['action'] == 'get':
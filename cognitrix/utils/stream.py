@@ -0,0 +1,118 @@
+import time
+import asyncio
+import inspect
+from typing import Any, Callable, List, Optional
+
+class ChunkCoalescer:
+    """
+    Coalesces streamed chunks into fewer, larger writes.
+
+    Chunks are buffered and written once ``interval`` seconds have passed
+    since the last write or ``max_bytes`` characters are buffered. Async
+    writes run one at a time in the background; chunks that arrive while a
+    write is in flight are merged into the next one, and ``add`` only waits
+    on the transport when more than ``high_water`` characters are pending.
+
+    Args:
+        write (Callable): Receives the coalesced text. May be sync or async.
+        interval (float): Maximum time in seconds a chunk is held back
+        max_bytes (int): Buffer size that triggers an immediate write
+        high_water (int): Buffer size at which add() waits for the transport
+    """
+
+    def __init__(self, write: Callable[[str], Any], interval: float = 0.05, max_bytes: int = 1024, high_water: int = 65536):
+        self.write = write
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.high_water = high_water
+        self.frames: int = 0
+        """Number of writes made so far"""
+
+        self._buffer: List[str] = []
+        self._size: int = 0
+        self._last_write: float = time.monotonic()
+        self._sending: Optional[asyncio.Future] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._error: Optional[BaseException] = None
+        self._closed: bool = False
+
+    async def add(self, chunk: str):
+        """Queue a chunk to be written"""
+        if self._closed:
+            raise RuntimeError('ChunkCoalescer is closed')
+        self._raise_error()
+        if not chunk:
+            return
+
+        self._buffer.append(chunk)
+        self._size += len(chunk)
+
+        if self._sending and self._size >= self.high_water:
+            await asyncio.wait([self._sending])
+            self._raise_error()
+
+        self._schedule()
+
+    async def flush(self):
+        """Write out everything that is buffered and wait for it to be sent"""
+        self._cancel_timer()
+        while self._sending or self._buffer:
+            if self._sending:
+                sending = self._sending
+                await asyncio.wait([sending])
+                if self._sending is sending:
+                    self._sending = None
+            else:
+                self._write()
+        self._raise_error()
+
+    async def close(self):
+        """Flush and stop, so nothing is written after the stream ends"""
+        self._closed = True
+        await self.flush()
+
+    def _schedule(self):
+        if self._sending or not self._buffer:
+            return
+
+        elapsed = time.monotonic() - self._last_write
+        if self._size >= self.max_bytes or elapsed >= self.interval:
+            self._write()
+        elif not self._timer:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.interval - elapsed, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self._schedule()
+
+    def _cancel_timer(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+    def _write(self):
+        self._cancel_timer()
+        text = ''.join(self._buffer)
+        self._buffer = []
+        self._size = 0
+        self._last_write = time.monotonic()
+        self.frames += 1
+
+        result = self.write(text)
+        if inspect.isawaitable(result):
+            self._sending = asyncio.ensure_future(result)
+            self._sending.add_done_callback(self._on_sent)
+
+    def _on_sent(self, future: asyncio.Future):
+        if self._sending is future:
+            self._sending = None
+        if not future.cancelled() and future.exception():
+            self._error = future.exception()
+            return
+        self._schedule()
+
+    def _raise_error(self):
+        if self._error:
+            error, self._error = self._error, None
+            raise error
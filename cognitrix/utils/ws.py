@@ -9,6 +9,7 @@ from cognitrix.agents import PromptGenerator
 from cognitrix.agents import TaskInstructor
 
 from cognitrix.llms.session import Session
+from cognitrix.llms.scheduler import Priority, set_priority
 from cognitrix.agents import Agent
 
 logger = logging.getLogger('cognitrix.log')
@@ -19,6 +20,7 @@ class WebSocketManager:
     
     async def websocket_endpoint(self, websocket: WebSocket):
         web_agent = self.agent
+        set_priority(Priority.INTERACTIVE)
         await websocket.accept()
         session = await Session.get_by_agent_id(web_agent.id)
         try:
@@ -63,7 +65,7 @@ class WebSocketManager:
                         elif action == 'delete':
                             session = await Session.load(session_id)
                             session.chat = []
-                            session.save()
+                            await session.save()
                             await websocket.send_json({'type': query_type, 'content': session.chat, 'agent_name': web_agent.name, 'action': action})
                                 
                     elif query_type == 'sessions':
@@ -0,0 +1,122 @@
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, List, Optional, Tuple
+
+from cognitrix.utils import element_to_dict, add_child_value
+
+StreamEvent = Tuple[str, Optional[str], Any]
+
+def partial_suffix(text: str, tag: str) -> int:
+    """Length of the longest suffix of text which is a prefix of tag"""
+    for size in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:size]):
+            return size
+    return 0
+
+class XMLStreamParser:
+    """
+    Incrementally parses a streamed ``<response>`` document.
+
+    Each chunk is fed once to an ``XMLPullParser`` so parsing a reply is
+    linear in its length. Children of the root element are converted with
+    ``element_to_dict`` as soon as they close, and every ``<tool>`` inside
+    ``<tool_calls>`` is reported the moment its closing tag arrives.
+
+    Text before the first ``<response>`` and after the first ``</response>``
+    is kept in ``before`` and ``after``, the same split ``xml_to_dict`` makes.
+
+    ``feed`` returns a list of events:
+        ('start', None, None): the root element was opened
+        ('element', tag, value): a direct child of the root was closed
+        ('tool', 'tool', value): a tool call was closed
+        ('end', None, value): the root was closed, value is the parsed root
+    """
+
+    ROOT = 'response'
+    START_TAG = f'<{ROOT}>'
+    END_TAG = f'</{ROOT}>'
+
+    def __init__(self):
+        self.before: str = ''
+        self.after: str = ''
+        self.data: Dict[str, Any] = {}
+        self.tools: List[Any] = []
+        self.started: bool = False
+        self.closed: bool = False
+        self.failed: bool = False
+        self._pending: str = ''
+        self._stack: List[str] = []
+        self._root: Optional[ET.Element] = None
+        self._parser: Optional[ET.XMLPullParser] = None
+
+    def feed(self, chunk: str) -> List[StreamEvent]:
+        """Consume the next chunk of the stream"""
+        events: List[StreamEvent] = []
+
+        if self.closed:
+            self.after += chunk
+            return events
+
+        data = self._pending + chunk
+        self._pending = ''
+
+        if not self.started:
+            index = data.find(self.START_TAG)
+            if index == -1:
+                keep = partial_suffix(data, self.START_TAG)
+                self.before += data[:len(data) - keep]
+                self._pending = data[len(data) - keep:]
+                return events
+
+            self.before += data[:index]
+            data = data[index:]
+            self.started = True
+            self._parser = ET.XMLPullParser(events=('start', 'end'))
+            events.append(('start', None, None))
+
+        tail: Optional[str] = None
+        index = data.find(self.END_TAG)
+        if index == -1:
+            keep = partial_suffix(data, self.END_TAG)
+            body, self._pending = data[:len(data) - keep], data[len(data) - keep:]
+        else:
+            body, tail = data[:index + len(self.END_TAG)], data[index + len(self.END_TAG):]
+
+        if not self.failed:
+            self._consume(body, events)
+
+        if tail is not None:
+            self.closed = True
+            self.after = tail
+            if not self.failed:
+                events.append(('end', None, self.result()))
+
+        return events
+
+    def _consume(self, body: str, events: List[StreamEvent]):
+        try:
+            self._parser.feed(body) # type: ignore
+            for event, element in self._parser.read_events(): # type: ignore
+                if event == 'start':
+                    if self._root is None:
+                        self._root = element
+                    self._stack.append(element.tag)
+                    continue
+
+                self._stack.pop()
+                depth = len(self._stack)
+                if depth == 1:
+                    add_child_value(self.data, element.tag, element_to_dict(element))
+                    events.append(('element', element.tag, self.data[element.tag]))
+                elif depth == 2 and element.tag == 'tool' and self._stack[1] == 'tool_calls':
+                    tool = element_to_dict(element)
+                    self.tools.append(tool)
+                    events.append(('tool', element.tag, tool))
+        except ET.ParseError:
+            self.failed = True
+
+    def result(self) -> dict | str:
+        """The parsed root, shaped like the value ``xml_to_dict`` returns for it"""
+        if self._root is not None and self._root.text and self._root.text.strip():
+            return self._root.text.strip()
+
+        return {**self.data, 'before': self.before.strip(), 'after': self.after.strip()}
@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+# Keep the agents, sessions, caches and logs written by the tests out of the real ~/.cognitrix.
+# This runs before the tests import cognitrix, whose config reads these at import time.
+os.environ['HOME'] = tempfile.mkdtemp(prefix='cognitrix-tests-')
+os.environ['COGNITRIX_METRICS_LOG'] = ''
@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from cognitrix.llms import Replay
+
+class Tracking(Replay):
+    """Replay echoing queries after the delay they name, tracking the calls in flight"""
+
+    in_flight: int = 0
+    max_in_flight: int = 0
+    cancelled: int = 0
+
+    async def __call__(self, query: dict, system_prompt: str = '', chat_history: list = [], **kwds):
+        message = query['message']
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(float(message.split()[-1]))
+            if message.startswith('fail'):
+                raise ValueError(message)
+            async for response in super().__call__(query, system_prompt, chat_history, **kwds):
+                yield response
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+
+class TestBatch:
+
+    # Returns the responses in the order of the queries, whatever order they complete in
+    @pytest.mark.asyncio
+    async def test_order(self):
+        queries = ['first 0.05', 'second 0.01', 'third 0.03', 'fourth 0']
+        responses = await Tracking().batch(queries)
+
+        assert [response.text for response in responses] == queries
+
+    # Keeps at most `concurrency` calls in flight
+    @pytest.mark.asyncio
+    async def test_concurrency(self):
+        llm = Tracking()
+        responses = await llm.batch([f'query {index % 3 / 100}' for index in range(10)], concurrency=3)
+
+        assert len(responses) == 10
+        assert llm.max_in_flight == 3
+        assert llm.in_flight == 0
+
+    # Returns the exception of a failed query in its place
+    @pytest.mark.asyncio
+    async def test_return_exceptions(self):
+        responses = await Tracking().batch(['first 0', 'fail 0', 'third 0.01'], return_exceptions=True)
+
+        assert responses[0].text == 'first 0'
+        assert isinstance(responses[1], ValueError)
+        assert responses[2].text == 'third 0.01'
+
+    # Raises the first error and cancels the queries still in flight
+    @pytest.mark.asyncio
+    async def test_raises(self):
+        llm = Tracking()
+        with pytest.raises(ValueError):
+            await llm.batch(['slow 1', 'fail 0', 'slower 2'])
+        await asyncio.sleep(0)
+
+        assert llm.cancelled == 2
+        assert llm.in_flight == 0
+
+    # Falls back to separate calls when the provider has no batch endpoint
+    @pytest.mark.asyncio
+    async def test_native_fallback(self):
+        with pytest.raises(NotImplementedError):
+            await Tracking().native_batch(['first 0'])
+        responses = await Tracking().batch(['first 0', 'second 0'], native=True)
+
+        assert [response.text for response in responses] == ['first 0', 'second 0']
+
+
+class TestAsCompleted:
+
+    # Yields the index of each query with its response as they complete
+    @pytest.mark.asyncio
+    async def test_completion_order(self):
+        results = [(index, response.text) async for index, response in Tracking().as_completed(['first 0.05', 'second 0', 'third 0.02'])]
+
+        assert results == [(1, 'second 0'), (2, 'third 0.02'), (0, 'first 0.05')]
+
+    # Cancels the queries in flight when the consumer stops early
+    @pytest.mark.asyncio
+    async def test_stop_early(self):
+        llm = Tracking()
+        responses = llm.as_completed(['slow 1', 'fast 0', 'slower 2', 'waiting 0'], concurrency=3)
+        async for index, _ in responses:
+            break
+        await responses.aclose()
+        await asyncio.sleep(0)
+
+        assert index == 1
+        assert llm.cancelled == 2
+        assert llm.in_flight == 0
+
+    # Yields an error for a query cancelled from outside, and keeps going
+    @pytest.mark.asyncio
+    async def test_cancelled_query(self):
+        llm = Tracking()
+        results = {}
+        async for index, result in llm.as_completed(['cancel 1', 'second 0.01']):
+            results[index] = result
+            if index == 1:
+                for task in asyncio.all_tasks():
+                    if task.get_coro().__name__ == 'complete':
+                        task.cancel()
+
+        assert isinstance(results[0], RuntimeError)
+        assert results[1].text == 'second 0.01'
@@ -0,0 +1,89 @@
+import os
+import time
+
+import pytest
+from PIL import Image
+
+from cognitrix.agents import Agent
+from cognitrix.llms import Replay
+from cognitrix.llms.session import Session
+from cognitrix.storage.blobs import BlobStore, get_blob_store
+from cognitrix.tools import tool
+
+SNAPSHOT_CALL = "<response><type>tool_calls</type><tool_calls><tool><name>Snapshot</name><arguments></arguments></tool></tool_calls></response>"
+
+def image(color: str) -> Image.Image:
+    return Image.new('RGB', (8, 8), color)
+
+@tool(category='test')
+def snapshot():
+    """Returns a screenshot"""
+    return ['image', image('red'), 'A screenshot']
+
+class Recording(Replay):
+    """Replay recording the query and chat history of each call"""
+
+    calls: list = []
+
+    async def __call__(self, query: dict, system_prompt: str = '', chat_history: list = [], **kwds):
+        self.calls.append((query, list(chat_history)))
+        async for response in super().__call__(query, system_prompt, chat_history, **kwds):
+            yield response
+
+def backdate(store: BlobStore, blob_id: str, seconds: float = 3600):
+    past = time.time() - seconds
+    os.utime(store.path(blob_id), (past, past))
+
+
+class TestBlobs:
+
+    # Image results of tools are left out of the tool result text and returned to be sent as images
+    @pytest.mark.asyncio
+    async def test_call_tools_image(self):
+        agent = Agent(llm=Replay(), tools=[snapshot])
+        result = await agent.call_tools({'tool': {'name': 'Snapshot', 'arguments': {}}})
+
+        assert 'A screenshot (attached as an image)' in result['result']
+        assert 'PIL' not in result['result']
+        assert [image[0] for image in result['images']] == ['image']
+
+    # A session sends the screenshot of a tool to the llm as an image message referencing a blob
+    @pytest.mark.asyncio
+    async def test_session_sends_images(self):
+        llm = Recording(responses=[SNAPSHOT_CALL, 'done'])
+        session = Session()
+        await session('Take a screenshot', Agent(llm=llm, tools=[snapshot]), output=lambda *args, **kwargs: None)
+
+        query, history = llm.calls[1]
+        assert history[-1]['type'] == 'image'
+        assert history[-1]['message'] == 'A screenshot'
+        assert get_blob_store().get_image(history[-1]['blob']).size == (8, 8)
+        assert 'PIL' not in query['message']
+        assert [message['type'] for message in session.chat] == ['text', 'text', 'image', 'text', 'text']
+
+    # Deleting a session deletes the blobs no other session references
+    @pytest.mark.asyncio
+    async def test_delete_session_collects_blobs(self):
+        store = get_blob_store()
+        shared, own = store.put_image(image('blue')), store.put_image(image('green'))
+        first, second = Session(), Session()
+        first.chat = [{'role': 'User', 'type': 'image', 'blob': shared, 'message': ''}, {'role': 'User', 'type': 'image', 'blob': own, 'message': ''}]
+        second.chat = [{'role': 'User', 'type': 'image', 'blob': shared, 'message': ''}]
+        await first.save()
+        await second.save()
+        backdate(store, shared)
+        backdate(store, own)
+
+        await Session.delete(first.id)
+
+        assert store.exists(shared)
+        assert not store.exists(own)
+
+    # Keeps unreferenced blobs saved within the grace period
+    def test_collect_grace(self, tmp_path):
+        store = BlobStore(tmp_path)
+        old, new = store.put(b'old'), store.put(b'new')
+        backdate(store, old)
+
+        assert store.collect(set(), grace=600) == 1
+        assert store.exists(new) and not store.exists(old)
@@ -0,0 +1,80 @@
+import os
+import time
+
+import pytest
+
+from cognitrix.llms import Replay
+from cognitrix.llms.cache import ResponseCache
+
+QUERY = {'role': 'User', 'type': 'text', 'message': 'Hi'}
+
+async def collect(llm):
+    async for response in llm(QUERY, 'system prompt'):
+        pass
+    return ''.join(response.chunks)
+
+
+class TestResponseCache:
+
+    # Keeps the most recently used entries in memory and reloads the others from disk
+    @pytest.mark.asyncio
+    async def test_memory_lru(self, tmp_path):
+        cache = ResponseCache(tmp_path, max_entries=2)
+        await cache.set('aa', ['a'])
+        await cache.set('bb', ['b'])
+        await cache.get('aa')
+        await cache.set('cc', ['c'])
+
+        assert list(cache._memory) == ['aa', 'cc']
+        assert await cache.get('bb') == ['b']
+        assert list(cache._memory) == ['cc', 'bb']
+
+    # Removes the oldest files once the disk tier grows past max_bytes
+    @pytest.mark.asyncio
+    async def test_disk_eviction(self, tmp_path):
+        cache = ResponseCache(tmp_path, max_bytes=250)
+        for index, key in enumerate(['aa', 'bb', 'cc']):
+            await cache.set(key, ['x' * 50])
+            past = time.time() - 100 + index
+            os.utime(cache._path(key), (past, past))
+        await cache.set('dd', ['x' * 50])
+
+        assert [cache._path(key).exists() for key in ['aa', 'bb', 'cc', 'dd']] == [False, False, True, True]
+        assert cache._disk_usage() <= 250 * 0.9
+
+    # Keeps the size of the disk tier right when entries are overwritten or expire
+    @pytest.mark.asyncio
+    async def test_disk_bytes(self, tmp_path):
+        cache = ResponseCache(tmp_path, ttl=60)
+        await cache.set('aa', ['a'])
+        for chunks in (['b' * 100], ['c'], ['d' * 10]):
+            await cache.set('bb', chunks)
+            assert cache._disk_bytes == cache._disk_usage()
+
+        cache._memory['bb']['created_at'] -= 120
+        assert await cache.get('bb') is None
+        assert cache._disk_bytes == cache._disk_usage()
+
+    # Drops entries older than the ttl
+    @pytest.mark.asyncio
+    async def test_ttl(self, tmp_path):
+        cache = ResponseCache(tmp_path, ttl=60)
+        await cache.set('aa', ['a'])
+        cache._memory['aa']['created_at'] -= 120
+
+        assert await cache.get('aa') is None
+        assert not cache._path('aa').exists()
+
+    # Keys change with anything the response depends on
+    def test_key(self):
+        assert ResponseCache.key(model='a', args=(QUERY,)) == ResponseCache.key(args=(QUERY,), model='a')
+        assert ResponseCache.key(model='a', args=(QUERY,)) != ResponseCache.key(model='b', args=(QUERY,))
+
+    # An llm with caching on replays the cached response of an identical query
+    @pytest.mark.asyncio
+    async def test_llm_cache(self):
+        llm = Replay(responses=['first', 'second'], cache=True, model='cache-test')
+
+        assert await collect(llm) == 'first'
+        assert await collect(llm) == 'first'
+        assert await collect(Replay(responses=['second'], model='cache-test')) == 'second'
@@ -0,0 +1,65 @@
+import time
+import asyncio
+
+import pytest
+
+from cognitrix.llms.clients import close_clients, get_client, run_sync
+
+class Client:
+    """Stands in for a provider sdk client"""
+
+    def __init__(self):
+        self.closed = False
+
+    async def aclose(self):
+        self.closed = True
+
+
+class TestClients:
+
+    # Shares a client between llms with the same provider, api key and base url
+    def test_shared_per_key(self):
+        first = get_client('test-shared', Client, api_key='key')
+
+        assert get_client('test-shared', Client, api_key='key') is first
+        assert get_client('test-shared', Client, api_key='other key') is not first
+        assert get_client('test-shared', Client, api_key='key', base_url='http://localhost') is not first
+
+    # Async clients are bound to the event loop they were created in
+    def test_async_clients_per_loop(self):
+        async def client():
+            return get_client('test-loop', Client, is_async=True)
+
+        async def same_loop():
+            return await client() is await client()
+
+        assert asyncio.run(same_loop())
+        assert asyncio.run(client()) is not asyncio.run(client())
+        with pytest.raises(RuntimeError):
+            get_client('test-loop', Client, is_async=True)
+
+    # Closing the clients of a loop closes them and creates new ones on next use
+    @pytest.mark.asyncio
+    async def test_close_clients(self):
+        client = get_client('test-close', Client, is_async=True)
+        await close_clients()
+
+        assert client.closed
+        assert get_client('test-close', Client, is_async=True) is not client
+
+    # Blocking sdk calls run in the llm thread pool while the event loop keeps going
+    @pytest.mark.asyncio
+    async def test_run_sync(self):
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(tick())
+        assert await run_sync(lambda seconds: time.sleep(seconds) or 'done', 0.1) == 'done'
+        ticker.cancel()
+
+        assert ticks >= 5
@@ -0,0 +1,32 @@
+from cognitrix.llms.context import ContextManager
+
+def message(role: str, text: str, **extra) -> dict:
+    return {'role': role, 'type': 'text', 'message': text, **extra}
+
+
+class TestContextManager:
+
+    # Sends the whole history when it fits
+    def test_keeps_history_that_fits(self):
+        history = [message('User', 'Hi'), message('Agent', 'Hello')]
+        selection = ContextManager('gpt-4o').select(history, 'system prompt', message('User', 'How are you?'))
+
+        assert selection.messages == history
+        assert selection.dropped == []
+
+    # Keeps the system and task messages and the latest turns, and notes what was left out
+    def test_trims_to_budget_keeping_pinned_messages(self):
+        task = message('system', 'Write a report about the weather')
+        step = message('User', 'Step #1: collect the forecasts', pinned=True)
+        turns = [message('User' if index % 2 else 'Agent', f'turn {index} ' + 'word ' * 100) for index in range(20)]
+        history = [task, step, *turns]
+
+        manager = ContextManager('gpt-4', window=1000, max_tokens=200)
+        selection = manager.select(history, 'system prompt', message('User', 'Step #2: summarize them'))
+
+        assert selection.messages[0] is task
+        assert selection.messages[1] is step
+        assert 'left out' in selection.messages[2]['message']
+        assert selection.messages[-1] is turns[-1]
+        assert selection.dropped and task not in selection.dropped and step not in selection.dropped
+        assert selection.tokens <= manager.budget
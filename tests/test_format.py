@@ -0,0 +1,52 @@
+from PIL import Image
+
+from cognitrix.llms import Replay
+from cognitrix.storage.blobs import get_blob_store
+
+formatted = []
+
+class Counting(Replay):
+    """Replay recording the messages it formats"""
+
+    def format_message(self, message: dict) -> list:
+        formatted.append(message.get('message'))
+        return [{'role': message['role'].lower(), 'content': message.get('message')}]
+
+class OtherProvider(Counting):
+    pass
+
+def text(message: str, role: str = 'User') -> dict:
+    return {'role': role, 'type': 'text', 'message': message}
+
+
+class TestFormatCache:
+
+    # Each turn only formats the messages added since the last one
+    def test_formats_new_messages(self):
+        formatted.clear()
+        llm = Counting()
+        history = [text('format one'), text('format two', 'Assistant')]
+        llm.format_query(text('format three'), history)
+        history.append(text('format three'))
+        result = llm.format_query(text('format four'), history)
+
+        assert formatted == ['format one', 'format two', 'format three', 'format four']
+        assert [message['content'] for message in result] == ['format one', 'format two', 'format three', 'format four']
+
+    # Providers format the same message separately
+    def test_per_provider(self):
+        formatted.clear()
+        Counting().format_messages([text('per provider')])
+        OtherProvider().format_messages([text('per provider')])
+
+        assert formatted == ['per provider', 'per provider']
+
+    # Image messages are keyed by their blob, so the image is only encoded once
+    def test_images(self):
+        formatted.clear()
+        blob = get_blob_store().put_image(Image.new('RGB', (4, 4), 'blue'))
+        image = {'role': 'User', 'type': 'image', 'message': 'image one', 'blob': blob}
+        Counting().format_messages([image])
+        Counting().format_messages([dict(image)])
+
+        assert formatted == ['image one']
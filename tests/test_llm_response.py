@@ -0,0 +1,81 @@
+from cognitrix.llms.base import LLMResponse
+
+RESPONSE = """```xml
+<response>
+    <observation>The user wants to add two numbers.</observation>
+    <thought>Use the calculator.</thought>
+    <type>tool_calls</type>
+    <result></result>
+    <tool_calls>
+        <tool>
+            <name>Calculator</name>
+            <arguments>
+                <math_expression>5 + 5</math_expression>
+            </arguments>
+        </tool>
+        <tool>
+            <name>Wikipedia</name>
+            <arguments>
+                <query>addition</query>
+            </arguments>
+        </tool>
+    </tool_calls>
+    <artifacts></artifacts>
+</response>
+```"""
+
+def stream(text: str, size: int, incremental: bool = True) -> LLMResponse:
+    response = LLMResponse(incremental=incremental)
+    for index in range(0, len(text), size):
+        response.add_chunk(text[index:index + size])
+    return response
+
+
+class TestIncrementalParsing:
+
+    # Matches the full re-parse for every chunk size
+    def test_matches_full_parse(self):
+        expected = stream(RESPONSE, len(RESPONSE), incremental=False)
+        for size in (1, 3, 7, 64):
+            response = stream(RESPONSE, size)
+            for attr in ('text', 'observation', 'thought', 'type', 'tool_calls', 'artifacts', 'before', 'after'):
+                assert getattr(response, attr) == getattr(expected, attr)
+
+    # Each tool is reported as soon as its closing tag arrives
+    def test_reports_closed_tools(self):
+        end_of_first_tool = RESPONSE.index('</tool>') + len('</tool>')
+        response = stream(RESPONSE[:end_of_first_tool], 5)
+
+        assert response.tools == [{'name': 'Calculator', 'arguments': {'math_expression': '5 + 5'}}]
+        assert response.tool_calls is None
+
+    # Plain text replies are exposed as text
+    def test_plain_text(self):
+        response = stream('Hello there, how can I help?', 4)
+
+        assert response.text == 'Hello there, how can I help?'
+
+    # Leading whitespace is stripped once, and text held back as a possible root tag is added when it isn't one
+    def test_plain_text_chunks(self):
+        for size in (1, 2, 5):
+            response = stream('\n  \n Use <res or <b>bold</b> text', size)
+
+            assert response.text == 'Use <res or <b>bold</b> text'
+
+    # Elements outside of the response format can't overwrite internals
+    def test_unknown_elements(self):
+        text = '<response><type>final_answer</type><parser>x</parser><usage>y</usage><tools>z</tools><result>Done</result></response>'
+        for response in (stream(text, 5), stream(text, len(text), incremental=False)):
+            assert response.type == 'final_answer'
+            assert response.text == 'Done'
+            assert response.usage == {}
+            assert response.tools == []
+            assert response.parser is None or response.parser.closed
+
+    # Malformed xml falls back to parsing the whole response
+    def test_malformed_xml_falls_back(self):
+        text = '<response><result>salt & pepper</result></response>'
+        response = stream(text, 6)
+
+        assert response.parser and response.parser.failed
+        assert response.text == stream(text, len(text), incremental=False).text
@@ -0,0 +1,33 @@
+import json
+import logging
+
+from cognitrix.llms.metrics import CallMetrics, MetricsRegistry
+
+
+class TestMetricsRegistry:
+
+    # Aggregates calls without writing a log unless one is configured
+    def test_log_is_off_by_default(self):
+        registry = MetricsRegistry()
+        registry.record(CallMetrics('openai', 'gpt-4o', ttft=0.2, latency=1.0, completion_tokens=40))
+
+        assert registry.log_path == ''
+        assert registry.snapshot()['openai:gpt-4o']['calls'] == 1
+
+    # Rotates the json lines log once it reaches max_bytes
+    def test_log_rotates(self, tmp_path):
+        path = tmp_path / 'metrics.jsonl'
+        registry = MetricsRegistry(log_path=str(path), max_bytes=1000, backups=2)
+        try:
+            for _ in range(20):
+                registry.record(CallMetrics('openai', 'gpt-4o', ttft=0.2, latency=1.0, completion_tokens=40))
+
+            assert path.stat().st_size <= 1000
+            assert (tmp_path / 'metrics.jsonl.1').exists()
+            assert not (tmp_path / 'metrics.jsonl.3').exists()
+            assert json.loads(path.read_text().splitlines()[0])['provider'] == 'openai'
+        finally:
+            log = logging.getLogger('cognitrix.metrics')
+            for handler in list(log.handlers):
+                handler.close()
+                log.removeHandler(handler)
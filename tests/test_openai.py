@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+
+import pytest
+
+from cognitrix.llms import OpenAI
+from cognitrix.llms.aimlapi_llm import AIMLAPI
+from cognitrix.llms.mindsdb_llm import MindsDB
+
+QUERY = {'role': 'User', 'type': 'text', 'message': 'Hi'}
+
+class Completions:
+    """Stands in for the chat completions api of the openai sdk, recording the request"""
+
+    def __init__(self):
+        self.kwargs = {}
+
+    async def create(self, **kwargs):
+        self.kwargs = kwargs
+
+        async def stream():
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content='Hello'))], usage=None)
+
+        return stream()
+
+async def request(llm_class) -> dict:
+    completions = Completions()
+    llm = llm_class(api_key='key', client=SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    async for _ in llm(QUERY, 'system prompt'):
+        pass
+    return completions.kwargs
+
+
+class TestStreamUsage:
+
+    # Asks the OpenAI api for the token usage of streams
+    @pytest.mark.asyncio
+    async def test_openai(self):
+        kwargs = await request(OpenAI)
+        assert kwargs['stream'] is True
+        assert kwargs['stream_options'] == {'include_usage': True}
+
+    # Doesn't send the OpenAI only stream_options to compatible apis
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('llm_class', [MindsDB, AIMLAPI])
+    async def test_compatible_apis(self, llm_class):
+        kwargs = await request(llm_class)
+        assert kwargs['stream'] is True
+        assert 'stream_options' not in kwargs
@@ -0,0 +1,103 @@
+import os
+import sys
+import subprocess
+from importlib.metadata import EntryPoint
+
+import pytest
+
+import cognitrix.llms
+from cognitrix.llms import LLM, Replay
+from cognitrix.llms import registry as llm_registry
+from cognitrix.llms.registry import ProviderSpec, register_provider
+from cognitrix.tools import Tool
+from cognitrix.tools import registry as tool_registry
+from cognitrix.tools.registry import ToolSpec, get_tool, register_tool
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run(code: str) -> str:
+    """Run code in a new interpreter and return its last line of output"""
+    env = {**os.environ, 'PYTHONPATH': ROOT}
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env, cwd=ROOT, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return result.stdout.strip().splitlines()[-1]
+
+
+class TestProviderRegistry:
+
+    # Listing providers imports none of the provider modules or their sdks
+    def test_lists_without_importing(self):
+        imported = run(
+            "import sys\n"
+            "from cognitrix.llms import LLM\n"
+            "names = [provider.__name__ for provider in LLM.list_llms()]\n"
+            "assert 'OpenAI' in names and 'Anthropic' in names, names\n"
+            "modules = ('openai', 'anthropic', 'cohere', 'google.generativeai', 'ollama', 'clarifai', 'cognitrix.llms.openai_llm', 'cognitrix.llms.anthropic_llm')\n"
+            "print(sorted(module for module in modules if module in sys.modules))"
+        )
+        assert imported == '[]'
+
+    # Loads providers by name regardless of case, and as attributes of the package
+    def test_load_llm(self):
+        assert LLM.load_llm('REPLAY') is Replay
+        assert LLM.load_llm('no such provider') is None
+        with pytest.raises(AttributeError):
+            cognitrix.llms.NoSuchProvider
+
+    # Adds the providers of other packages from entry points, without replacing built-in ones
+    def test_entry_points(self, monkeypatch):
+        points = [
+            EntryPoint('Echo', 'cognitrix.llms.replay_llm:Replay', llm_registry.ENTRY_POINT_GROUP),
+            EntryPoint('openai', 'cognitrix.llms.replay_llm:Replay', llm_registry.ENTRY_POINT_GROUP),
+        ]
+        monkeypatch.setattr(llm_registry, 'entry_points', lambda group: points)
+        monkeypatch.setattr(llm_registry, '_providers', None)
+
+        assert 'Echo' in [provider.__name__ for provider in LLM.list_llms()]
+        assert LLM.load_llm('echo') is Replay
+        assert llm_registry.get_provider('openai').spec.target == 'cognitrix.llms.openai_llm:OpenAI'
+
+    # Registered providers replace those with the same name
+    def test_register_provider(self, monkeypatch):
+        monkeypatch.setattr(llm_registry, '_providers', None)
+        register_provider(ProviderSpec('Scripted', 'cognitrix.llms.replay_llm:Replay', listed=False))
+
+        assert LLM.load_llm('scripted') is Replay
+        assert 'Scripted' not in [provider.__name__ for provider in LLM.list_llms()]
+
+
+class TestToolRegistry:
+
+    # Loading tools imports the modules they live in, but not the dependencies they only need to run
+    def test_loads_without_dependencies(self):
+        imported = run(
+            "import sys\n"
+            "from cognitrix.tools import Tool\n"
+            "names = [tool.name for tool in Tool.get_tools_by_category('system') + Tool.get_tools_by_category('web')]\n"
+            "assert 'Take Screenshot' in names and 'Internet Search' in names, names\n"
+            "modules = ('pyautogui', 'tavily', 'bs4', 'wikipedia')\n"
+            "print(sorted(module for module in modules if module in sys.modules))"
+        )
+        assert imported == '[]'
+
+    # Adds the tools of other packages from entry points, without replacing built-in ones
+    def test_entry_points(self, monkeypatch):
+        points = [
+            EntryPoint('quick_math', 'cognitrix.tools.misc:Calculator', tool_registry.ENTRY_POINT_GROUP),
+            EntryPoint('python_repl', 'cognitrix.tools.misc:Calculator', tool_registry.ENTRY_POINT_GROUP),
+        ]
+        monkeypatch.setattr(tool_registry, 'entry_points', lambda group: points)
+        monkeypatch.setattr(tool_registry, '_tools', None)
+        monkeypatch.setattr(tool_registry, '_loaded', {})
+
+        assert get_tool('Quick-Math') is Tool.get_by_name('calculator')
+        assert tool_registry.get_tool_spec('python repl').target == 'cognitrix.tools.python:PythonREPL'
+
+    # Registering a tool replaces the one with the same name, even once loaded
+    def test_register_tool(self, monkeypatch):
+        monkeypatch.setattr(tool_registry, '_tools', None)
+        monkeypatch.setattr(tool_registry, '_loaded', {})
+        assert get_tool('calculator').name == 'Calculator'
+
+        register_tool(ToolSpec('Calculator', 'general', 'cognitrix.tools.python:PythonREPL'))
+        assert get_tool('calculator').name == 'Python REPL'
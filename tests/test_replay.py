@@ -0,0 +1,92 @@
+import json
+import time
+
+import httpx
+import pytest
+from openai import AsyncOpenAI
+
+from cognitrix.llms import LLM, Replay
+from cognitrix.llms.replay_server import create_app
+
+RESPONSE = "<response>\n<type>final_answer</type>\n<result>Hello there</result>\n</response>"
+
+QUERY = {'role': 'User', 'type': 'text', 'message': 'Hi'}
+
+async def collect(llm, query=QUERY):
+    chunks = []
+    async for response in llm(query, 'system prompt'):
+        chunks.append(response.current_chunk)
+    return chunks, response
+
+
+class TestReplay:
+
+    # Streams scripted responses in turn, word by word
+    @pytest.mark.asyncio
+    async def test_streams_responses_in_turn(self):
+        llm = Replay(responses=[RESPONSE, 'second'])
+        chunks, response = await collect(llm)
+        assert ''.join(chunks) == RESPONSE
+        assert len(chunks) > 1
+        assert response.text == 'Hello there'
+        assert ''.join((await collect(llm))[0]) == 'second'
+        assert ''.join((await collect(llm))[0]) == RESPONSE
+
+    # Echoes the query when there is nothing to replay
+    @pytest.mark.asyncio
+    async def test_echoes_query(self):
+        _, response = await collect(Replay())
+        assert response.type == 'final_answer'
+        assert response.text == 'Hi'
+
+    # Loads by name but isn't offered to agents in the provider list
+    def test_not_listed(self):
+        assert 'Replay' not in [provider.__name__ for provider in LLM.list_llms()]
+        assert LLM.load_llm('replay') is Replay
+
+    # Replays the agent messages of a session log
+    @pytest.mark.asyncio
+    async def test_replays_session_log(self, tmp_path):
+        path = tmp_path / 'session.jsonl'
+        records = [
+            {'header': {'session_id': 'x', 'version': 1}},
+            {'role': 'User', 'type': 'text', 'message': 'Hi'},
+            {'role': 'Assistant', 'type': 'text', 'message': RESPONSE},
+        ]
+        path.write_text(''.join(json.dumps(record) + '\n' for record in records))
+        chunks, _ = await collect(Replay(recording=str(path)))
+        assert ''.join(chunks) == RESPONSE
+
+    # Waits for the time to first token and streams at the configured speed
+    @pytest.mark.asyncio
+    async def test_timing(self):
+        llm = Replay(responses=['one two three four five'], ttft=0.05, tokens_per_second=100, jitter=0.1, seed=1)
+        start = time.perf_counter()
+        await collect(llm)
+        assert time.perf_counter() - start >= 0.05 * 0.9 + 4 * 0.01 * 0.9
+
+    # Serves the responses over an OpenAI compatible api
+    @pytest.mark.asyncio
+    async def test_openai_compatible_server(self):
+        app = create_app(Replay(responses=[RESPONSE]))
+        http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app))
+        client = AsyncOpenAI(api_key='replay', base_url='http://replay/v1', http_client=http_client)
+        llm = LLM(model='replay', api_key='replay', client=client)
+        chunks, response = await collect(llm)
+        assert ''.join(chunks) == RESPONSE
+        assert response.text == 'Hello there'
+        await http_client.aclose()
+
+    # The Local provider streams the served response chunk by chunk
+    @pytest.mark.asyncio
+    async def test_local_provider_streams(self):
+        from cognitrix.llms.local_llm import Local
+
+        app = create_app(Replay(responses=[RESPONSE]))
+        http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app))
+        client = AsyncOpenAI(api_key='replay', base_url='http://replay/v1', http_client=http_client)
+        chunks, response = await collect(Local(client=client))
+        assert len(chunks) > 1
+        assert ''.join(chunks) == RESPONSE
+        assert response.text == 'Hello there'
+        await http_client.aclose()
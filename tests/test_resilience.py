@@ -0,0 +1,174 @@
+import time
+import uuid
+from types import SimpleNamespace
+from typing import Any, List, Optional, Tuple
+
+import pytest
+from pydantic import PrivateAttr
+
+from cognitrix.llms import Replay
+from cognitrix.llms.base import LLMResponse
+from cognitrix.llms.call import llm_call
+from cognitrix.llms.resilience import CircuitBreaker, CircuitOpenError, StreamInterruptedError, get_breaker, is_retryable
+from cognitrix.llms.scheduler import get_scheduler
+
+QUERY = {'role': 'User', 'type': 'text', 'message': 'Hi'}
+
+class Overloaded(Exception):
+    """Transient provider error asking to retry right away"""
+    status_code = 529
+    response = SimpleNamespace(headers={'retry-after': '0'})
+
+class Flaky(Replay):
+    """Replay whose attempts can fail after streaming some of their chunks"""
+
+    attempts: List[Tuple[str, Optional[int]]] = []
+    """Text of each attempt and the number of chunks streamed before it fails, None if it doesn't"""
+
+    error: Any = Overloaded
+    """Error raised by failing attempts"""
+
+    _attempt: int = PrivateAttr(default=0)
+
+    @llm_call
+    async def __call__(self, query: dict, system_prompt: str = '', chat_history: list = [], **kwds: Any):
+        text, fail_after = self.attempts[min(self._attempt, len(self.attempts) - 1)]
+        self._attempt += 1
+        response = LLMResponse()
+        for index, token in enumerate(self.tokens(text)):
+            if index == fail_after:
+                raise self.error()
+            response.add_chunk(token)
+            yield response
+        if fail_after is not None:
+            raise self.error()
+
+def flaky(**data) -> Flaky:
+    # Each llm gets its own circuit breaker
+    return Flaky(api_key=uuid.uuid4().hex, **data)
+
+def breaker(llm: Flaky) -> CircuitBreaker:
+    return get_breaker(get_scheduler().key(llm.provider, llm.api_key))
+
+async def collect(llm: Flaky) -> List[str]:
+    chunks = []
+    async for response in llm(QUERY):
+        chunks.append(response.current_chunk)
+    return chunks
+
+
+class TestRetry:
+
+    # Retries a transient error and returns the response of the next attempt
+    @pytest.mark.asyncio
+    async def test_retries_transient_errors(self):
+        llm = flaky(attempts=[('', 0), ('', 0), ('Hello there', None)])
+
+        assert ''.join(await collect(llm)) == 'Hello there'
+        assert llm._attempt == 3
+        assert breaker(llm).stats.retries == 2
+
+    # Gives up after max_retries
+    @pytest.mark.asyncio
+    async def test_max_retries(self):
+        llm = flaky(attempts=[('', 0)], max_retries=1)
+
+        with pytest.raises(Overloaded):
+            await collect(llm)
+        assert llm._attempt == 2
+
+    # Doesn't retry errors caused by the request itself
+    @pytest.mark.asyncio
+    async def test_no_retry_for_bad_requests(self):
+        llm = flaky(attempts=[('', 0), ('Hello', None)], error=ValueError)
+
+        with pytest.raises(ValueError):
+            await collect(llm)
+        assert llm._attempt == 1
+
+    # Classifies timeouts, dropped connections, rate limits and server errors as transient
+    def test_is_retryable(self):
+        assert is_retryable(TimeoutError())
+        assert is_retryable(ConnectionResetError())
+        assert is_retryable(Overloaded())
+        assert not is_retryable(ValueError())
+        assert not is_retryable(SimpleNamespace(status_code=400)) # type: ignore
+        assert not is_retryable(CircuitOpenError())
+
+
+class TestStreamResume:
+
+    # Continues a broken stream after the text already streamed, without repeating it
+    @pytest.mark.asyncio
+    async def test_resumes_broken_stream(self):
+        llm = flaky(attempts=[('one two three four', 2), ('one two three four', None)])
+        chunks = await collect(llm)
+
+        assert chunks == ['one', ' two', ' three', ' four']
+        assert breaker(llm).stats.resumed == 1
+
+    # Fails when the retried stream differs from what was already streamed
+    @pytest.mark.asyncio
+    async def test_different_response(self):
+        llm = flaky(attempts=[('one two three', 2), ('uno dos tres', None)])
+
+        with pytest.raises(StreamInterruptedError):
+            await collect(llm)
+
+    # Fails when the retried stream ends before the text already streamed
+    @pytest.mark.asyncio
+    async def test_shorter_response(self):
+        llm = flaky(attempts=[('one two three', 2), ('one', None)])
+
+        with pytest.raises(StreamInterruptedError):
+            await collect(llm)
+
+
+class TestCircuitBreaker:
+
+    # Opens after consecutive transient failures and rejects requests while open
+    def test_opens(self):
+        circuit = CircuitBreaker('test', failure_threshold=2, reset_timeout=60)
+        for _ in range(2):
+            circuit.before_request()
+            circuit.record_failure(Overloaded())
+
+        assert circuit.state == 'open'
+        with pytest.raises(CircuitOpenError):
+            circuit.before_request()
+        assert circuit.stats.rejected == 1
+
+    # Bad requests don't count towards opening the circuit
+    def test_ignores_bad_requests(self):
+        circuit = CircuitBreaker('test', failure_threshold=2)
+        for _ in range(3):
+            circuit.record_failure(ValueError())
+
+        assert circuit.state == 'closed'
+
+    # Lets a single trial request through after the reset timeout, closing on success and reopening on failure
+    def test_half_open(self):
+        circuit = CircuitBreaker('test', failure_threshold=1, reset_timeout=0.05)
+        circuit.record_failure(Overloaded())
+        time.sleep(0.06)
+
+        circuit.before_request()
+        with pytest.raises(CircuitOpenError):
+            circuit.before_request()
+        circuit.record_failure(Overloaded())
+        assert circuit.state == 'open'
+
+        time.sleep(0.06)
+        circuit.before_request()
+        circuit.record_success()
+        assert circuit.state == 'closed'
+
+    # Calls to an llm fail fast while its endpoint's circuit is open
+    @pytest.mark.asyncio
+    async def test_fails_fast(self):
+        llm = flaky(attempts=[('Hello', None)])
+        breaker(llm).opened_at = time.monotonic()
+
+        with pytest.raises(CircuitOpenError):
+            await collect(llm)
+        assert llm._attempt == 0
@@ -0,0 +1,95 @@
+from typing import Any, List
+
+import pytest
+
+from cognitrix.llms import LLM, Replay, Router
+
+QUERY = {'role': 'User', 'type': 'text', 'message': 'Hi'}
+
+class Down(Replay):
+    """Replay which fails, before or after streaming its response"""
+
+    after_response: bool = False
+
+    async def __call__(self, *args: Any, **kwds: Any):
+        if self.after_response:
+            async for response in super().__call__(*args, **kwds):
+                yield response
+        raise ConnectionError(f'{self.model} is down')
+        yield
+
+def router(llms: List[LLM], **data) -> Router:
+    router = Router(**data)
+    router._llms = llms
+    return router
+
+async def collect(llm: LLM) -> str:
+    async for response in llm(QUERY, 'system prompt'):
+        pass
+    return ''.join(response.chunks)
+
+
+class TestRouter:
+
+    # Loads the llms of the routes by provider name
+    def test_loads_routes(self):
+        llm = Router(routes=[{'provider': 'replay', 'model': 'first'}, {'provider': 'replay', 'model': 'second', 'context_window': 1000}])
+
+        assert [(type(route), route.model) for route in llm.llms()] == [(Replay, 'first'), (Replay, 'second')]
+        assert llm.model == 'first'
+        assert llm.context_window == 1000
+
+    # Streams the first route's response when it answers in time
+    @pytest.mark.asyncio
+    async def test_first_route(self):
+        llm = router([Replay(model='first', responses=['first']), Replay(model='second', responses=['second'])], hedge_after=1)
+
+        assert await collect(llm) == 'first'
+        assert llm.latency_stats()['Replay:first']['wins'] == 1
+        assert 'Replay:second' not in llm.latency_stats()
+
+    # Also queries the next route when the first token is late, and keeps the faster stream
+    @pytest.mark.asyncio
+    async def test_hedges_slow_route(self):
+        llm = router([Replay(model='slow', responses=['slow'], ttft=1), Replay(model='fast', responses=['fast'])], hedge_after=0.05)
+
+        assert await collect(llm) == 'fast'
+        stats = llm.latency_stats()
+        assert stats['router']['hedges'] == 1
+        assert stats['Replay:fast']['wins'] == 1
+        assert stats['Replay:slow']['wins'] == 0
+
+    # Doesn't hedge when hedge_after is 0
+    @pytest.mark.asyncio
+    async def test_no_hedging(self):
+        llm = router([Replay(model='slow', responses=['slow'], ttft=0.1), Replay(model='fast', responses=['fast'])], hedge_after=0)
+
+        assert await collect(llm) == 'slow'
+        assert llm.latency_stats()['router']['hedges'] == 0
+
+    # Fails over to the next route when a route fails before its first token
+    @pytest.mark.asyncio
+    async def test_failover(self):
+        llm = router([Down(model='down'), Replay(model='backup', responses=['backup'])])
+
+        assert await collect(llm) == 'backup'
+        assert llm.latency_stats()['Down:down']['errors'] == 1
+        assert llm.latency_stats()['router']['errors'] == 0
+
+    # Raises the last error when every route fails
+    @pytest.mark.asyncio
+    async def test_all_routes_fail(self):
+        llm = router([Down(model='first'), Down(model='second')])
+
+        with pytest.raises(ConnectionError, match='second is down'):
+            await collect(llm)
+        assert llm.latency_stats()['router']['errors'] == 1
+
+    # Doesn't switch routes once a response has started streaming
+    @pytest.mark.asyncio
+    async def test_error_after_first_token(self):
+        llm = router([Down(model='first', responses=['partial'], after_response=True), Replay(model='backup', responses=['backup'])])
+
+        with pytest.raises(ConnectionError, match='first is down'):
+            await collect(llm)
+        assert 'Replay:backup' not in llm.latency_stats()
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from cognitrix.llms.scheduler import FileCoordinator, Priority, RateLimits, Scheduler, request_priority, take_from_buckets
+
+
+class TestTokenBuckets:
+
+    # Allows a burst of requests per minute, then waits for the bucket to refill
+    def test_requests_per_minute(self):
+        limits = RateLimits(requests_per_minute=60)
+        state = {}
+        assert all(take_from_buckets(state, 100.0, limits, 0) == 0 for _ in range(60))
+
+        assert take_from_buckets(state, 100.0, limits, 0) == pytest.approx(1.0)
+        assert take_from_buckets(state, 101.0, limits, 0) == 0
+
+    # Waits until enough tokens have refilled for the request
+    def test_tokens_per_minute(self):
+        limits = RateLimits(tokens_per_minute=600)
+        state = {}
+        assert take_from_buckets(state, 100.0, limits, 500) == 0
+
+        assert take_from_buckets(state, 100.0, limits, 500) == pytest.approx(40.0)
+        assert take_from_buckets(state, 140.0, limits, 500) == 0
+
+    # A request larger than the bucket waits for a full bucket instead of forever
+    def test_oversized_request(self):
+        limits = RateLimits(tokens_per_minute=600)
+        state = {}
+        assert take_from_buckets(state, 100.0, limits, 5000) == 0
+        assert take_from_buckets(state, 130.0, limits, 5000) == pytest.approx(30.0)
+
+    # Processes sharing the buckets file share the limits
+    @pytest.mark.asyncio
+    async def test_file_coordinator(self, tmp_path):
+        limits = RateLimits(requests_per_minute=2)
+        first, second = FileCoordinator(tmp_path / 'limits.json'), FileCoordinator(tmp_path / 'limits.json')
+
+        assert await first.take('openai:key', limits, 0) == 0
+        assert await second.take('openai:key', limits, 0) == 0
+        assert await first.take('openai:key', limits, 0) > 0
+        assert await second.take('anthropic:key', limits, 0) == 0
+
+
+class TestScheduler:
+
+    # Runs at most max_concurrency requests of a provider at once
+    @pytest.mark.asyncio
+    async def test_max_concurrency(self):
+        scheduler = Scheduler()
+        limits = RateLimits(max_concurrency=2)
+        running, peak = 0, 0
+
+        async def request():
+            nonlocal running, peak
+            async with scheduler.slot('openai:key', limits):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.05)
+                running -= 1
+
+        await asyncio.gather(*(request() for _ in range(5)))
+        assert peak == 2
+
+    # Waiting interactive requests go ahead of background ones, in arrival order within a priority
+    @pytest.mark.asyncio
+    async def test_priorities(self):
+        scheduler = Scheduler()
+        limits = RateLimits(max_concurrency=1)
+        order = []
+
+        async def request(name: str, priority: Priority):
+            with request_priority(priority):
+                async with scheduler.slot('openai:key', limits):
+                    order.append(name)
+                    await asyncio.sleep(0.01)
+
+        tasks = []
+        for name, priority in [('first', Priority.DEFAULT), ('task 1', Priority.BACKGROUND), ('task 2', Priority.BACKGROUND), ('chat', Priority.INTERACTIVE)]:
+            tasks.append(asyncio.create_task(request(name, priority)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+        assert order == ['first', 'chat', 'task 1', 'task 2']
+
+    # A cancelled request leaves the queue so the ones behind it aren't stuck
+    @pytest.mark.asyncio
+    async def test_cancelled_request(self):
+        scheduler = Scheduler()
+        limits = RateLimits(max_concurrency=1)
+        release = asyncio.Event()
+
+        async def request():
+            async with scheduler.slot('openai:key', limits):
+                await release.wait()
+
+        holder = asyncio.create_task(request())
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(request())
+        await asyncio.sleep(0)
+        waiting.cancel()
+        release.set()
+        await holder
+
+        await asyncio.wait_for(request(), 1)
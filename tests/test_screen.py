@@ -0,0 +1,109 @@
+import pytest
+from PIL import Image, ImageDraw
+
+from cognitrix.utils.screen import ScreenCapture, parse_bool, parse_region
+
+class FakeScreen:
+    """A synthetic screen for ScreenCapture to grab"""
+
+    def __init__(self, width: int = 2000, height: int = 1000):
+        self.image = Image.new('RGB', (width, height), 'white')
+        self.regions = []
+
+    def draw(self, box, color: str = 'red'):
+        ImageDraw.Draw(self.image).rectangle(box, fill=color)
+
+    def grab(self, region=None) -> Image.Image:
+        self.regions.append(region)
+        if region:
+            left, top, width, height = region
+            return self.image.crop((left, top, left + width, top + height))
+        return self.image.copy()
+
+
+class TestParsing:
+
+    # Regions are given as "x,y,width,height", separated by commas or spaces
+    def test_parse_region(self):
+        assert parse_region('10,20,300,200') == (10, 20, 300, 200)
+        assert parse_region('10 20 300.0 200') == (10, 20, 300, 200)
+        assert parse_region((1, 2, 3, 4)) == (1, 2, 3, 4)
+        assert parse_region('') is None
+        for region in ('10,20,300', '10,20,0,200', 'a,b,c,d'):
+            with pytest.raises(ValueError):
+                parse_region(region)
+
+    def test_parse_bool(self):
+        assert parse_bool('True') and parse_bool(' yes') and parse_bool(True)
+        assert not parse_bool('false') and not parse_bool('') and not parse_bool(None)
+
+
+class TestScreenCapture:
+
+    # Downscales so the longest side is at most max_size, and keeps the full size with 0
+    def test_max_size(self):
+        screen = FakeScreen()
+        capture = ScreenCapture(screen.grab)
+
+        image, _ = capture.capture(1000)
+        assert image.size == (1000, 500)
+        assert capture.to_screen(500, 250) == (1000, 500)
+
+        image, _ = capture.capture()
+        assert image.size == (2000, 1000)
+        assert capture.to_screen(500, 250) == (500, 250)
+
+    # Grabs only the region, and maps coordinates on it back to the screen
+    def test_region(self):
+        screen = FakeScreen()
+        capture = ScreenCapture(screen.grab)
+        image, _ = capture.capture(200, (100, 50, 400, 300))
+
+        assert screen.regions == [(100, 50, 400, 300)]
+        assert image.size == (200, 150)
+        assert capture.to_screen(0, 0) == (100, 50)
+        assert capture.to_screen(100, 75) == (300, 200)
+
+    # In diff mode an unchanged screen isn't sent again
+    def test_diff_unchanged(self):
+        screen = FakeScreen()
+        capture = ScreenCapture(screen.grab)
+        capture.capture(diff=True)
+
+        image, caption = capture.capture(diff=True)
+        assert image is None
+        assert 'not changed' in caption
+
+    # In diff mode only the changed area, with a margin, is sent and coordinates map from the crop
+    def test_diff_crops_changes(self):
+        screen = FakeScreen()
+        capture = ScreenCapture(screen.grab, margin=10)
+        capture.capture(diff=True)
+        screen.draw((400, 200, 599, 399))
+
+        image, caption = capture.capture(diff=True)
+        assert 'changed' in caption
+        assert image.size == (220, 220)
+        assert capture.to_screen(10, 10) == (400, 200)
+        assert image.getpixel((10, 10)) == (255, 0, 0) and image.getpixel((9, 9)) == (255, 255, 255)
+
+    # Coordinates on a crop of a downscaled screenshot map back through the scale
+    def test_diff_crops_scaled(self):
+        screen = FakeScreen()
+        capture = ScreenCapture(screen.grab, margin=0)
+        capture.capture(1000, diff=True)
+        screen.draw((400, 200, 599, 399))
+
+        image, _ = capture.capture(1000, diff=True)
+        assert image.width < 120 and image.height < 120
+        x, y = capture.to_screen(image.width / 2, image.height / 2)
+        assert abs(x - 500) <= 2 and abs(y - 300) <= 2
+
+    # Without diff the full screenshot is sent even if nothing changed, and a new size starts over
+    def test_diff_off_or_resized(self):
+        screen = FakeScreen()
+        capture = ScreenCapture(screen.grab)
+        capture.capture(1000)
+
+        assert capture.capture(1000)[0].size == (1000, 500)
+        assert capture.capture(500, diff=True)[0].size == (500, 250)
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from cognitrix.agents import Agent
+from cognitrix.llms import Replay
+from cognitrix.llms.session import Session
+from cognitrix.tools import tool
+from cognitrix.utils.screen import current_screen
+
+recorded = []
+screens = []
+
+@tool(category='test')
+async def record(key: str):
+    """Records the key after a short delay"""
+    await asyncio.sleep(0.1)
+    recorded.append(key)
+    return key
+
+@tool(category='test')
+def note_screen(key: str):
+    """Records the screen capture the tool sees"""
+    screens.append(current_screen())
+    return key
+
+def tool_call(key: str, name: str = 'Record') -> str:
+    return f"<tool><name>{name}</name><arguments><key>{key}</key></arguments></tool>"
+
+def tool_calls(*calls: str) -> str:
+    return f"<response><type>tool_calls</type><tool_calls>{''.join(calls)}</tool_calls></response>"
+
+class BrokenStream(Replay):
+    """Replay whose stream fails after the response"""
+
+    async def __call__(self, *args, **kwargs):
+        async for response in super().__call__(*args, **kwargs):
+            yield response
+        raise ValueError('stream broke')
+
+def quiet(*args, **kwargs):
+    pass
+
+
+class TestEarlyDispatch:
+
+    # Joins the tool calls dispatched while streaming and sends their results back
+    @pytest.mark.asyncio
+    async def test_dispatches_tool_calls(self):
+        recorded.clear()
+        llm = Replay(responses=[tool_calls(tool_call('a'), tool_call('b')), 'done'], tokens_per_second=500)
+        await Session()('Hi', Agent(llm=llm, tools=[record]), output=quiet)
+
+        assert recorded == ['a', 'b']
+
+    # Cancels the dispatched calls when the streamed xml turns out to be malformed
+    @pytest.mark.asyncio
+    async def test_malformed_response_cancels_dispatched_calls(self):
+        recorded.clear()
+        llm = Replay(responses=[tool_calls(tool_call('a'), tool_call('b & c'))], tokens_per_second=500)
+        await Session()('Hi', Agent(llm=llm, tools=[record]), output=quiet)
+        await asyncio.sleep(0.2)
+
+        assert recorded == []
+
+    # Cancels the dispatched calls when the turn fails
+    @pytest.mark.asyncio
+    async def test_failed_turn_cancels_dispatched_calls(self):
+        recorded.clear()
+        errors = []
+        llm = BrokenStream(responses=[tool_calls(tool_call('a'))])
+        await Session()('Hi', Agent(llm=llm, tools=[record]), output=errors.append)
+        await asyncio.sleep(0.2)
+
+        assert recorded == []
+        assert errors == ['Error: stream broke']
+
+    # Writes out what a failed turn streamed before returning, and nothing after
+    @pytest.mark.asyncio
+    async def test_failed_turn_flushes_stream(self):
+        writes = []
+        llm = BrokenStream(responses=['Hello there my friend'])
+        await Session()('Hi', Agent(llm=llm), streaming=True, output=lambda text, end='\n': writes.append(text))
+        written = list(writes)
+        await asyncio.sleep(0.1)
+
+        assert writes == written
+        assert 'Hello there my friend' in ''.join(writes)
+        assert 'Error: stream broke' in writes
+
+
+class TestScreenCapture:
+
+    # Screen tools see the capture of their own session, even in the tool threads
+    @pytest.mark.asyncio
+    async def test_capture_per_session(self):
+        screens.clear()
+        sessions = [Session(), Session()]
+        for session in sessions:
+            llm = Replay(responses=[tool_calls(tool_call('a', 'Note Screen')), 'done'], tokens_per_second=500)
+            await session('Hi', Agent(llm=llm, tools=[note_screen]), output=quiet)
+
+        assert screens == [session._screen for session in sessions]
+        assert screens[0] is not screens[1]
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from cognitrix.llms.session import Session
+from cognitrix.storage.session_log import SessionLog
+
+def messages(count: int, start: int = 0):
+    return [{'role': 'User', 'type': 'text', 'message': f'message {i}'} for i in range(start, start + count)]
+
+
+class TestSessionLog:
+
+    # Appends messages after a header line and reads them back in order
+    @pytest.mark.asyncio
+    async def test_append_and_read(self, tmp_path):
+        log = SessionLog('s1', tmp_path)
+        await log.append(messages(2))
+        await log.append(messages(1, 2))
+
+        lines = log.path.read_text().splitlines()
+        assert json.loads(lines[0])['header']['session_id'] == 's1'
+        assert len(lines) == 4
+        assert await log.read() == messages(3)
+
+    # Reads the last messages backwards, across block boundaries
+    @pytest.mark.asyncio
+    async def test_tail(self, tmp_path):
+        log = SessionLog('s1', tmp_path)
+        log.BLOCK_SIZE = 64
+        await log.append(messages(50))
+
+        assert await log.tail(5) == messages(5, 45)
+        assert await log.tail(100) == messages(50)
+        assert await log.tail(0) == []
+
+    # Skips a corrupt line, like one cut short by a crash, instead of failing
+    @pytest.mark.asyncio
+    async def test_corrupt_line(self, tmp_path):
+        log = SessionLog('s1', tmp_path)
+        await log.append(messages(2))
+        with open(log.path, 'a') as file:
+            file.write('{"role": "Us')
+
+        assert await log.read() == messages(2)
+        assert await log.tail(1) == messages(1, 1)
+
+    # Rewriting replaces the messages and keeps the header
+    @pytest.mark.asyncio
+    async def test_rewrite(self, tmp_path):
+        log = SessionLog('s1', tmp_path)
+        await log.append(messages(3))
+        await log.rewrite(messages(1, 7))
+
+        assert await log.read() == messages(1, 7)
+        assert 'header' in json.loads(log.path.read_text().splitlines()[0])
+
+
+class TestSessionChat:
+
+    # Saving a session only appends the new messages, and clearing the chat rewrites the log
+    @pytest.mark.asyncio
+    async def test_save(self):
+        session = Session()
+        session.chat = messages(2)
+        await session.save()
+        session.chat.extend(messages(1, 2))
+        await session.save()
+
+        assert len(session.log.path.read_text().splitlines()) == 4
+        assert (await Session.load(session.id, limit=2)).chat == messages(2, 1)
+
+        session.chat = []
+        await session.save()
+        assert (await Session.load(session.id)).chat == []
@@ -0,0 +1,138 @@
+import json
+import sqlite3
+
+import pytest
+
+from cognitrix.storage import migrate_storage
+from cognitrix.storage.repository import Repository
+from cognitrix.storage.json_storage import JSONStorage
+from cognitrix.storage.sqlite_storage import SQLiteStorage
+
+def json_storage(directory) -> JSONStorage:
+    return JSONStorage({collection: directory / f'{collection}.json' for collection in ('agents', 'sessions', 'tasks', 'teams')})
+
+
+class TestSQLiteStorage:
+
+    # Documents saved by one connection are read back, found and deleted by another
+    @pytest.mark.asyncio
+    async def test_round_trip(self, tmp_path):
+        path = tmp_path / 'cognitrix.db'
+        await SQLiteStorage(path).save('agents', 'a1', {'id': 'a1', 'name': 'Writer', 'parent_id': None})
+        await SQLiteStorage(path).save('agents', 'a2', {'id': 'a2', 'name': 'Helper', 'parent_id': 'a1'})
+
+        storage = SQLiteStorage(path)
+        assert await storage.get('agents', 'a1') == {'id': 'a1', 'name': 'Writer', 'parent_id': None}
+        assert await storage.find_one('agents', name='writer') == await storage.get('agents', 'a1')
+        assert [agent['id'] for agent in await storage.find('agents', parent_id='a1')] == ['a2']
+        assert await storage.delete('agents', 'a2')
+        assert not await storage.delete('agents', 'a2')
+        assert list(await storage.all('agents')) == ['a1']
+
+    # Uses write-ahead logging, so readers don't block the writer
+    @pytest.mark.asyncio
+    async def test_wal_mode(self, tmp_path):
+        path = tmp_path / 'cognitrix.db'
+        storage = SQLiteStorage(path)
+        await storage.save('tasks', 't1', {'id': 't1'})
+
+        with sqlite3.connect(path) as connection:
+            assert connection.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert (tmp_path / 'cognitrix.db-wal').exists()
+
+    # Every write bumps the collection version other processes compare against
+    @pytest.mark.asyncio
+    async def test_version(self, tmp_path):
+        storage = SQLiteStorage(tmp_path / 'cognitrix.db')
+        assert await storage.version('teams') == 0
+
+        await storage.save_many('teams', {'t1': {'name': 'A'}, 't2': {'name': 'B'}})
+        await storage.delete('teams', 't1')
+        assert await storage.version('teams') == 2
+
+    # Looking up a field which isn't indexed is an error instead of a full scan
+    @pytest.mark.asyncio
+    async def test_unindexed_field(self, tmp_path):
+        with pytest.raises(ValueError):
+            await SQLiteStorage(tmp_path / 'cognitrix.db').find('agents', llm='openai')
+
+
+class TestMigrateStorage:
+
+    # Copies every collection from the json files to sqlite
+    @pytest.mark.asyncio
+    async def test_json_to_sqlite(self, tmp_path):
+        source = json_storage(tmp_path)
+        await source.save('agents', 'a1', {'id': 'a1', 'name': 'Writer'})
+        await source.save('sessions', 's1', {'id': 's1', 'agent_id': 'a1', 'task_id': None})
+
+        target = SQLiteStorage(tmp_path / 'cognitrix.db')
+        copied = await migrate_storage(source, target)
+
+        assert copied == {'agents': 1, 'sessions': 1, 'tasks': 0, 'teams': 0}
+        assert await target.find('sessions', agent_id='a1') == [{'id': 's1', 'agent_id': 'a1', 'task_id': None}]
+
+
+class TestJSONIndex:
+
+    # The index is persisted next to the collection and reused by a new process
+    @pytest.mark.asyncio
+    async def test_persisted_index(self, tmp_path, monkeypatch):
+        await json_storage(tmp_path).save_many('sessions', {
+            's1': {'id': 's1', 'agent_id': 'a1', 'task_id': None},
+            's2': {'id': 's2', 'agent_id': 'a2', 'task_id': 't1'},
+        })
+        assert json.loads((tmp_path / 'sessions.index.json').read_text())['index']['agent_id'] == {'"a1"': ['s1'], '"a2"': ['s2']}
+
+        storage = json_storage(tmp_path)
+        monkeypatch.setattr(storage, '_build_index', lambda *args: pytest.fail('The index was rebuilt'))
+        assert await storage.find('sessions', agent_id='a2', task_id='t1') == [{'id': 's2', 'agent_id': 'a2', 'task_id': 't1'}]
+
+    # Saves and deletes keep the index in step with the documents
+    @pytest.mark.asyncio
+    async def test_updates_index(self, tmp_path):
+        storage = json_storage(tmp_path)
+        await storage.save('agents', 'a1', {'id': 'a1', 'name': 'Writer', 'parent_id': None})
+        await storage.save('agents', 'a1', {'id': 'a1', 'name': 'Editor', 'parent_id': None})
+
+        assert await storage.find('agents', name='writer') == []
+        assert await storage.find_one('agents', name='EDITOR') == {'id': 'a1', 'name': 'Editor', 'parent_id': None}
+        assert await storage.delete('agents', 'a1')
+        assert await storage.find('agents', parent_id=None) == []
+
+    # An index written before the collection file was changed elsewhere is rebuilt
+    @pytest.mark.asyncio
+    async def test_stale_index(self, tmp_path):
+        await json_storage(tmp_path).save('teams', 't1', {'name': 'Red'})
+        (tmp_path / 'teams.json').write_text(json.dumps({'t1': {'name': 'Blue'}, 't2': {'name': 'Red'}}))
+
+        assert await json_storage(tmp_path).find('teams', name='red') == [{'name': 'Red'}]
+
+
+class TestRepository:
+
+    # Writes are served from the cache and reach the backend in one batch on flush
+    @pytest.mark.asyncio
+    async def test_write_behind(self, tmp_path):
+        backend = SQLiteStorage(tmp_path / 'cognitrix.db')
+        repository = Repository(backend, flush_delay=60)
+        await repository.save('sessions', 's1', {'id': 's1', 'agent_id': 'a1', 'task_id': None})
+        await repository.save('sessions', 's2', {'id': 's2', 'agent_id': 'a1', 'task_id': None})
+
+        assert await backend.all('sessions') == {}
+        assert [session['id'] for session in await repository.find('sessions', agent_id='a1')] == ['s1', 's2']
+
+        await repository.flush()
+        assert list(await backend.all('sessions')) == ['s1', 's2']
+        assert await backend.version('sessions') == 1
+
+    # Picks up documents written by another process
+    @pytest.mark.asyncio
+    async def test_external_changes(self, tmp_path):
+        backend = SQLiteStorage(tmp_path / 'cognitrix.db')
+        repository = Repository(backend, refresh_interval=0)
+        await backend.save('teams', 't1', {'name': 'Red'})
+        assert await repository.get('teams', 't1') == {'name': 'Red'}
+
+        await SQLiteStorage(tmp_path / 'cognitrix.db').save('teams', 't1', {'name': 'Blue'})
+        assert await repository.get('teams', 't1') == {'name': 'Blue'}
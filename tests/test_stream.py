@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from cognitrix.utils.stream import ChunkCoalescer
+
+
+class TestChunkCoalescer:
+
+    # Merges chunks arriving within the interval into one write
+    @pytest.mark.asyncio
+    async def test_coalesces_chunks(self):
+        writes = []
+        coalescer = ChunkCoalescer(writes.append, interval=0.05)
+        for index in range(20):
+            await coalescer.add(f'{index} ')
+        await coalescer.flush()
+
+        assert ''.join(writes) == ''.join(f'{index} ' for index in range(20))
+        assert len(writes) <= 2
+        assert coalescer.frames == len(writes)
+
+    # Writes as soon as max_bytes are buffered, and writes held back chunks after the interval
+    @pytest.mark.asyncio
+    async def test_max_bytes_and_interval(self):
+        writes = []
+        coalescer = ChunkCoalescer(writes.append, interval=0.05, max_bytes=10)
+        coalescer._last_write = 0
+        await coalescer.add('first')
+        await coalescer.add('abc')
+        assert writes == ['first']
+
+        await coalescer.add('defghijk')
+        assert writes == ['first', 'abcdefghijk']
+
+        await coalescer.add('z')
+        await asyncio.sleep(0.1)
+        assert writes == ['first', 'abcdefghijk', 'z']
+
+    # Merges the chunks arriving while an async write is in flight into the next write
+    @pytest.mark.asyncio
+    async def test_slow_transport(self):
+        writes = []
+
+        async def send(text: str):
+            await asyncio.sleep(0.05)
+            writes.append(text)
+
+        coalescer = ChunkCoalescer(send, interval=0)
+        for chunk in 'abcdef':
+            await coalescer.add(chunk)
+            await asyncio.sleep(0.01)
+        await coalescer.flush()
+
+        assert ''.join(writes) == 'abcdef'
+        assert 1 < len(writes) < 6
+
+    # Raises the error of a failed async write on the next call
+    @pytest.mark.asyncio
+    async def test_write_error(self):
+        async def send(text: str):
+            raise ConnectionError('socket closed')
+
+        coalescer = ChunkCoalescer(send, interval=0)
+        await coalescer.add('a')
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(ConnectionError):
+            await coalescer.add('b')
+
+    # Writes out the buffered chunks on close and refuses new ones
+    @pytest.mark.asyncio
+    async def test_close(self):
+        writes = []
+        coalescer = ChunkCoalescer(writes.append, interval=0.05)
+        await coalescer.add('a')
+        await coalescer.add('b')
+        await coalescer.close()
+
+        assert ''.join(writes) == 'ab'
+        with pytest.raises(RuntimeError):
+            await coalescer.add('c')
@@ -0,0 +1,72 @@
+import time
+import asyncio
+
+import pytest
+
+from cognitrix.agents import Agent
+from cognitrix.llms import Replay
+from cognitrix.tools import Tool, tool
+
+events = []
+
+@tool(category='test')
+def slow_lookup(query: str):
+    """Sleeps, then echoes the query"""
+    time.sleep(0.2)
+    return query
+
+@tool(category='test')
+async def slow_fetch(query: str):
+    """Sleeps without blocking, then echoes the query"""
+    await asyncio.sleep(0.2)
+    return query
+
+@tool(category='test', max_concurrency=1, concurrency_group='screen')
+def press(key: str):
+    """Records the start and end of a key press"""
+    events.append(('start', key))
+    time.sleep(0.05)
+    events.append(('end', key))
+    return key
+
+
+class TestCallTools:
+
+    # Runs sync and async tools at the same time and keeps the results in call order
+    @pytest.mark.asyncio
+    async def test_runs_tools_concurrently_in_order(self):
+        agent = Agent(llm=Replay(), tools=[slow_lookup, slow_fetch])
+        calls = [{'name': 'Slow Lookup', 'arguments': {'query': f'q{i}'}} for i in range(3)]
+        calls.append({'name': 'slow_fetch', 'arguments': {'query': 'q3'}})
+
+        started = time.perf_counter()
+        result = await agent.call_tools({'tool': calls})
+
+        assert time.perf_counter() - started < 0.6
+        positions = [result['result'].index(f'<result>q{i}</result>') for i in range(4)]
+        assert positions == sorted(positions)
+
+    # Tools of a concurrency group run one at a time, in the order they were called
+    @pytest.mark.asyncio
+    async def test_concurrency_group_runs_serially(self):
+        events.clear()
+        agent = Agent(llm=Replay(), tools=[press])
+        await agent.call_tools({'tool': [{'name': 'press', 'arguments': {'key': key}} for key in 'abc']})
+
+        assert events == [('start', 'a'), ('end', 'a'), ('start', 'b'), ('end', 'b'), ('start', 'c'), ('end', 'c')]
+
+    # Resolves tools by name regardless of case and separators, reusing one instance
+    def test_get_by_name(self):
+        assert Tool.get_by_name('python_repl') is Tool.get_by_name('Python REPL')
+        assert Tool.get_by_name('no such tool') is None
+
+    # Only calls the agent's own tools, and sees tools replaced in place
+    @pytest.mark.asyncio
+    async def test_agent_tool_map(self):
+        agent = Agent(llm=Replay(), tools=[slow_lookup])
+
+        assert 'not found' in await agent.call_tools({'tool': {'name': 'Calculator', 'arguments': {'math_expression': '1+1'}}})
+
+        agent.tools[0] = Tool.get_by_name('calculator')
+        assert agent.get_tool_by_name('slow lookup') is None
+        assert await agent.call_tool({'name': 'calculator', 'arguments': {'math_expression': '1+1'}}) == ['Calculator', 2]